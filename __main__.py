@@ -0,0 +1,9 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Run the headless CLI with `python GlyphGrab search smile`.
+"""
+import sys
+from cli import main
+
+sys.exit(main())
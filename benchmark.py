@@ -0,0 +1,712 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Benchmarks for emoji data loading, indexing, search and the emoji grid.
+
+Every scenario runs in a fresh interpreter so load times and RSS are not
+skewed by whatever an earlier scenario imported or cached, with HOME pointed
+at an empty directory so the user's config and recents do not change the
+results. Qt scenarios run on the offscreen platform.
+
+  python benchmark.py                          # run every scenario
+  python benchmark.py store latency            # run some of them
+  python benchmark.py --repeat 5 --json a.json # median of five runs, saved
+  python benchmark.py --compare a.json         # fail on >10% regressions
+"""
+import argparse
+import heapq
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+emoji_json_path = os.path.join(BASE_DIR, "data", "emoji-en-US.json")
+index_json_path = os.path.join(BASE_DIR, "data", "index", "inverted_index.json")
+
+def rss_kb():
+  """Return the current resident set size in KB"""
+  try:
+    with open("/proc/self/statm") as f:
+      return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+  except OSError:
+    # No procfs (macOS), fall back to the peak which is close enough at startup
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == "darwin" else 1)
+
+def legacy_load():
+  """Load the way EmojiData did before the shared store: two corpus parses plus the JSON index"""
+  with open(emoji_json_path, 'r', encoding='utf-8') as f:
+    emojis = json.load(f)
+  emoji_keys = list(emojis.keys())
+  with open(emoji_json_path, 'r', encoding='utf-8') as f:
+    indexer_emojis = json.load(f)
+  with open(index_json_path, 'r', encoding='utf-8') as f:
+    inverted_index = json.load(f)
+  return emojis, emoji_keys, indexer_emojis, inverted_index
+
+def measure_load(prepare):
+  """Time prepare's imports and then the loader it returns, with the RSS growth"""
+  start = time.perf_counter()
+  loader = prepare()
+  imported = time.perf_counter()
+  before = rss_kb()
+  loaded = loader()
+  loaded_at = time.perf_counter()
+  after = rss_kb()
+  del loaded
+  return {
+    "import_ms": round((imported - start) * 1000, 2),
+    "load_ms": round((loaded_at - imported) * 1000, 2),
+    "rss_kb": after - before,
+  }
+
+def percentiles_us(search, queries, repeat=20):
+  """Return the p50, p95 and p99 latency of search over queries in microseconds"""
+  timings = []
+  for _ in range(repeat):
+    for query in queries:
+      start = time.perf_counter()
+      search(query)
+      timings.append(time.perf_counter() - start)
+  timings.sort()
+  def at(fraction):
+    return round(timings[min(int(len(timings) * fraction), len(timings) - 1)] * 1e6, 1)
+  return at(0.5), at(0.95), at(0.99)
+
+def median_ms(run, repeat=5):
+  """Return the median time of run() in milliseconds"""
+  timings = []
+  for _ in range(repeat):
+    start = time.perf_counter()
+    run()
+    timings.append(time.perf_counter() - start)
+  timings.sort()
+  return round(timings[len(timings) // 2] * 1000, 2)
+
+def median_us(search, queries, repeat=20):
+  """Return the median latency of search over queries in microseconds"""
+  timings = []
+  for _ in range(repeat):
+    for query in queries:
+      start = time.perf_counter()
+      search(query)
+      timings.append(time.perf_counter() - start)
+  timings.sort()
+  return round(timings[len(timings) // 2] * 1e6, 1)
+
+EXACT_QUERIES = ["smile", "cat", "flag", "heart", "grinning face", "happy cat", "red heart"]
+PARTIAL_QUERIES = ["smil", "hea", "grinn", "flo", "ca", "irpl", "tball"]
+FUZZY_QUERIES = ["smilling", "hert", "elefant", "pizzza", "rocet", "smiel"]
+
+# Search latency corpus, by the kind of query people type
+LATENCY_QUERIES = {
+  "exact": ["smile", "cat", "flag", "heart", "dog", "pizza", "fire", "rocket", "star", "tree"],
+  "multi": ["grinning face", "happy cat", "red heart", "face with tears of joy", "thumbs up",
+            "flag united", "smiling face with heart eyes", "cat face"],
+  "partial": ["smil", "hea", "grinn", "flo", "ca", "irpl", "tball", "rock", "piz", "umbre"],
+  "fuzzy": FUZZY_QUERIES,
+  "zero": ["zzqx", "qwrtp", "xyzzyx", "kkkkkkkk", "bnmbnm"],
+  # Planned queries, see query.py
+  "operators": ["cat OR dog", "heart -red", "smil* face", '"red heart"', ":)", "flag* -united",
+                "flag japan OR korea", "NOT face smiling"],
+}
+
+def corpus_copy(directory, name):
+  """Copy the emoji corpus under a new name, so it gets its own compiled index"""
+  path = os.path.join(directory, name + ".json")
+  shutil.copyfile(emoji_json_path, path)
+  return path
+
+def bench_legacy_load():
+  return measure_load(lambda: legacy_load)
+
+def bench_store_load():
+  def prepare():
+    from emoji_data import EmojiData
+    # The constructor does no I/O, loading is what the old path is compared with
+    return lambda: EmojiData().load()
+  return measure_load(prepare)
+
+def bench_emoji_data():
+  """EmojiData construction without a compiled index (cold) and with one (warm)"""
+  from emoji_data import EmojiData
+  with tempfile.TemporaryDirectory() as directory:
+    json_path = corpus_copy(directory, "bench")
+    start = time.perf_counter()
+    EmojiData(json_path, directory).load()
+    cold = time.perf_counter()
+    EmojiData(json_path, directory).load()
+    warm = time.perf_counter()
+  return {
+    "cold_ms": round((cold - start) * 1000, 2),
+    "warm_ms": round((warm - cold) * 1000, 2),
+  }
+
+def bench_startup():
+  """Time to the first browse chunk against time to searchable, with and without a usable index"""
+  from emoji_data import EmojiData, order_path_for
+  from indexer import index_path_for
+
+  def start(json_path, directory):
+    started = time.perf_counter()
+    emoji_data = EmojiData(json_path, directory)
+    emoji_data.get_emoji_chunk(0, 100)
+    first_chunk = time.perf_counter()
+    emoji_data.search("smile")
+    searchable = time.perf_counter()
+    return round((first_chunk - started) * 1000, 2), round((searchable - started) * 1000, 2)
+
+  result = {}
+  with tempfile.TemporaryDirectory() as directory:
+    json_path = corpus_copy(directory, "bench")
+    # First run: no order sidecar and no index
+    result["cold_first_chunk_ms"], result["cold_searchable_ms"] = start(json_path, directory)
+    # A stale index, like after an update, with the sidecar still good
+    os.remove(index_path_for(json_path, directory))
+    result["stale_first_chunk_ms"], result["stale_searchable_ms"] = start(json_path, directory)
+    result["warm_first_chunk_ms"], result["warm_searchable_ms"] = start(json_path, directory)
+    # What the first chunk cost when it needed the whole index
+    os.remove(order_path_for(json_path, directory))
+    os.remove(index_path_for(json_path, directory))
+    started = time.perf_counter()
+    EmojiData(json_path, directory).load().get_emoji_chunk(0, 100)
+    result["full_load_first_chunk_ms"] = round((time.perf_counter() - started) * 1000, 2)
+  return result
+
+def bench_index():
+  """Building, saving and loading the compiled index"""
+  from indexer import EmojiIndexer, index_path_for
+  with tempfile.TemporaryDirectory() as directory:
+    json_path = corpus_copy(directory, "bench")
+    indexer = EmojiIndexer(json_path, directory)
+    index_path = index_path_for(json_path, directory)
+    return {
+      "build_ms": median_ms(indexer.build_index),
+      "save_ms": median_ms(lambda: indexer.save_index(directory)),
+      "load_ms": median_ms(lambda: indexer.load_index(index_path)),
+      "index_kb": os.path.getsize(index_path) // 1024,
+    }
+
+def bench_update():
+  """Re-indexing a new Unicode release's changes against a full rebuild, and whether both agree"""
+  from index_format import encode_index, source_hash
+  from indexer import EmojiIndexer, build_inverted_index
+  with open(emoji_json_path, encoding='utf-8') as f:
+    corpus = json.load(f)
+  # Like an import: a few keywords changed, a few emojis dropped and a batch of new ones at the end
+  release = dict(corpus)
+  for emoji in list(corpus)[::60]:
+    release[emoji] = corpus[emoji] + ["bench_keyword"]
+  for emoji in list(corpus)[30::400]:
+    del release[emoji]
+  for n in range(30):
+    release[chr(0x1FB00 + n)] = [f"bench_new_{n}", "bench_new", "face"]
+
+  with tempfile.TemporaryDirectory() as directory:
+    json_path = corpus_copy(directory, "bench")
+    EmojiIndexer(json_path, directory).ensure_index_exists()
+    with open(json_path, "w", encoding='utf-8') as f:
+      json.dump(release, f, ensure_ascii=False)
+    updated = EmojiIndexer(json_path, directory)
+    expected = encode_index(source_hash(json_path), release, build_inverted_index(release))
+    return {
+      "update_ms": median_ms(lambda: updated.update_index()),
+      "rebuild_ms": median_ms(EmojiIndexer(json_path, directory).build_index),
+      "changed_emojis": sum(corpus.get(emoji) != release.get(emoji) for emoji in corpus.keys() | release.keys()),
+      "identical": updated.index_data == expected,
+    }
+
+def bench_latency():
+  """Uncached search latency percentiles for each kind of query and all of them"""
+  from emoji_data import EmojiData
+  emoji_data = EmojiData().load()
+  emoji_data.search_cache_size = 0
+  def search(query):
+    # What the window reads for the first page of results
+    emoji_data.search(query, 96)
+
+  result = {}
+  for kind, queries in LATENCY_QUERIES.items():
+    p50, p95, p99 = percentiles_us(search, queries)
+    result.update({f"{kind}_p50_us": p50, f"{kind}_p95_us": p95, f"{kind}_p99_us": p99})
+  all_queries = [query for queries in LATENCY_QUERIES.values() for query in queries]
+  result["all_p50_us"], result["all_p95_us"], result["all_p99_us"] = percentiles_us(search, all_queries)
+  return result
+
+def bench_window():
+  """Main window construction and result grid rebuilds on the offscreen platform"""
+  os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+  start = time.perf_counter()
+  from PyQt5.QtWidgets import QApplication
+  from main import GlyphGrabMainWindow
+  imported = time.perf_counter()
+  app = QApplication.instance() or QApplication([])
+  window = GlyphGrabMainWindow()
+  constructed = time.perf_counter()
+  window.show()
+  window.repaint()
+  shown = time.perf_counter()
+  # Rebuilds are timed with glyphs blitted from the atlas, like after startup
+  deadline = shown + 10
+  while (window.glyph_atlas is None or not window.glyph_atlas.is_ready) and time.perf_counter() < deadline:
+    app.processEvents()
+  atlas_ready = time.perf_counter()
+
+  # Rank every query up front, only showing them is timed
+  queries = [query for queries in LATENCY_QUERIES.values() for query in queries]
+  ranked = [window.emoji_data.search_ranked(query) for query in queries]
+  viewport = window.emoji_view.viewport()
+  def rebuild():
+    for results in ranked:
+      window.update_search_results(window.search_generation, results)
+      viewport.repaint()
+  rebuild_ms = median_ms(rebuild) / len(ranked)
+
+  def browse():
+    window.search_bar.clear()
+    window.perform_search()
+    viewport.repaint()
+    window.search_bar.setText("heart")
+    window.update_search_results(window.search_generation, ranked[3])
+    viewport.repaint()
+  swap_ms = median_ms(browse) / 2
+
+  # Jumping to the last group from the top of the grid, painted
+  window.search_bar.clear()
+  window.perform_search()
+  last_group_start = window.emoji_data.get_sections()[-1][3]
+  def jump():
+    window.load_emojis_from(0)
+    window.jump_to_offset(last_group_start)
+    viewport.repaint()
+  jump_ms = median_ms(jump)
+  window.close()
+  app.processEvents()
+
+  return {
+    "import_ms": round((imported - start) * 1000, 2),
+    "construct_ms": round((constructed - imported) * 1000, 2),
+    "first_paint_ms": round((shown - constructed) * 1000, 2),
+    "atlas_ms": round((atlas_ready - shown) * 1000, 2),
+    "rebuild_ms": round(rebuild_ms, 3),
+    "model_swap_ms": round(swap_ms, 3),
+    "group_jump_ms": round(jump_ms, 3),
+  }
+
+# What every emoji button used to get, before theme.py
+LEGACY_BUTTON_STYLE = """
+  QPushButton {
+    border: none;
+    background-color: transparent;
+    font-size: 24px;
+  }
+  QPushButton:hover {
+    background-color: #e0e0e0;
+    border-radius: 5px;
+  }
+"""
+
+def bench_theme():
+  """Emoji button creation with a stylesheet and font each against the app stylesheet"""
+  os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+  from PyQt5.QtGui import QFont
+  from PyQt5.QtWidgets import QApplication, QGridLayout, QPushButton, QWidget
+  import theme
+  app = QApplication.instance() or QApplication([])
+  emojis = ["😀", "🐈", "❤️", "🎉", "👍", "🔥", "🍕", "🚀"] * 50
+
+  def build(make_button):
+    """Create, lay out and polish a grid of buttons, return the time per button in µs"""
+    container = QWidget()
+    layout = QGridLayout(container)
+    start = time.perf_counter()
+    for i, emoji in enumerate(emojis):
+      layout.addWidget(make_button(emoji), i // 8, i % 8)
+    container.show()
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+    container.deleteLater()
+    app.processEvents()
+    return elapsed / len(emojis) * 1e6
+
+  def legacy_button(emoji):
+    button = QPushButton(emoji)
+    button.setFont(QFont("Noto Color Emoji", 14))
+    button.setStyleSheet(LEGACY_BUTTON_STYLE)
+    return button
+
+  def themed_button(emoji):
+    button = QPushButton(emoji)
+    button.setObjectName("emojiButton")
+    button.setFont(theme.emoji_font(24))
+    return button
+
+  legacy_us = min(build(legacy_button) for _ in range(3))
+  theme.apply_theme(app, "light")
+  themed_us = min(build(themed_button) for _ in range(3))
+
+  # Switching theme with a grid of buttons up
+  container = QWidget()
+  layout = QGridLayout(container)
+  for i, emoji in enumerate(emojis):
+    layout.addWidget(themed_button(emoji), i // 8, i % 8)
+  container.show()
+  app.processEvents()
+  start = time.perf_counter()
+  for name in ("dark", "light", "dark", "light"):
+    theme.apply_theme(app, name)
+    app.processEvents()
+  switch_ms = (time.perf_counter() - start) / 4 * 1000
+  return {
+    "buttons": len(emojis),
+    "legacy_button_us": round(legacy_us, 1),
+    "themed_button_us": round(themed_us, 1),
+    "theme_switch_ms": round(switch_ms, 2),
+  }
+
+def bench_clipboard():
+  """Time from a pick to the hidden window, copying in process and on the fallback thread"""
+  os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+  from PyQt5.QtWidgets import QApplication, QWidget
+  from clipboard import Clipboard
+  app = QApplication.instance() or QApplication([])
+  window = QWidget()
+  emojis = ["😀", "🐈", "❤️", "🎉", "👍", "🔥", "🍕", "🚀"] * 25
+
+  def copy_to_hide_us(clipboard):
+    timings = []
+    for emoji in emojis:
+      window.show()
+      app.processEvents()
+      start = time.perf_counter()
+      clipboard.copy(emoji)
+      window.hide()
+      timings.append(time.perf_counter() - start)
+    app.processEvents()
+    timings.sort()
+    return round(timings[len(timings) // 2] * 1e6, 1)
+
+  qt_us = copy_to_hide_us(Clipboard("qt"))
+  fallback = Clipboard("pyperclip")
+  fallback_us = copy_to_hide_us(fallback)
+  fallback.shutdown()
+  # The least a pick paid when it started xclip, xsel or wl-copy before hiding
+  spawns = []
+  for _ in range(20):
+    start = time.perf_counter()
+    subprocess.run(["true"])
+    spawns.append(time.perf_counter() - start)
+  spawns.sort()
+  return {
+    "qt_copy_to_hide_us": qt_us,
+    "fallback_copy_to_hide_us": fallback_us,
+    "process_spawn_us": round(spawns[len(spawns) // 2] * 1e6, 1),
+  }
+
+def bench_search():
+  from indexer import EmojiIndexer
+  indexer = EmojiIndexer()
+  indexer.ensure_index_exists()
+  terms = list(indexer.inverted_index)
+
+  def linear_partial(query):
+    # The term scan partial matches used before the suffix array
+    return [term for word in query.split() for term in terms if word in term]
+
+  return {
+    "exact_us": median_us(indexer.search, EXACT_QUERIES),
+    "partial_us": median_us(indexer.search, PARTIAL_QUERIES),
+    "partial_scan_us": median_us(linear_partial, PARTIAL_QUERIES, repeat=3),
+    "fuzzy_us": median_us(indexer.search, FUZZY_QUERIES),
+  }
+
+def bench_batch():
+  """search_many over a chat-like stream of queries against one search per query"""
+  import random
+  from emoji_data import EmojiData
+  emoji_data = EmojiData().load()
+  emoji_data.search_cache_size = 0
+  # Words of chat messages repeat a lot, draw them from a small vocabulary
+  vocabulary = [query for queries in LATENCY_QUERIES.values() for query in queries]
+  vocabulary += [keywords[0].replace("_", " ") for keywords in
+                 (emoji_data.get_emoji_keywords(emoji) for emoji in emoji_data.get_all_emojis()[::10]) if keywords]
+  queries = random.Random(7).choices(vocabulary, k=5000)
+
+  start = time.perf_counter()
+  for query in queries:
+    emoji_data.search(query, 10)
+  single = time.perf_counter() - start
+  start = time.perf_counter()
+  emoji_data.search_many(queries, 10)
+  batch = time.perf_counter() - start
+  return {
+    "queries": len(queries),
+    "single_us": round(single / len(queries) * 1e6, 1),
+    "batch_us": round(batch / len(queries) * 1e6, 1),
+    "batch_qps": round(len(queries) / batch),
+  }
+
+def bench_server():
+  """Round trips to a query server from a client that loads nothing itself"""
+  import random
+  from query_client import QueryClient
+  directory = tempfile.mkdtemp()
+  path = os.path.join(directory, "query.sock")
+  server = subprocess.Popen([sys.executable, os.path.join(BASE_DIR, "cli.py"), "serve", "--no-recents",
+                             "--socket", path], stderr=subprocess.DEVNULL)
+  try:
+    deadline = time.monotonic() + 30
+    while not os.path.exists(path):
+      if time.monotonic() > deadline or server.poll() is not None:
+        raise RuntimeError("Query server did not start")
+      time.sleep(0.01)
+    queries = [query for queries in LATENCY_QUERIES.values() for query in queries]
+    stream = random.Random(7).choices(queries, k=5000)
+    with QueryClient(path) as client:
+      p50, _, p99 = percentiles_us(lambda query: client.search(query, 10), queries)
+      start = time.perf_counter()
+      client.search_many(stream, 10, pipelined=True)
+      pipelined = time.perf_counter() - start
+      start = time.perf_counter()
+      client.search_many(stream, 10)
+      batch = time.perf_counter() - start
+    return {
+      "round_trip_p50_us": p50,
+      "round_trip_p99_us": p99,
+      "pipelined_qps": round(len(stream) / pipelined),
+      "batch_qps": round(len(stream) / batch),
+    }
+  finally:
+    server.terminate()
+    server.wait()
+    shutil.rmtree(directory, ignore_errors=True)
+
+# Keystroke by keystroke queries, including backspacing and retyping
+TYPING_TRACES = [
+  ["f", "fa", "fac", "face", "face s", "face sm", "face smi", "face smil", "face smile"],
+  ["h", "he", "hea", "hear", "heart", "heart r", "heart re", "heart", "heart b", "heart bl", "heart blu", "heart blue"],
+  ["c", "ca", "cat", "cat f", "cat fa", "cat fac", "cat face", "cat fa", "cat f", "cat", "cat d", "cat do", "cat dog"],
+  ["f", "fl", "fla", "flag", "flag u", "flag us", "flag u", "flag", "flag i", "flag in"],
+]
+
+def bench_typing():
+  from emoji_data import EmojiData
+
+  def replay(emoji_data):
+    start = time.perf_counter()
+    for trace in TYPING_TRACES:
+      for query in trace:
+        emoji_data.search(query, 96)
+    return round((time.perf_counter() - start) * 1000, 2)
+
+  uncached = EmojiData().load()
+  uncached.search_cache_size = 0
+  cached = EmojiData().load()
+  uncached_ms = replay(uncached)
+  cached_ms = replay(cached)
+  stats = cached.cache_stats()
+  return {
+    "lru_off_ms": uncached_ms,
+    "lru_on_ms": cached_ms,
+    "hit_rate": round(stats["hit_rate"], 2),
+    "refinements": stats["refinements"],
+  }
+
+def bench_completion():
+  """Keyword completion per keystroke, with the prefix table against a scan of the term dictionary"""
+  from completion import CompletionIndex
+  from indexer import EmojiIndexer
+  indexer = EmojiIndexer()
+  indexer.ensure_index_exists()
+  start = time.perf_counter()
+  completions = CompletionIndex(indexer.store)
+  build_ms = (time.perf_counter() - start) * 1000
+  # Every prefix of every word typed in the traces
+  prefixes = sorted({word[:size] for trace in TYPING_TRACES for query in trace
+                     for word in query.split() for size in range(1, len(word) + 1)})
+
+  def scan(prefix):
+    """Find the best completions by looking at every term"""
+    matches = [(completions.weights[term_id], term) for term_id, term in enumerate(completions.terms)
+               if completions.weights[term_id] is not None and term.startswith(prefix) and term != prefix]
+    return heapq.nlargest(8, matches)
+
+  p50, _, p99 = percentiles_us(completions.complete, prefixes)
+  scan_p50, _, scan_p99 = percentiles_us(scan, prefixes, repeat=3)
+  return {
+    "terms": len(completions),
+    "build_ms": round(build_ms, 2),
+    "complete_p50_us": p50,
+    "complete_p99_us": p99,
+    "scan_p50_us": scan_p50,
+    "scan_p99_us": scan_p99,
+  }
+
+def bench_stale_results():
+  """Type the traces into an offscreen window faster than searches finish and check every paint"""
+  import random
+  os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+  from PyQt5.QtWidgets import QApplication
+  from emoji_data import EmojiData
+  from main import GlyphGrabMainWindow
+
+  app = QApplication.instance() or QApplication([])
+  window = GlyphGrabMainWindow()
+
+  # What each query should show, from a separate EmojiData set up like the window's
+  reference = EmojiData()
+  reference.set_fuzzy_search(window.emoji_data.fuzzy)
+  reference.set_usage_scores(window.config.get_usage_scores())
+  expected = {query: reference.search(query, 96) for trace in TYPING_TRACES for query in trace}
+  # Slow every search down so queries overlap in the worker thread
+  search_ranked = window.emoji_data.search_ranked
+  def slow_search_ranked(query, *args):
+    time.sleep(0.005)
+    return search_ranked(query, *args)
+  window.emoji_data.search_ranked = slow_search_ranked
+
+  paints = []
+  def record_paint():
+    # The model must only ever hold the results of the query in the search bar
+    paints.append(window.search_model.emojis == expected[window.search_bar.text()])
+  window.search_model.modelReset.connect(record_paint)
+
+  def wait(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+      app.processEvents()
+
+  rng = random.Random(0)
+  settled = True
+  for trace in TYPING_TRACES:
+    for query in trace:
+      window.search_bar.setText(query)
+      # Search on every keystroke instead of waiting for the debounce
+      window.search_timer.stop()
+      window.perform_search()
+      wait(rng.uniform(0, 0.01))
+    deadline = time.perf_counter() + 2
+    while window.shown_generation != window.search_generation and time.perf_counter() < deadline:
+      app.processEvents()
+    settled = settled and window.shown_generation == window.search_generation
+    record_paint()
+  window.close()
+
+  return {
+    "queries": sum(len(trace) for trace in TYPING_TRACES),
+    "paints": len(paints),
+    "stale_paints": paints.count(False),
+    "settled": settled,
+  }
+
+SCENARIOS = {
+  "legacy": bench_legacy_load,
+  "store": bench_store_load,
+  "emoji_data": bench_emoji_data,
+  "startup": bench_startup,
+  "index": bench_index,
+  "update": bench_update,
+  "search": bench_search,
+  "latency": bench_latency,
+  "typing": bench_typing,
+  "completion": bench_completion,
+  "batch": bench_batch,
+  "server": bench_server,
+  "window": bench_window,
+  "theme": bench_theme,
+  "clipboard": bench_clipboard,
+  "stale": bench_stale_results,
+}
+
+# Metrics where a higher value is a regression, the rest are informational
+LOWER_IS_BETTER = ("_ms", "_us", "_kb", "stale_paints")
+
+def run_scenario(name):
+  """Run one scenario in this process and return its measurements"""
+  return {"scenario": name, **SCENARIOS[name]()}
+
+def run_child(name, home):
+  """Run one scenario in a fresh interpreter with an empty home directory"""
+  env = dict(os.environ, HOME=home, QT_QPA_PLATFORM="offscreen")
+  output = subprocess.run([sys.executable, __file__, "--child", name], env=env,
+                          capture_output=True, text=True, check=True).stdout
+  result = json.loads(output)
+  del result["scenario"]
+  return result
+
+def median_result(runs):
+  """Combine repeated runs of a scenario, taking the median of every number"""
+  combined = {}
+  for key, value in runs[0].items():
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+      values = sorted(run[key] for run in runs)
+      combined[key] = values[len(values) // 2]
+    else:
+      combined[key] = value
+  return combined
+
+def compare(baseline, results, threshold):
+  """Print metrics that got worse than baseline by more than threshold percent, return them"""
+  regressions = []
+  for name, metrics in results.items():
+    for key, value in metrics.items():
+      old = baseline.get(name, {}).get(key)
+      if old is None or not key.endswith(LOWER_IS_BETTER) or isinstance(value, bool):
+        continue
+      # Counts that should stay at zero regress on any increase
+      limit = old * (1 + threshold / 100) if old else 0
+      if value > limit:
+        change = f"+{(value - old) / old * 100:.0f}%" if old else f"from {old}"
+        regressions.append(f"{name}.{key} {old} -> {value} ({change})")
+  for regression in regressions:
+    print(f"REGRESSION {regression}")
+  return regressions
+
+def main(argv):
+  if argv and argv[0] == "--child":
+    # Keep stdout clean for the parent, only the result goes there
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    result = run_scenario(argv[1])
+    real_stdout.write(json.dumps(result) + "\n")
+    return
+
+  parser = argparse.ArgumentParser(description="Run GlyphGrab benchmarks")
+  parser.add_argument("scenarios", nargs="*", choices=[[]] + list(SCENARIOS), metavar="scenario",
+                      help=f"scenarios to run, all by default: {', '.join(SCENARIOS)}")
+  parser.add_argument("--repeat", type=int, default=1, help="run each scenario this many times, report medians")
+  parser.add_argument("--json", metavar="PATH", help="write the results to a JSON file")
+  parser.add_argument("--compare", metavar="PATH", help="compare against results saved with --json")
+  parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent (default 10)")
+  args = parser.parse_args(argv)
+
+  results = {}
+  with tempfile.TemporaryDirectory() as home:
+    for name in args.scenarios or list(SCENARIOS):
+      results[name] = median_result([run_child(name, home) for _ in range(args.repeat)])
+      metrics = "   ".join(f"{key} {value}" for key, value in results[name].items())
+      print(f"{name:<10} {metrics}")
+
+  if args.json:
+    report = {
+      "python": platform.python_version(),
+      "platform": platform.platform(),
+      "repeat": args.repeat,
+      "scenarios": results,
+    }
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump(report, f, indent=2)
+
+  if args.compare:
+    with open(args.compare, encoding="utf-8") as f:
+      baseline = json.load(f)["scenarios"]
+    if compare(baseline, results, args.threshold):
+      sys.exit(1)
+
+if __name__ == "__main__":
+  main(sys.argv[1:])
@@ -0,0 +1,241 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Headless GlyphGrab for scripts, launchers and terminals.
+
+Never imports Qt, and only imports pyperclip when asked to copy, so a lookup
+costs the index load and nothing else.
+
+  python cli.py search grinning face          # one emoji per line
+  python cli.py search heart --json -n 5      # emojis with their keywords
+  printf 'cat\\ndog\\n' | python cli.py batch   # one result line per query
+  python cli.py pick                          # terminal picker, prints the pick
+  python cli.py serve                         # answer other processes, see query_server.py
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import sys
+import tracing
+
+def load_emoji_data(args):
+  """Load the emoji data set up like the picker"""
+  with tracing.span("import"):
+    from config import Config
+    from emoji_data import EmojiData
+
+  config = Config()
+  emoji_data = EmojiData()
+  emoji_data.set_fuzzy_search(config.settings.get("fuzzy_search", True) and not args.no_fuzzy)
+  # Enabling a locale may build its index
+  locales = args.locales.split(",") if args.locales else config.settings.get("locales", ["en-US"])
+  emoji_data.set_locales(locales)
+  emoji_data.set_skin_tone(config.settings.get("skin_tone", 0) if args.tone is None else args.tone)
+  if not args.no_recents:
+    emoji_data.set_usage_scores(config.get_usage_scores())
+  return config, emoji_data
+
+def describe(emoji_data, emojis):
+  return [{"emoji": emoji, "keywords": emoji_data.get_emoji_keywords(emoji)} for emoji in emojis]
+
+def search_toned(emoji_data, query, limit=None):
+  """Search, with emojis that take a skin tone in the preferred one"""
+  return [emoji_data.with_preferred_tone(emoji) for emoji in emoji_data.search(query, limit)]
+
+def search_command(args):
+  _, emoji_data = load_emoji_data(args)
+  results = search_toned(emoji_data, " ".join(args.query), args.limit)
+  if args.json:
+    print(json.dumps(describe(emoji_data, results), ensure_ascii=False))
+  else:
+    for emoji in results:
+      print(emoji)
+  return 0 if results else 1
+
+def batch_command(args):
+  """Answer every query on stdin with one line of output, in order"""
+  _, emoji_data = load_emoji_data(args)
+  for line in sys.stdin:
+    query = line.strip()
+    results = search_toned(emoji_data, query, args.limit) if query else []
+    if args.json:
+      print(json.dumps({"query": query, "results": describe(emoji_data, results)}, ensure_ascii=False))
+    else:
+      print(" ".join(results))
+    # Launchers read answers as they come
+    sys.stdout.flush()
+  return 0
+
+@contextlib.contextmanager
+def terminal_stdout():
+  """Draw on the terminal even when stdout is captured, like pick=$(python cli.py pick)"""
+  if sys.stdout.isatty():
+    yield
+    return
+  sys.stdout.flush()
+  saved = os.dup(1)
+  with open("/dev/tty", "wb") as tty:
+    os.dup2(tty.fileno(), 1)
+  try:
+    yield
+  finally:
+    os.dup2(saved, 1)
+    os.close(saved)
+
+class Picker:
+  """Curses picker: type to search, arrows to move, Enter to pick, Esc to cancel"""
+
+  def __init__(self, emoji_data, recent_emojis, query=""):
+    self.emoji_data = emoji_data
+    self.recent_emojis = recent_emojis
+    self.query = query
+    self.selected = 0
+    self.scroll = 0
+    self.results = []
+    self.update_results()
+
+  def update_results(self):
+    if self.query.strip():
+      self.results = search_toned(self.emoji_data, self.query)
+    else:
+      # Recents first, then everything else to browse
+      recent = set(self.recent_emojis)
+      self.results = self.recent_emojis + [self.emoji_data.with_preferred_tone(e)
+                                           for e in self.emoji_data.get_all_emojis() if e not in recent]
+    self.selected = 0
+    self.scroll = 0
+
+  def draw(self, screen):
+    import curses
+    screen.erase()
+    height, width = screen.getmaxyx()
+    screen.addnstr(0, 0, f"Search: {self.query}", width - 1)
+    screen.addnstr(1, 0, f"{len(self.results)} results", width - 1, curses.A_DIM)
+
+    rows = max(height - 2, 1)
+    if self.selected < self.scroll:
+      self.scroll = self.selected
+    elif self.selected >= self.scroll + rows:
+      self.scroll = self.selected - rows + 1
+    for row, emoji in enumerate(self.results[self.scroll:self.scroll + rows]):
+      index = self.scroll + row
+      keywords = ", ".join(self.emoji_data.get_emoji_keywords(emoji)[:6])
+      try:
+        # Emojis are wider than their length, so clip by columns rather than characters
+        screen.addnstr(row + 2, 0, f" {emoji}  {keywords}", width - 3)
+        if index == self.selected:
+          screen.chgat(row + 2, 0, width - 1, curses.A_REVERSE)
+      except curses.error:
+        # Writing up to the last screen cell fails, the rest of the row is already drawn
+        pass
+    screen.move(0, min(len("Search: ") + len(self.query), width - 1))
+    screen.refresh()
+
+  def run(self, screen):
+    """Return the picked emoji, or None when cancelled"""
+    import curses
+    curses.use_default_colors()
+    screen.keypad(True)
+    while True:
+      self.draw(screen)
+      try:
+        key = screen.get_wch()
+      except KeyboardInterrupt:
+        return None
+      rows = max(screen.getmaxyx()[0] - 2, 1)
+      if key in ("\n", "\r", curses.KEY_ENTER):
+        return self.results[self.selected] if self.results else None
+      elif key == "\x1b":
+        return None
+      elif key in (curses.KEY_BACKSPACE, "\x7f", "\b"):
+        self.query = self.query[:-1]
+        self.update_results()
+      elif key == curses.KEY_UP:
+        self.selected = max(self.selected - 1, 0)
+      elif key == curses.KEY_DOWN:
+        self.selected = min(self.selected + 1, max(len(self.results) - 1, 0))
+      elif key == curses.KEY_PPAGE:
+        self.selected = max(self.selected - rows, 0)
+      elif key == curses.KEY_NPAGE:
+        self.selected = min(self.selected + rows, max(len(self.results) - 1, 0))
+      elif isinstance(key, str) and key.isprintable():
+        self.query += key
+        self.update_results()
+
+def pick_command(args):
+  import curses
+  # Esc should cancel right away, not after the default one second
+  os.environ.setdefault("ESCDELAY", "25")
+
+  config, emoji_data = load_emoji_data(args)
+  picker = Picker(emoji_data, config.get_recent_emojis(), " ".join(args.query))
+  with terminal_stdout():
+    emoji = curses.wrapper(picker.run)
+  if emoji is None:
+    return 1
+
+  config.add_recent_emoji(emoji)
+  if args.copy:
+    import pyperclip
+    pyperclip.copy(emoji)
+  print(emoji)
+  return 0
+
+def serve_command(args):
+  # A long running server says where it listens and what it loads
+  logging.basicConfig(level=logging.INFO, format="%(message)s")
+  from query_server import serve
+  config, emoji_data = load_emoji_data(args)
+  try:
+    serve(emoji_data, None if args.no_recents else config, args.socket)
+  except RuntimeError as e:
+    print(e, file=sys.stderr)
+    return 1
+  return 0
+
+def build_parser():
+  parser = argparse.ArgumentParser(prog="glyphgrab", description="Find emojis without the GUI")
+  # Shared by every command so they can go anywhere after it
+  common = argparse.ArgumentParser(add_help=False)
+  common.add_argument("--no-fuzzy", action="store_true", help="do not match misspelled words")
+  common.add_argument("--no-recents", action="store_true", help="rank without your emoji usage history")
+  common.add_argument("--locales", metavar="LIST", help="comma separated locales to search, like en-US,de")
+  common.add_argument("--tone", type=int, choices=range(6), help="skin tone, 0 default to 5 dark")
+  common.add_argument("--trace", action="store_true", help="time startup and searches, see tracing.py")
+  common.add_argument("-v", "--verbose", action="store_true", help="log index loading and saving to stderr")
+  commands = parser.add_subparsers(dest="command", required=True)
+
+  search = commands.add_parser("search", parents=[common], help="print the emojis matching a query")
+  search.add_argument("query", nargs="+")
+  search.add_argument("-n", "--limit", type=int, default=None, help="print at most this many")
+  search.add_argument("--json", action="store_true", help="print a JSON list with keywords")
+  search.set_defaults(run=search_command)
+
+  batch = commands.add_parser("batch", parents=[common], help="answer one query per stdin line")
+  batch.add_argument("-n", "--limit", type=int, default=10, help="results per query (default 10)")
+  batch.add_argument("--json", action="store_true", help="print one JSON object per query")
+  batch.set_defaults(run=batch_command)
+
+  pick = commands.add_parser("pick", parents=[common], help="pick an emoji in the terminal and print it")
+  pick.add_argument("query", nargs="*")
+  pick.add_argument("--copy", action="store_true", help="also copy the pick to the clipboard")
+  pick.set_defaults(run=pick_command)
+
+  serve = commands.add_parser("serve", parents=[common], help="answer queries from other processes over a socket")
+  serve.add_argument("--socket", metavar="PATH", help="Unix socket to listen on (default: in XDG_RUNTIME_DIR)")
+  serve.set_defaults(run=serve_command)
+  return parser
+
+def main(argv=None):
+  args = build_parser().parse_args(argv)
+  # Warnings and errors reach stderr either way, stdout only ever has results
+  if args.verbose:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+  if args.trace:
+    tracing.enable()
+  return args.run(args)
+
+if __name__ == '__main__':
+  sys.exit(main())
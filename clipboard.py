@@ -0,0 +1,119 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Copying picks to the clipboard.
+
+The emoji is set on the application's QClipboard, in process, so a pick
+spawns no xclip, xsel or wl-copy. Where Qt has no system clipboard, on the
+offscreen and minimal platforms, or with "clipboard": "pyperclip" in the
+config, pyperclip copies on a worker thread instead and the window does not
+wait for it.
+
+On X11 and Wayland the clipboard is served by the process that set it and is
+gone when that process exits. A picker that exits after a pick hides, then
+stays up until a clipboard manager (or the next copy) takes the clipboard
+over, like xclip does. Clipboard managers that only save on exit are asked
+to when Qt shuts down.
+"""
+import logging
+
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QClipboard, QGuiApplication
+
+import tracing
+
+BACKENDS = ("auto", "qt", "pyperclip")
+# Platforms where QClipboard is the system clipboard
+QT_PLATFORMS = ("xcb", "wayland", "windows", "cocoa")
+# Platforms where the clipboard is lost with the process that set it
+SERVED_PLATFORMS = ("xcb", "wayland")
+
+logger = logging.getLogger(__name__)
+
+class PyperclipWorker(QObject):
+  # Whether the copy worked
+  finished = pyqtSignal(bool)
+
+  def copy(self, text):
+    with tracing.span("clipboard copy", backend="pyperclip"):
+      try:
+        # Only imported by the fallback, it is not needed otherwise
+        import pyperclip
+        pyperclip.copy(text)
+      except Exception as e:
+        logger.error("Error copying to the clipboard: %s", e)
+        self.finished.emit(False)
+        return
+    self.finished.emit(True)
+
+class Clipboard(QObject):
+  # Copying runs on the worker thread, queued so copy() returns right away
+  copy_requested = pyqtSignal(str)
+  # Emitted once by release() when the process may exit without losing the copy
+  released = pyqtSignal()
+
+  def __init__(self, backend="auto", parent=None):
+    super().__init__(parent)
+    self.platform = QGuiApplication.platformName()
+    if backend not in BACKENDS:
+      logger.warning("Unknown clipboard backend %r, using auto", backend)
+      backend = "auto"
+    if backend == "auto":
+      backend = "qt" if self.platform in QT_PLATFORMS else "pyperclip"
+    self.backend = backend
+    self.clipboard = QGuiApplication.clipboard()
+    # Copies queued on the worker thread and not done yet
+    self.pending = 0
+    self.releasing = False
+    self.handoff_span = None
+
+    self.thread = None
+    if backend == "pyperclip":
+      self.thread = QThread()
+      self.worker = PyperclipWorker()
+      self.worker.moveToThread(self.thread)
+      self.copy_requested.connect(self.worker.copy)
+      self.worker.finished.connect(self.copy_finished)
+      self.thread.start()
+    else:
+      self.clipboard.dataChanged.connect(self.check_released)
+
+  def copy(self, text):
+    """Put text on the clipboard, without waiting on another process"""
+    if self.backend == "qt":
+      with tracing.span("clipboard copy", backend="qt"):
+        self.clipboard.setText(text, QClipboard.Clipboard)
+    else:
+      self.pending += 1
+      self.copy_requested.emit(text)
+
+  def copy_finished(self, ok):
+    self.pending -= 1
+    self.check_released()
+
+  def is_held(self):
+    """Whether exiting now would lose a copy"""
+    if self.pending:
+      return True
+    # The fallback's helpers serve the clipboard on their own
+    return self.backend == "qt" and self.platform in SERVED_PLATFORMS and self.clipboard.ownsClipboard()
+
+  def release(self):
+    """Emit released as soon as the process may exit, once a clipboard manager owns the copy"""
+    self.releasing = True
+    self.handoff_span = tracing.start_span("clipboard handoff", backend=self.backend)
+    # Not from inside the caller, which is still handling the pick
+    QTimer.singleShot(0, self.check_released)
+
+  def check_released(self):
+    if self.releasing and not self.is_held():
+      self.releasing = False
+      tracing.end_span(self.handoff_span)
+      self.released.emit()
+
+  def shutdown(self):
+    """Stop the worker thread, waiting for a copy in progress"""
+    if self.thread is not None:
+      self.thread.quit()
+      self.thread.wait()
+      self.thread = None
@@ -0,0 +1,100 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Keyword completion for the word being typed.
+
+Built once per index from its sorted term table. A keyword is worth more the
+more emojis it finds, and more again when those are emojis the user picks.
+Short prefixes match hundreds of keywords, so their best few are worked out
+when the index is loaded; longer ones are a bisect into the sorted terms and
+a pick of the best of the few keywords in range. Keywords the user's picks
+boost are few and kept apart, so a pick never rebuilds the table.
+"""
+import heapq
+import math
+import re
+from bisect import bisect_left
+
+# Completions kept per prefix, and the longest prefix with a table entry
+TOP_N = 8
+TABLE_PREFIX = 3
+# Most a user's picks add to a keyword, log(1 + postings) is up to about 7
+USAGE_WEIGHT = 2.0
+
+WORD_RE = re.compile(r'\w+')
+_LAST_WORD_RE = re.compile(r'\w+$')
+
+def split_last_word(text):
+  """Split a query into what comes before the word being typed and that word"""
+  match = _LAST_WORD_RE.search(text)
+  if match is None:
+    return text, ""
+  return text[:match.start()], match.group()
+
+class CompletionIndex:
+  """Word-like keywords of one index by prefix, most popular first"""
+
+  def __init__(self, store):
+    index = store.index
+    self.store = store
+    # The index keeps terms sorted, so this list is too
+    self.terms = [index.term(term_id) for term_id in range(index.term_count)]
+    # Emoticons and names with spaces are not typed as one word, they are never offered
+    self.weights = [math.log1p(len(index.postings(term_id))) if WORD_RE.fullmatch(term) else None
+                    for term_id, term in enumerate(self.terms)]
+    self.boosts = {}
+    self.boosted = []
+
+    # Best term ids of every short prefix, walking the terms best first fills each
+    by_weight = sorted((term_id for term_id, weight in enumerate(self.weights) if weight is not None),
+                       key=lambda term_id: (-self.weights[term_id], term_id))
+    self.table = {}
+    for term_id in by_weight:
+      term = self.terms[term_id]
+      for size in range(1, min(len(term), TABLE_PREFIX) + 1):
+        best = self.table.setdefault(term[:size], [])
+        # One more, the prefix itself is not offered when it is a term
+        if len(best) <= TOP_N:
+          best.append(term_id)
+
+  def __len__(self):
+    return len(self.terms)
+
+  def set_usage(self, usage):
+    """Boost the keywords of picked emojis, usage is {emoji id: boost} like Ranker.usage"""
+    index = self.store.index
+    top = max(usage.values(), default=0)
+    boosts = {}
+    for emoji_id, boost in usage.items():
+      share = USAGE_WEIGHT * boost / top
+      for keyword_id in index.keyword_ids(emoji_id):
+        keyword = self.terms[keyword_id]
+        # Parts of compound keywords are terms of their own, "grinning_face" -> "grinning"
+        term_ids = [keyword_id] + [index.find_term(part) for part in keyword.split("_") if part != keyword]
+        for term_id in term_ids:
+          if term_id >= 0 and self.weights[term_id] is not None and boosts.get(term_id, 0) < share:
+            boosts[term_id] = share
+    # Swapped in whole, completions on the GUI thread keep reading the old ones
+    self.boosted = sorted(boosts)
+    self.boosts = boosts
+
+  def score(self, term_id):
+    return self.weights[term_id] + self.boosts.get(term_id, 0.0)
+
+  def complete(self, prefix, limit=TOP_N):
+    """Return [(score, keyword)] of the best keywords longer than prefix starting with it, at most TOP_N"""
+    prefix = prefix.lower()
+    if not prefix:
+      return []
+    start = bisect_left(self.terms, prefix)
+    # No term has a character past U+10FFFF, so this ends the range
+    end = bisect_left(self.terms, prefix + "\U0010ffff", start)
+    if len(prefix) <= TABLE_PREFIX:
+      candidates = set(self.table.get(prefix, ()))
+    else:
+      candidates = {term_id for term_id in range(start, end) if self.weights[term_id] is not None}
+    boosted = self.boosted
+    candidates.update(boosted[bisect_left(boosted, start):bisect_left(boosted, end)])
+    candidates.discard(start if start < end and self.terms[start] == prefix else -1)
+    best = heapq.nsmallest(min(limit, TOP_N), candidates, key=lambda term_id: (-self.score(term_id), term_id))
+    return [(self.score(term_id), self.terms[term_id]) for term_id in best]
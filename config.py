@@ -2,9 +2,21 @@
 #  Licensed under the MIT license. See LICENSE file in the project root for details.
 import os
 import json
+import logging
 from pathlib import Path
+import tracing
+from usage import UsageStore
+
+logger = logging.getLogger(__name__)
 
 class Config:
+  """
+  User settings and usage history under ~/.config/glyphgrab.
+  
+  Constructing one only reads config.json if there is one: directories and
+  files are created when something is first saved.
+  """
+  
   def __init__(self):
     # Application paths
     self.app_name = "GlyphGrab"
@@ -13,12 +25,9 @@ class Config:
     # Get user config directory
     self.config_dir = Path.home() / ".config" / "glyphgrab"
     self.data_dir = self.config_dir / "data"
+    # Only read once to migrate to the usage log
     self.recent_emojis_file = self.data_dir / "recent.json"
     
-    # Create directories if they don't exist
-    self.config_dir.mkdir(parents=True, exist_ok=True)
-    self.data_dir.mkdir(parents=True, exist_ok=True)
-    
     # Default settings
     self.default_config = {
       "max_recent_emojis": 24,
@@ -26,62 +35,66 @@ class Config:
       "window_width": 500,
       "window_height": 500,
       "theme": "system",  # system, light, dark
+      "resident": True,  # keep running hidden between picks
+      "fuzzy_search": True,  # find "smilling" and "hert" despite the typos
+      "locales": ["en-US"],  # emoji-<locale>.json packs to search, see USER_GUIDE.md
+      "skin_tone": 0,  # 0 default yellow, 1 light to 5 dark
+      "clipboard": "auto",  # auto, qt (in process) or pyperclip
     }
     
-    # Load or create config file
+    # Load the config file, the defaults apply until one is saved
     self.config_file = self.config_dir / "config.json"
     self.settings = self.load_config()
     
+    # Loaded on first use, so callers that never need history don't read it
+    self.usage = None
+    
+  @tracing.traced("config load")
   def load_config(self):
-    """Load config from file or create default"""
+    """Load config from file, or the defaults if there is none"""
     if self.config_file.exists():
       try:
         with open(self.config_file, 'r') as f:
           return json.load(f)
       except Exception as e:
-        print(f"Error loading config: {e}")
-        return self.default_config
-    else:
-      self.save_config(self.default_config)
-      return self.default_config
+        logger.error("Error loading config: %s", e)
+    return dict(self.default_config)
       
   def save_config(self, config):
     """Save config to file"""
     try:
+      self.config_dir.mkdir(parents=True, exist_ok=True)
       with open(self.config_file, 'w') as f:
         json.dump(config, f, indent=2)
     except Exception as e:
-      print(f"Error saving config: {e}")
+      logger.error("Error saving config: %s", e)
+  
+  def write_default_config(self):
+    """Write the default settings for the user to edit, if there is no config file yet"""
+    if not self.config_file.exists():
+      self.save_config(self.default_config)
   
+  def get_usage(self):
+    """Return the usage store, loading it on first use"""
+    if self.usage is None:
+      with tracing.span("usage load"):
+        self.usage = UsageStore(self.data_dir, self.settings.get("max_recent_emojis", 24),
+                                legacy_recent_file=self.recent_emojis_file)
+    return self.usage
+  
+  @tracing.traced("recents load")
   def get_recent_emojis(self):
-    """Load recent emojis from file"""
-    if self.recent_emojis_file.exists():
-      try:
-        with open(self.recent_emojis_file, 'r', encoding='utf-8') as f:
-          return json.load(f)
-      except Exception as e:
-        print(f"Error loading recent emojis: {e}")
-        return []
-    return []
+    """Return recent emojis, most recent first"""
+    usage = self.get_usage()
+    # Other processes may have recorded picks since
+    usage.refresh()
+    return usage.recent_emojis()
+  
+  def get_usage_scores(self):
+    """Return {emoji: frecency} for every emoji used so far"""
+    return self.get_usage().frecency_scores()
     
+  @tracing.traced("recents save")
   def add_recent_emoji(self, emoji):
     """Add emoji to recent list"""
-    recent_emojis = self.get_recent_emojis()
-    
-    # Remove if already exists
-    if emoji in recent_emojis:
-      recent_emojis.remove(emoji)
-      
-    # Add to beginning
-    recent_emojis.insert(0, emoji)
-    
-    # Limit to max_recent_emojis
-    max_recent = self.settings.get("max_recent_emojis", 24)
-    recent_emojis = recent_emojis[:max_recent]
-    
-    # Save to file
-    try:
-      with open(self.recent_emojis_file, 'w', encoding='utf-8') as f:
-        json.dump(recent_emojis, f, ensure_ascii=False)
-    except Exception as e:
-      print(f"Error saving recent emojis: {e}")
+    self.get_usage().record(emoji)
@@ -0,0 +1,170 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Generate an emoji pack from local copies of the Unicode and CLDR data files.
+
+  python corpus_import.py emoji-test.txt annotations/en.xml annotationsDerived/en.xml
+  python corpus_import.py emoji-test.txt de.xml de-derived.xml -o data/emoji-de.json
+
+emoji-test.txt (unicode.org/Public/emoji/<version>/) lists every fully
+qualified emoji in Unicode's order, with its name. The CLDR annotation files
+(common/annotations/<locale>.xml and common/annotationsDerived/<locale>.xml)
+give each one a short name and keywords. Nothing is downloaded.
+
+The new pack is compared with the current one. Emojis that stay keep their
+place and the keywords added to them by hand, new emojis go at the end where
+browsing shows them as New, and emojis Unicode no longer lists are dropped.
+The pack's compiled index is then brought up to date by re-indexing only the
+emojis that changed (see EmojiIndexer.update_index), and --verify checks the
+result byte for byte against a full rebuild.
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+import xml.etree.ElementTree as ElementTree
+
+from index_format import atomic_write
+from indexer import EmojiIndexer, emoji_json_path, index_dir_path
+from variants import TONES, VS16
+
+# CLDR's placeholder for a value inherited from the parent locale
+INHERITED = "↑↑↑"
+
+logger = logging.getLogger(__name__)
+
+def name_keyword(name):
+  """Return the keyword form of an emoji name, "flag: Japan" -> "flag_japan" """
+  return re.sub(r'\W+', '_', name.lower()).strip('_')
+
+def parse_emoji_test(path):
+  """Return [(emoji, name)] of the fully qualified emojis of emoji-test.txt, without tone variants"""
+  emojis = []
+  group = None
+  with open(path, encoding='utf-8') as f:
+    for line in f:
+      if line.startswith("# group:"):
+        group = line.split(":", 1)[1].strip()
+        continue
+      if line.startswith("#") or ";" not in line:
+        continue
+      code_points, rest = line.split(";", 1)
+      status, _, comment = rest.partition("#")
+      # Skin tones are composed by variants.py, the modifiers on their own are no emojis to pick
+      if status.strip() != "fully-qualified" or group == "Component":
+        continue
+      emoji = "".join(chr(int(code_point, 16)) for code_point in code_points.split())
+      if any(tone in emoji for tone in TONES):
+        continue
+      # "# 😀 E1.0 grinning face"
+      parts = comment.strip().split(" ", 2)
+      emojis.append((emoji, parts[2] if len(parts) > 2 else ""))
+  return emojis
+
+def parse_annotations(paths):
+  """Return {emoji without VS16: (name or None, [keyword, ...])} from CLDR annotation files"""
+  annotations = {}
+  for path in paths:
+    for element in ElementTree.parse(path).getroot().iter("annotation"):
+      text = (element.text or "").strip()
+      if not text or text == INHERITED:
+        continue
+      # CLDR leaves out the variation selectors emoji-test.txt has
+      key = element.get("cp", "").replace(VS16, "")
+      name, keywords = annotations.get(key, (None, []))
+      if element.get("type") == "tts":
+        name = text
+      else:
+        keywords = keywords + [keyword.strip() for keyword in text.split("|") if keyword.strip()]
+      annotations[key] = (name, keywords)
+  return annotations
+
+def build_corpus(emoji_test, annotations, previous=None):
+  """
+  Return the {emoji: [name, keyword, ...]} pack for parse_emoji_test() and
+  parse_annotations() output, merged into a previous pack when given.
+  """
+  previous = previous or {}
+  # Packs written by hand may spell an emoji without its variation selectors
+  previous_spelling = {emoji.replace(VS16, ""): emoji for emoji in previous}
+  entries = {}
+  for emoji, test_name in emoji_test:
+    key = emoji.replace(VS16, "")
+    emoji = previous_spelling.get(key, emoji)
+    cldr_name, cldr_keywords = annotations.get(key, (None, []))
+    name = name_keyword(cldr_name or test_name)
+    keywords = [name] if name else []
+    # CLDR capitalizes names ("Japan"), the pack's own keywords keep their case for emoticons like ":D"
+    spelling = {keyword.lower(): keyword for keyword in previous.get(emoji, [])}
+    for keyword in [spelling.get(keyword.lower(), keyword.lower()) for keyword in cldr_keywords] + previous.get(emoji, []):
+      if keyword not in keywords and name_keyword(keyword) != name:
+        keywords.append(keyword)
+    entries[emoji] = keywords
+
+  # Emojis that stay keep their place, new ones follow in Unicode's order
+  corpus = {emoji: entries[emoji] for emoji in previous if emoji in entries}
+  corpus.update((emoji, keywords) for emoji, keywords in entries.items() if emoji not in corpus)
+  return corpus
+
+def diff_corpus(old, new):
+  """Return the (added, removed, changed) emojis between two packs"""
+  added = [emoji for emoji in new if emoji not in old]
+  removed = [emoji for emoji in old if emoji not in new]
+  changed = [emoji for emoji in new if emoji in old and new[emoji] != old[emoji]]
+  return added, removed, changed
+
+def load_pack(path):
+  try:
+    with open(path, encoding='utf-8') as f:
+      return json.load(f)
+  except FileNotFoundError:
+    return {}
+
+def write_pack(path, corpus):
+  os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+  atomic_write(path, json.dumps(corpus, ensure_ascii=False, indent=2).encode('utf-8'))
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(prog="corpus_import", description="Generate an emoji pack from Unicode and CLDR files")
+  parser.add_argument("emoji_test", help="emoji-test.txt of the Unicode version to import")
+  parser.add_argument("annotations", nargs="+", help="CLDR annotation XML files of the pack's locale")
+  parser.add_argument("-o", "--output", default=emoji_json_path, help="pack to write (default: the en-US pack)")
+  parser.add_argument("--index-dir", default=index_dir_path, help="where the compiled index lives")
+  parser.add_argument("--replace", action="store_true", help="ignore the current pack's order and hand-added keywords")
+  parser.add_argument("--dry-run", action="store_true", help="only print what would change")
+  parser.add_argument("--verify", action="store_true", help="check the updated index against a full rebuild")
+  args = parser.parse_args(argv)
+  logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+  previous = load_pack(args.output)
+  corpus = build_corpus(parse_emoji_test(args.emoji_test), parse_annotations(args.annotations),
+                        None if args.replace else previous)
+  added, removed, changed = diff_corpus(previous, corpus)
+  print(f"{len(corpus)} emojis: {len(added)} added, {len(removed)} removed, {len(changed)} with new keywords")
+  if args.dry_run or not (added or removed or changed or list(previous) != list(corpus)):
+    return 0
+
+  write_pack(args.output, corpus)
+  # Locale packs are indexed in the order of the base pack next to them
+  shared_store = None
+  base_path = os.path.join(os.path.dirname(args.output), os.path.basename(emoji_json_path))
+  if os.path.abspath(args.output) != os.path.abspath(base_path):
+    base = EmojiIndexer(base_path, args.index_dir)
+    base.ensure_index_exists()
+    shared_store = base.store
+  indexer = EmojiIndexer(args.output, args.index_dir, shared_store=shared_store)
+  start = time.perf_counter()
+  indexer.ensure_index_exists()
+  print(f"Indexed in {(time.perf_counter() - start) * 1000:.1f} ms")
+  if args.verify:
+    if not indexer.verify_index():
+      print("The updated index does not match a full rebuild", file=sys.stderr)
+      return 1
+    print("The updated index matches a full rebuild")
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
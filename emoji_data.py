@@ -1,74 +1,459 @@
 #  Copyright (c) 2025 Keshav Prajapati
 #  Licensed under the MIT license. See LICENSE file in the project root for details.
 import json
+import logging
 import os
-from indexer import EmojiIndexer
+import threading
+from collections import OrderedDict
+from completion import TOP_N
+from emoji_groups import GROUPS, section_offsets
+from index_format import encode_emoji_order, read_emoji_order, source_stamp, write_index
+from indexer import EmojiIndexer, index_dir_path
+from query import query_key
+from ranking import RankedResults, merge_ranked, recent_usage_scores
+from variants import FEMALE, MALE, supports_tone, with_tone
+import tracing
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 emoji_json_path = os.path.join(BASE_DIR, "data", "emoji-en-US.json")
-index_json_path = os.path.join(BASE_DIR, "data", "index", "inverted_index.json")  # "data/index/inverted_index.json"
+
+# Locale packs are emoji-<locale>.json files next to the base corpus
+LOCALE_PREFIX = "emoji-"
+
+logger = logging.getLogger(__name__)
+
+def locale_of(json_path):
+  """Return the locale of a pack, "en-US" for emoji-en-US.json"""
+  name = os.path.splitext(os.path.basename(json_path))[0]
+  return name[len(LOCALE_PREFIX):] if name.startswith(LOCALE_PREFIX) else name
+
+def locale_pack_path(locale, data_dir):
+  return os.path.join(data_dir, f"{LOCALE_PREFIX}{locale}.json")
+
+def order_path_for(json_path, index_dir=index_dir_path):
+  """Return the emoji order sidecar path for an emoji json file, see index_format.py"""
+  name = os.path.splitext(os.path.basename(json_path))[0]
+  return os.path.join(index_dir, name + ".keys")
+
+def available_locales(data_dir=os.path.dirname(emoji_json_path)):
+  """Return the locales there are packs for"""
+  names = sorted(os.listdir(data_dir)) if os.path.isdir(data_dir) else []
+  return [locale_of(name) for name in names if name.startswith(LOCALE_PREFIX) and name.endswith(".json")]
 
 class EmojiData:
-  def __init__(self, json_path=emoji_json_path):
+  """
+  The emoji search engine: packs, their indexes, ranking and the query cache.
+  
+  Constructing one does no I/O, the base index is loaded (or built, and
+  saved unless persist is off) by load() or by the first call that needs it.
+  Browsing only needs the emoji order, which comes from a small sidecar
+  file, so a picker can show its first chunk before the index is ready.
+  One instance can be shared: searches may run from any number of threads at
+  once. Settings only take a small lock of their own, never the load lock, so
+  a window setting them on its GUI thread does not wait for an index build:
+  settings changed during the load are applied when it finishes.
+  """
+  
+  def __init__(self, json_path=emoji_json_path, index_dir=index_dir_path, persist=True):
     self.json_path = json_path
-    self.emojis = {}
+    self.index_dir = index_dir
+    self.persist = persist
+    self.store = None
+    # Corpus emojis in order, known before the index is when browsing first
     self.emoji_keys = []
+    self.order_sections = []
+    self.order_lock = threading.Lock()
     self.indexer = None
     self.is_fully_loaded = False
-    self.load_essential_data()
+    self.loaded = False
+    self.load_lock = threading.RLock()
+    
+    # Applied to every indexer, including ones created later, under settings_lock
+    self.settings_lock = threading.Lock()
+    self.fuzzy = True
+    self.usage_scores = {}
+    
+    # The base pack's locale is searched until set_locales() says otherwise,
+    # other packs get their own indexer only once they are enabled
+    self.base_locale = locale_of(json_path)
+    self.locales = [self.base_locale]
+    # Set by set_locales() before the index is loaded, applied by the load
+    self.requested_locales = None
+    self.locale_indexers = {}
+    # Preferred skin tone, 0 for the default yellow, 1 to 5 for light to dark
+    self.skin_tone = 0
+    
+    # LRU cache of ranked results keyed by normalized query
+    self.search_cache = OrderedDict()
+    self.search_cache_size = 128
+    self.search_cache_store = None
+    self.search_cache_lock = threading.Lock()
+    self.last_search = None
+    self.cache_hits = 0
+    self.cache_misses = 0
+    self.cache_refinements = 0
+    
+  def load(self):
+    """Load the base index now rather than on first use, return self"""
+    self.ensure_loaded()
+    return self
+    
+  def ensure_loaded(self):
+    if self.loaded:
+      return
+    with self.load_lock:
+      if not self.loaded:
+        self.load_essential_data()
+        self.finish_load()
+    
+  def finish_load(self):
+    """Apply the locales and settings changed while loading, then let other threads at the indexers"""
+    applied = None
+    while True:
+      with self.settings_lock:
+        locales = self.requested_locales
+        if locales is applied:
+          for indexer in self.all_indexers():
+            indexer.fuzzy = self.fuzzy
+            indexer.set_usage_scores(self.usage_scores)
+          # Set last, other threads only look at the store once this is true
+          self.loaded = True
+          return
+      # Loading packs takes a while, set_locales() may ask for others meanwhile
+      self.apply_locales(locales)
+      applied = locales
     
+  @tracing.traced("emoji data load")
   def load_essential_data(self):
-    """Load only essential emoji data at startup"""
+    """Load the base index, whose store also holds the emojis, and the enabled locales"""
     try:
-      # Open the file but don't read all data yet
-      with open(self.json_path, 'r', encoding='utf-8') as f:
-        # Just get the keys (emoji characters)
-        self.emojis = json.load(f)
-        self.emoji_keys = list(self.emojis.keys())
-      print(f"Loaded {len(self.emoji_keys)} emoji keys")
-      
-      # Initialize indexer but don't build index yet
       self.init_indexer()
+      self.store = self.indexer.store
+      self.emoji_keys = list(self.store.emojis)
+      logger.info("Loaded %d emoji keys", len(self.emoji_keys))
       
     except Exception as e:
-      print(f"Error loading emoji data: {e}")
-      self.emojis = {}
+      logger.error("Error loading emoji data: %s", e)
+      self.indexer = None
+      self.store = None
       self.emoji_keys = []
+      return
+    
+  def ensure_browsable(self):
+    """Make the emoji order available, without waiting for an index that has to be built"""
+    if self.emoji_keys:
+      return
+    with self.order_lock:
+      if not self.emoji_keys:
+        self.load_emoji_order()
+    
+  @tracing.traced("emoji order load")
+  def load_emoji_order(self):
+    """Read the emoji order from its sidecar, or from the corpus and write the sidecar"""
+    if self.loaded and self.store is not None:
+      self.emoji_keys = list(self.store.emojis)
+      return
+    path = order_path_for(self.json_path, self.index_dir)
+    try:
+      stamp = source_stamp(self.json_path)
+    except OSError as e:
+      logger.error("Error loading emoji data: %s", e)
+      return
+    emojis = read_emoji_order(path, stamp)
+    if emojis is None:
+      # Parsing the corpus is still far cheaper than building the index
+      try:
+        with open(self.json_path, 'r', encoding='utf-8') as f:
+          emojis = list(json.load(f))
+      except (OSError, ValueError) as e:
+        logger.error("Error loading emoji data: %s", e)
+        return
+      if self.persist:
+        try:
+          write_index(path, encode_emoji_order(stamp, emojis))
+        except OSError as e:
+          logger.warning("Error saving emoji order: %s", e)
+    self.order_sections = section_offsets(emojis)
+    self.emoji_keys = emojis
       
   def init_indexer(self):
     """Initialize the emoji indexer"""
-    self.indexer = EmojiIndexer(self.json_path)
-    
-    # Try to load existing index, don't build if not available
-    index_path = index_json_path
-    if os.path.exists(index_path):
-      self.indexer.load_index(index_path)
-    
-  def ensure_index_loaded(self):
-    """Ensure the search index is loaded when needed"""
-    if not self.indexer.is_index_loaded():
-      print("Building search index...")
-      self.indexer.build_index()
-      self.indexer.save_index()
-    
-  def search(self, query):
-    """Search for emojis matching the query"""
+    # The indexer loads the compiled index, rebuilding it if missing or stale
+    self.indexer = self.new_indexer(self.json_path)
+    
+  def new_indexer(self, json_path, shared_store=None):
+    """Return a loaded indexer for a pack, set up with the current settings"""
+    indexer = EmojiIndexer(json_path, self.index_dir, shared_store=shared_store, persist=self.persist)
+    indexer.fuzzy = self.fuzzy
+    indexer.set_usage_scores(self.usage_scores)
+    indexer.ensure_index_exists()
+    return indexer
+    
+  def search(self, query, limit=None):
+    """Search for emojis matching the query, best matches first"""
+    return self.search_ranked(query).top(limit)
+    
+  @tracing.traced("search")
+  def search_ranked(self, query):
+    """Search for emojis matching the query, ranked as far as they are read"""
+    self.ensure_loaded()
     if not self.indexer:
+      return RankedResults((), {})
+    
+    # Queries that only differ in case or spacing share results
+    key = query_key(query)
+    with self.search_cache_lock:
+      if self.search_cache_store is not self.indexer.store:
+        # A rebuilt index makes every cached result stale
+        self.clear_search_cache()
+        self.search_cache_store = self.indexer.store
+      
+      cached = self.search_cache.get(key)
+      if cached is not None:
+        self.search_cache.move_to_end(key)
+        self.cache_hits += 1
+        self.last_search = cached
+        return cached
+      self.cache_misses += 1
+      previous = self.last_search
+    
+    # Narrow down from the previous query while it is being typed
+    indexers = self.search_indexers()
+    if len(indexers) == 1 and self.base_locale in indexers:
+      results = self.indexer.search_ranked(query, previous)
+    else:
+      # Every locale shares the base emoji table, so their hits merge by emoji id
+      parts = {}
+      for locale, indexer in indexers.items():
+        parts[locale] = indexer.search_ranked(query, previous.parts.get(locale) if previous else None)
+      results = merge_ranked(self.store.emojis, parts)
+    
+    with self.search_cache_lock:
+      if results.resumed_words:
+        self.cache_refinements += 1
+      if self.search_cache_size > 0:
+        self.search_cache[key] = results
+        while len(self.search_cache) > self.search_cache_size:
+          self.search_cache.popitem(last=False)
+      self.last_search = results
+    return results
+    
+  @tracing.traced("search many")
+  def search_many(self, queries, limit=None):
+    """
+    Answer a batch of queries, in order, each like search(query, limit).
+    
+    For bulk callers: words shared between queries are looked up once per
+    batch, and the query cache kept for typing is left alone.
+    """
+    self.ensure_loaded()
+    queries = list(queries)
+    if not self.indexer:
+      return [[] for _ in queries]
+    
+    indexers = self.search_indexers()
+    ranked = {locale: indexer.search_many_ranked(queries) for locale, indexer in indexers.items()}
+    answers = {}
+    results = []
+    for i, query in enumerate(queries):
+      key = query_key(query)
+      if key not in answers:
+        if len(indexers) == 1 and self.base_locale in indexers:
+          answers[key] = ranked[self.base_locale][i].top(limit)
+        else:
+          parts = {locale: results_by_query[i] for locale, results_by_query in ranked.items()}
+          answers[key] = merge_ranked(self.store.emojis, parts).top(limit)
+      results.append(list(answers[key]))
+    return results
+    
+  def complete(self, prefix, limit=TOP_N):
+    """
+    Return keywords completing the word prefix in the searched locales, best first.
+    
+    Cheap enough to call on every keystroke from the GUI thread, so it never
+    waits: until prepare_completions() has run there are no completions.
+    """
+    if not self.loaded or not self.indexer:
       return []
+    best = {}
+    for indexer in self.search_indexers().values():
+      completions = indexer.completions
+      if completions is None:
+        continue
+      for score, keyword in completions.complete(prefix, limit):
+        if score > best.get(keyword, -1.0):
+          best[keyword] = score
+    return sorted(best, key=lambda keyword: (-best[keyword], keyword))[:limit]
+    
+  def prepare_completions(self):
+    """Build the keyword completions of the searched locales, off the GUI thread"""
+    self.ensure_loaded()
+    for indexer in self.search_indexers().values():
+      indexer.completion_index()
     
-    # Ensure index is loaded before searching
-    self.ensure_index_loaded()
-    return self.indexer.search(query)
+  def clear_search_cache(self):
+    """Drop cached results, e.g. after the ranking inputs changed"""
+    self.search_cache.clear()
+    self.last_search = None
+    
+  def cache_stats(self):
+    """Return query cache counters so its hit rate can be checked"""
+    lookups = self.cache_hits + self.cache_misses
+    return {
+      "hits": self.cache_hits,
+      "misses": self.cache_misses,
+      "refinements": self.cache_refinements,
+      "size": len(self.search_cache),
+      "hit_rate": self.cache_hits / lookups if lookups else 0.0,
+    }
+    
+  def all_indexers(self):
+    """Return the base indexer and every loaded locale indexer"""
+    indexers = [self.indexer] if self.indexer else []
+    return indexers + list(self.locale_indexers.values())
+    
+  def search_indexers(self):
+    """Return {locale: indexer} for the locales searched"""
+    indexers = {}
+    for locale in self.locales:
+      if locale == self.base_locale:
+        indexers[locale] = self.indexer
+      elif locale in self.locale_indexers:
+        indexers[locale] = self.locale_indexers[locale]
+    return indexers
+    
+  def set_locales(self, locales):
+    """
+    Search the packs of these locales, loading (or building) their indexes with the base one.
+    
+    During the load this only records them, the load applies them when it finishes.
+    """
+    with self.settings_lock:
+      self.requested_locales = list(locales)
+      loaded = self.loaded
+    if loaded:
+      self.apply_locales(self.requested_locales)
+    
+  @tracing.traced("locales load")
+  def apply_locales(self, locales):
+    with self.load_lock:
+      if not self.indexer or self.store is None:
+        return
+      data_dir = os.path.dirname(self.json_path)
+      # Searches on other threads keep reading the old dict, so build a new one
+      locale_indexers = {}
+      enabled = []
+      for locale in locales:
+        if locale != self.base_locale and locale not in locale_indexers:
+          indexer = self.locale_indexers.get(locale)
+          if indexer is None:
+            path = locale_pack_path(locale, data_dir)
+            if not os.path.exists(path):
+              logger.warning("No emoji pack for locale %s", locale)
+              continue
+            indexer = self.new_indexer(path, shared_store=self.store)
+          locale_indexers[locale] = indexer
+        if locale not in enabled:
+          enabled.append(locale)
+      
+      # Packs that were turned off are released with their last reference, not
+      # closed here, since a search on another thread may still be reading one
+      with self.settings_lock:
+        # Settings changed while new packs were loading
+        for indexer in locale_indexers.values():
+          indexer.fuzzy = self.fuzzy
+          indexer.set_usage_scores(self.usage_scores)
+        self.locale_indexers = locale_indexers
+        self.locales = enabled or [self.base_locale]
+    with self.search_cache_lock:
+      self.clear_search_cache()
+    
+  def set_fuzzy_search(self, enabled):
+    """Turn typo tolerant matching on or off"""
+    with self.settings_lock:
+      self.fuzzy = enabled
+      # Indexers still loading get it from finish_load()
+      if self.loaded:
+        for indexer in self.all_indexers():
+          indexer.fuzzy = enabled
+    with self.search_cache_lock:
+      self.clear_search_cache()
+    
+  def set_recent_emojis(self, recent_emojis):
+    """Let the user's recent picks lift those emojis in search results"""
+    self.set_usage_scores(recent_usage_scores(recent_emojis))
+    
+  def set_usage_scores(self, usage_scores):
+    """Let frecency, {emoji: score}, lift often and recently used emojis in search results"""
+    with self.settings_lock:
+      self.usage_scores = dict(usage_scores)
+      if self.loaded:
+        for indexer in self.all_indexers():
+          indexer.set_usage_scores(self.usage_scores)
+    # Cached rankings include the old usage boost
+    with self.search_cache_lock:
+      self.clear_search_cache()
+    
+  def set_skin_tone(self, tone):
+    """Show and copy emojis that take a skin tone in tone, 0 to 5"""
+    self.skin_tone = tone if tone in range(6) else 0
+    
+  def with_preferred_tone(self, emoji):
+    """Return emoji in the preferred skin tone, composed here rather than stored in the index"""
+    if not self.skin_tone:
+      return emoji
+    # Before the index is loaded the flag it stores is worked out on the spot
+    if not (self.store.supports_tone(emoji) if self.loaded and self.store else supports_tone(emoji)):
+      return emoji
+    return with_tone(emoji, self.skin_tone)
+    
+  def get_variants(self, emoji):
+    """Return rows of gender and skin tone variants of a corpus emoji, see EmojiStore.variants"""
+    if self.loaded and self.store:
+      return self.store.variants(emoji)
+    # Worked out from the emoji order until the index, which stores the flags, is loaded
+    self.ensure_browsable()
+    emojis = set(self.emoji_keys)
+    if emoji not in emojis:
+      return []
+    forms = [emoji] + [emoji + suffix for suffix in (MALE, FEMALE) if emoji + suffix in emojis]
+    return [[form] + [with_tone(form, tone) for tone in range(1, 6)] if supports_tone(form) else [form]
+            for form in forms]
     
   def get_all_emojis(self):
     """Return all emoji characters"""
+    self.ensure_browsable()
     return self.emoji_keys
     
   def get_emoji_chunk(self, start=0, count=100):
     """Return a chunk of emojis for lazy loading"""
+    self.ensure_browsable()
     end = min(start + count, len(self.emoji_keys))
     return self.emoji_keys[start:end]
     
+  def get_sections(self):
+    """Return the browsing sections as (group name, label, icon, start, end)"""
+    if self.loaded and self.store:
+      sections = self.store.index.sections()
+    else:
+      # Worked out from the emoji order until the index, which stores them, is loaded
+      self.ensure_browsable()
+      sections = self.order_sections
+    return [GROUPS[section.group] + (section.start, section.end) for section in sections]
+    
+  def section_at(self, offset):
+    """Return the name of the group the emoji at offset belongs to, or None"""
+    for name, _, _, start, end in self.get_sections():
+      if start <= offset < end:
+        return name
+    return None
+    
   def get_emoji_keywords(self, emoji):
-    """Get keywords for a specific emoji"""
-    return self.emojis.get(emoji, [])
+    """Get keywords for a specific emoji in every searched locale"""
+    self.ensure_loaded()
+    if not self.store:
+      return []
+    keywords = []
+    for indexer in self.search_indexers().values():
+      keywords.extend(keyword for keyword in indexer.store.keywords(emoji) if keyword not in keywords)
+    return keywords
@@ -0,0 +1,61 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Emoji groups for jump-to-section browsing.
+
+The corpus lists emojis in Unicode's group order (smileys first, flags
+last), followed by emojis from newer Unicode versions. A group starts at
+its first emoji, the flags run as long as emojis are flags by code point,
+and whatever follows them is the "new" group. The sections are worked out
+once when the index is built and stored in it as offsets into the corpus.
+"""
+from collections import namedtuple
+
+Section = namedtuple("Section", "group start end")
+
+# (name, label, first emoji of the group in the corpus)
+GROUPS = (
+  ("smileys", "Smileys & Emotion", "😀"),
+  ("people", "People & Body", "👋"),
+  ("animals", "Animals & Nature", "🐵"),
+  ("food", "Food & Drink", "🍇"),
+  ("travel", "Travel & Places", "🌍"),
+  ("activities", "Activities", "🎃"),
+  ("objects", "Objects", "👓"),
+  ("symbols", "Symbols", "🏧"),
+  ("flags", "Flags", "🏁"),
+  ("new", "New", "🆕"),
+)
+FLAGS_GROUP = 8
+NEW_GROUP = 9
+
+# Flags that are not regional indicator pairs or tag sequences start with one of these
+_FLAG_STARTS = frozenset("🏁🚩🎌🏴🏳")
+
+def is_flag(emoji):
+  first = ord(emoji[0]) if emoji else 0
+  return 0x1F1E6 <= first <= 0x1F1FF or emoji[:1] in _FLAG_STARTS
+
+def section_offsets(emojis):
+  """Return the Sections of a corpus in order, as [group id, start, end) offsets"""
+  positions = {emoji: i for i, emoji in enumerate(emojis)}
+  starts = []
+  for group, (_, _, first) in enumerate(GROUPS[:NEW_GROUP]):
+    start = positions.get(first)
+    # A group whose first emoji is missing or out of order is part of the one before
+    if start is not None and (not starts or start > starts[-1][1]):
+      starts.append((group, start))
+  if not starts:
+    return [Section(NEW_GROUP, 0, len(emojis))] if emojis else []
+  if starts[0][1] > 0:
+    starts[0] = (starts[0][0], 0)
+
+  if starts[-1][0] == FLAGS_GROUP:
+    end = starts[-1][1]
+    while end < len(emojis) and is_flag(emojis[end]):
+      end += 1
+    if end < len(emojis):
+      starts.append((NEW_GROUP, end))
+
+  ends = [start for _, start in starts[1:]] + [len(emojis)]
+  return [Section(group, start, end) for (group, start), end in zip(starts, ends)]
@@ -0,0 +1,131 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+from bisect import bisect_left
+from fuzzy import deletes, delete_hash, edit_distance, max_distance_for
+from variants import FEMALE, GENDER_FLAG, MALE, TONE_FLAG, strip_tone, with_tone
+
+class EmojiStore:
+  """
+  Immutable emoji corpus and inverted index shared by EmojiData and EmojiIndexer.
+
+  Emojis are identified by their position in the corpus, keywords live once
+  in the index's sorted term table, and posting lists are sorted arrays of
+  emoji ids read straight out of the compiled index.
+
+  Locale indexes are built in the base corpus' emoji order, so their stores
+  reuse the base store's emoji table (shared) instead of holding a copy.
+  """
+
+  def __init__(self, index, shared=None):
+    self.index = index
+    if shared is not None and index.emoji_count == len(shared.emojis):
+      self.emojis = shared.emojis
+      self.emoji_ids = shared.emoji_ids
+    else:
+      self.emojis = tuple(index.emojis())
+      self.emoji_ids = {emoji: i for i, emoji in enumerate(self.emojis)}
+
+  def __len__(self):
+    return len(self.emojis)
+
+  def emoji_id(self, emoji):
+    """Return the id of an emoji, or -1 if it is not in the corpus"""
+    return self.emoji_ids.get(emoji, -1)
+
+  def base_id(self, emoji):
+    """Return the id of an emoji or of the base of its tone variant, or -1"""
+    emoji_id = self.emoji_ids.get(emoji, -1)
+    if emoji_id < 0:
+      emoji_id = self.emoji_ids.get(strip_tone(emoji), -1)
+    return emoji_id
+
+  def supports_tone(self, emoji):
+    emoji_id = self.emoji_ids.get(emoji, -1)
+    return emoji_id >= 0 and bool(self.index.variant_flags(emoji_id) & TONE_FLAG)
+
+  def variants(self, emoji):
+    """Return rows of variants of a corpus emoji: per gender, the emoji then its five tones"""
+    emoji_id = self.emoji_ids.get(emoji, -1)
+    if emoji_id < 0:
+      return []
+    forms = [emoji]
+    if self.index.variant_flags(emoji_id) & GENDER_FLAG:
+      forms += [emoji + suffix for suffix in (MALE, FEMALE) if emoji + suffix in self.emoji_ids]
+    rows = []
+    for form in forms:
+      if self.supports_tone(form):
+        rows.append([form] + [with_tone(form, tone) for tone in range(1, 6)])
+      else:
+        rows.append([form])
+    return rows
+
+  def term_id(self, term):
+    """Return the id of a term, or -1 if it is not indexed"""
+    return self.index.find_term(term)
+
+  def literal_term(self, token):
+    """Return the indexed spelling of a token like ":D" or ":d", or None"""
+    for spelling in (token, token.lower(), token.upper()):
+      if self.index.find_term(spelling) >= 0:
+        return spelling
+    return None
+
+  def terms_with_prefix(self, prefix):
+    """Return the ids of every term starting with prefix"""
+    return range(*self.index.prefix_range(prefix))
+
+  def terms_containing(self, fragment):
+    """Return the ids of every term containing fragment"""
+    return self.index.substring_terms(fragment)
+
+  def similar_terms(self, word):
+    """Return {term id: edit distance} for terms within a few typos of word"""
+    max_distance = max_distance_for(word)
+    candidates = set()
+    for delete in deletes(word, max_distance):
+      candidates.update(self.index.delete_terms(delete_hash(delete)))
+
+    similar = {}
+    for term_id in candidates:
+      distance = edit_distance(word, self.index.term(term_id), max_distance)
+      if distance <= max_distance:
+        similar[term_id] = distance
+    return similar
+
+  def postings(self, term_id):
+    """Return the sorted emoji ids for a term id"""
+    return self.index.postings(term_id)
+
+  def keywords(self, emoji):
+    """Return the keywords of an emoji in corpus order, a tone variant has its base's"""
+    emoji_id = self.base_id(emoji)
+    if emoji_id < 0:
+      return []
+    return [self.index.term(term_id) for term_id in self.index.keyword_ids(emoji_id)]
+
+  def close(self):
+    """Release the underlying index"""
+    self.index.close()
+
+# Past this length ratio, skipping through the longer list by binary search
+# beats hashing the shorter one and probing it with every id of the longer
+SKIP_RATIO = 8
+
+def intersect_sorted(a, b):
+  """Intersect two sorted id arrays, the result is sorted too"""
+  if len(a) > len(b):
+    a, b = b, a
+  if len(b) < SKIP_RATIO * len(a):
+    common = set(a).intersection(b)
+    return [value for value in a if value in common]
+  # Each bisect starts past the last hit, so it skips ahead through b
+  result = []
+  lo, hi = 0, len(b)
+  for value in a:
+    lo = bisect_left(b, value, lo, hi)
+    if lo == hi:
+      break
+    if b[lo] == value:
+      result.append(value)
+      lo += 1
+  return result
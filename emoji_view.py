@@ -0,0 +1,249 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Virtualized emoji grid.
+
+The list view only asks the delegate to paint the cells that are on screen,
+so the number of widgets stays constant however many emojis the model holds.
+Browsing and search results are two models shown in the same view.
+
+Models hold corpus emojis and show them in the preferred skin tone; holding
+a cell down (or right clicking it) offers its other gender and tone variants.
+"""
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QRectF, QSize, QTimer, pyqtSignal
+from PyQt5.QtGui import QPainter
+from PyQt5.QtWidgets import (QListView, QStyledItemDelegate, QStyle, QAbstractItemView,
+                             QFrame, QGridLayout, QToolButton)
+
+from glyph_atlas import glyph_pixel_size
+import theme
+
+EMOJI_CELL_SIZE = 40
+EMOJI_SPACING = 5
+# Holding a cell this long opens its variants instead of copying it
+LONG_PRESS_MS = 450
+
+# Data role of the corpus emoji behind a cell, DisplayRole has it in the preferred tone
+BASE_EMOJI_ROLE = Qt.UserRole
+
+class EmojiListModel(QAbstractListModel):
+  def __init__(self, emojis=None, parent=None, display=None):
+    super().__init__(parent)
+    self.emojis = list(emojis or [])
+    # Maps a corpus emoji to the one shown and copied, like EmojiData.with_preferred_tone
+    self.display = display or (lambda emoji: emoji)
+
+  def rowCount(self, parent=QModelIndex()):
+    return 0 if parent.isValid() else len(self.emojis)
+
+  def data(self, index, role=Qt.DisplayRole):
+    if not index.isValid():
+      return None
+    if role == Qt.DisplayRole:
+      return self.display(self.emojis[index.row()])
+    if role == BASE_EMOJI_ROLE:
+      return self.emojis[index.row()]
+    return None
+
+  def refresh_display(self):
+    """Repaint every cell after the display mapping changed"""
+    if self.emojis:
+      self.dataChanged.emit(self.index(0), self.index(len(self.emojis) - 1), [Qt.DisplayRole])
+
+  def set_emojis(self, emojis):
+    """Replace the emojis shown"""
+    self.beginResetModel()
+    self.emojis = list(emojis)
+    self.endResetModel()
+
+  def append_emojis(self, emojis):
+    """Add emojis after the ones already shown"""
+    if not emojis:
+      return
+    start = len(self.emojis)
+    self.beginInsertRows(QModelIndex(), start, start + len(emojis) - 1)
+    self.emojis.extend(emojis)
+    self.endInsertRows()
+
+  def prepend_emojis(self, emojis):
+    """Add emojis before the ones already shown"""
+    if not emojis:
+      return
+    self.beginInsertRows(QModelIndex(), 0, len(emojis) - 1)
+    self.emojis[:0] = emojis
+    self.endInsertRows()
+
+  def emoji_at(self, row):
+    return self.display(self.emojis[row]) if 0 <= row < len(self.emojis) else None
+
+class EmojiDelegate(QStyledItemDelegate):
+  """Paints one emoji cell, with the rounded hover background the buttons used to have"""
+
+  def __init__(self, cell_size=EMOJI_CELL_SIZE, parent=None):
+    super().__init__(parent)
+    self.cell_size = cell_size
+    self.font = theme.emoji_font(glyph_pixel_size(cell_size))
+    # Pre-rendered glyphs, text is drawn live until it is ready
+    self.atlas = None
+
+  def paint(self, painter, option, index):
+    emoji = index.data()
+    if not emoji:
+      return
+    painter.save()
+    # Center a button sized cell in the grid slot
+    rect = option.rect
+    cell = rect.adjusted((rect.width() - self.cell_size) // 2, (rect.height() - self.cell_size) // 2, 0, 0)
+    cell.setSize(QSize(self.cell_size, self.cell_size))
+    if option.state & QStyle.State_MouseOver:
+      painter.setRenderHint(QPainter.Antialiasing)
+      painter.setPen(Qt.NoPen)
+      painter.setBrush(theme.color("hover"))
+      painter.drawRoundedRect(cell, 5, 5)
+    if not self.paint_from_atlas(painter, cell, emoji):
+      painter.setFont(self.font)
+      painter.drawText(cell, Qt.AlignCenter, emoji)
+    painter.restore()
+
+  def paint_from_atlas(self, painter, cell, emoji):
+    """Blit the emoji's pre-rendered tile, return False if there is none"""
+    if self.atlas is None or not self.atlas.matches(painter.device().devicePixelRatioF()):
+      return False
+    source = self.atlas.source(emoji)
+    if source is None:
+      return False
+    pixmap, source_rect = source
+    size = self.atlas.tile_size()
+    center = QRectF(cell).center()
+    target = QRectF(center.x() - size / 2, center.y() - size / 2, size, size)
+    painter.drawPixmap(target, pixmap, QRectF(source_rect))
+    return True
+
+  def sizeHint(self, option, index):
+    return QSize(self.cell_size, self.cell_size)
+
+class VariantPopup(QFrame):
+  """Popup grid of an emoji's variants, one row per gender and one column per skin tone"""
+  picked = pyqtSignal(str)
+
+  def __init__(self, rows, cell_size=EMOJI_CELL_SIZE, parent=None):
+    super().__init__(parent, Qt.Popup)
+    self.setObjectName("variantPopup")
+    self.setAttribute(Qt.WA_DeleteOnClose)
+    self.setFrameShape(QFrame.StyledPanel)
+    font = theme.emoji_font(glyph_pixel_size(cell_size))
+    layout = QGridLayout(self)
+    layout.setContentsMargins(6, 6, 6, 6)
+    layout.setSpacing(2)
+    for row, variants in enumerate(rows):
+      for column, emoji in enumerate(variants):
+        button = QToolButton(self)
+        button.setObjectName("variantButton")
+        button.setText(emoji)
+        button.setFont(font)
+        button.setFixedSize(cell_size, cell_size)
+        button.clicked.connect(lambda checked=False, emoji=emoji: self.pick(emoji))
+        layout.addWidget(button, row, column)
+
+  def pick(self, emoji):
+    self.close()
+    self.picked.emit(emoji)
+
+class EmojiGridView(QListView):
+  emoji_clicked = pyqtSignal(str)
+
+  def __init__(self, cell_size=EMOJI_CELL_SIZE, parent=None):
+    super().__init__(parent)
+    # Styled by the app stylesheet, see theme.py
+    self.setObjectName("emojiGrid")
+    # A wrapping icon grid of fixed size cells
+    self.setViewMode(QListView.IconMode)
+    self.setFlow(QListView.LeftToRight)
+    self.setWrapping(True)
+    self.setResizeMode(QListView.Adjust)
+    self.setMovement(QListView.Static)
+    self.setUniformItemSizes(True)
+    self.setGridSize(QSize(cell_size + EMOJI_SPACING, cell_size + EMOJI_SPACING))
+    self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+    self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+
+    # Cells act like buttons, nothing is selected or edited
+    self.setSelectionMode(QAbstractItemView.NoSelection)
+    self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+    self.setMouseTracking(True)
+    self.viewport().setAttribute(Qt.WA_Hover, True)
+
+    self.delegate = EmojiDelegate(cell_size, self)
+    self.setItemDelegate(self.delegate)
+    self.clicked.connect(self.emit_emoji)
+
+    # Returns the variant rows of a corpus emoji, see set_variants_provider
+    self.variants_provider = None
+    self.long_press_timer = QTimer(self)
+    self.long_press_timer.setSingleShot(True)
+    self.long_press_timer.setInterval(LONG_PRESS_MS)
+    self.long_press_timer.timeout.connect(self.on_long_press)
+    self.pressed_index = QModelIndex()
+    self.long_pressed = False
+
+  def set_glyph_atlas(self, atlas):
+    """Paint from atlas once it is ready"""
+    self.delegate.atlas = atlas
+    atlas.ready.connect(self.viewport().update)
+
+  def set_variants_provider(self, provider):
+    """Offer provider(emoji)'s variants when a cell is held down or right clicked"""
+    self.variants_provider = provider
+
+  def emit_emoji(self, index):
+    # The press that opened the variants is not a click
+    if self.long_pressed:
+      self.long_pressed = False
+      return
+    emoji = index.data()
+    if emoji:
+      self.emoji_clicked.emit(emoji)
+
+  def mousePressEvent(self, event):
+    self.long_pressed = False
+    if event.button() == Qt.LeftButton and self.variants_provider is not None:
+      self.pressed_index = self.indexAt(event.pos())
+      if self.pressed_index.isValid():
+        self.long_press_timer.start()
+    super().mousePressEvent(event)
+
+  def mouseMoveEvent(self, event):
+    if self.long_press_timer.isActive() and self.indexAt(event.pos()) != self.pressed_index:
+      self.long_press_timer.stop()
+    super().mouseMoveEvent(event)
+
+  def mouseReleaseEvent(self, event):
+    self.long_press_timer.stop()
+    super().mouseReleaseEvent(event)
+
+  def on_long_press(self):
+    if self.show_variants(self.pressed_index):
+      self.long_pressed = True
+
+  def contextMenuEvent(self, event):
+    self.show_variants(self.indexAt(event.pos()))
+
+  def show_variants(self, index):
+    """Open the variant popup over a cell, return False if its emoji has no variants"""
+    if not index.isValid() or self.variants_provider is None:
+      return False
+    rows = self.variants_provider(index.data(BASE_EMOJI_ROLE))
+    if sum(len(row) for row in rows) < 2:
+      return False
+    popup = VariantPopup(rows, self.delegate.cell_size, self)
+    popup.picked.connect(self.emoji_clicked)
+    rect = self.visualRect(index)
+    popup.adjustSize()
+    popup.move(self.viewport().mapToGlobal(rect.center()) - popup.rect().center())
+    popup.show()
+    return True
+
+  def first_emoji(self):
+    """Return the emoji in the first cell, if any"""
+    model = self.model()
+    return model.emoji_at(0) if model is not None else None
@@ -0,0 +1,86 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Symmetric delete (SymSpell style) helpers for typo tolerant search.
+
+At index time every word-like term contributes the strings left after
+deleting up to MAX_DISTANCE characters from its first PREFIX_LENGTH
+characters. A misspelled query generates its own deletes the same way, and
+any term sharing a delete is a candidate that is then checked with a real
+edit distance. Deletes are stored as crc32 hashes, collisions only cost an
+extra distance check.
+"""
+import re
+import zlib
+from array import array
+
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+MIN_WORD_LENGTH = 3
+
+def is_fuzzy_term(term):
+  """Only plain words can be reached by a typo, not names or emoticons"""
+  return len(term) >= MIN_WORD_LENGTH and re.fullmatch(r'[^\W_]+', term) is not None
+
+def max_distance_for(word):
+  """Short words only tolerate one typo, or everything would match"""
+  return 1 if len(word) <= 4 else MAX_DISTANCE
+
+def deletes(word, max_distance=MAX_DISTANCE):
+  """Return the word's prefix and every string left after up to max_distance deletions"""
+  word = word[:PREFIX_LENGTH]
+  result = {word}
+  frontier = {word}
+  for _ in range(max_distance):
+    frontier = {candidate[:i] + candidate[i + 1:] for candidate in frontier for i in range(len(candidate))}
+    result |= frontier
+  return result
+
+def delete_hash(delete):
+  return zlib.crc32(delete.encode('utf-8'))
+
+def delete_table(terms):
+  """Build parallel (hash, term id) arrays sorted by hash for the index"""
+  pairs = set()
+  for term_id, term in enumerate(terms):
+    if is_fuzzy_term(term):
+      for delete in deletes(term):
+        pairs.add((delete_hash(delete), term_id))
+  hashes = array('I')
+  term_ids = array('I')
+  for hash_value, term_id in sorted(pairs):
+    hashes.append(hash_value)
+    term_ids.append(term_id)
+  return hashes, term_ids
+
+def edit_distance(a, b, max_distance):
+  """Optimal string alignment distance, or max_distance + 1 once it is exceeded"""
+  if abs(len(a) - len(b)) > max_distance:
+    return max_distance + 1
+  too_far = max_distance + 1
+  previous2 = None
+  previous = list(range(len(b) + 1))
+  for i in range(1, len(a) + 1):
+    current = [too_far] * (len(b) + 1)
+    current[0] = i
+    # Cells further than max_distance off the diagonal can never come back in range
+    low = max(1, i - max_distance)
+    high = min(len(b), i + max_distance)
+    row_min = too_far if low > 1 else i
+    char = a[i - 1]
+    for j in range(low, high + 1):
+      value = previous[j - 1] if char == b[j - 1] else previous[j - 1] + 1
+      if previous[j] + 1 < value:
+        value = previous[j] + 1
+      if current[j - 1] + 1 < value:
+        value = current[j - 1] + 1
+      if i > 1 and j > 1 and char == b[j - 2] and a[i - 2] == b[j - 1] and previous2[j - 2] + 1 < value:
+        # Transposed neighbours ("hert" / "hetr") count as one edit
+        value = previous2[j - 2] + 1
+      current[j] = value
+      if value < row_min:
+        row_min = value
+    if row_min > max_distance:
+      return too_far
+    previous2, previous = previous, current
+  return previous[-1] if previous[-1] <= max_distance else too_far
@@ -0,0 +1,183 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Pre-rendered emoji glyph atlas.
+
+Shaping and rasterizing a color emoji font is slow on low-end machines, so
+every emoji is drawn once into fixed size tiles on a few atlas pages. The
+pages are saved as PNGs under the config data dir, keyed by font family,
+emoji size and device pixel ratio, and painting a cell becomes a blit.
+Until the atlas is ready (or if it cannot be built) cells fall back to
+drawing the emoji as text.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+
+from PyQt5.QtCore import Qt, QObject, QThread, QRect, QRectF, pyqtSignal
+from PyQt5.QtGui import QFont, QImage, QPainter, QPixmap
+
+from index_format import atomic_write
+import tracing
+
+ATLAS_VERSION = 1
+PAGE_COLUMNS = 32
+PAGE_ROWS = 32
+
+logger = logging.getLogger(__name__)
+
+def glyph_pixel_size(cell_size):
+  """Emojis fill a bit more than half of their cell, like the old 24px in 40px buttons"""
+  return round(cell_size * 0.6)
+
+class AtlasWorker(QObject):
+  finished = pyqtSignal(object, object)
+
+  @tracing.traced("atlas build")
+  def build(self, cache_dir, key, emojis):
+    """Load the atlas pages from disk, rendering and saving them if needed"""
+    try:
+      pages = self.load_pages(cache_dir, key, emojis)
+      if pages is None:
+        pages = self.render_pages(key, emojis)
+        self.save_pages(cache_dir, key, emojis, pages)
+    except Exception as e:
+      logger.error("Error building glyph atlas: %s", e)
+      pages = None
+    self.finished.emit(pages, emojis)
+
+  def load_pages(self, cache_dir, key, emojis):
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    try:
+      with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    except (OSError, ValueError):
+      return None
+    if manifest.get("key") != key or manifest.get("emojis") != emojis_digest(emojis):
+      return None
+
+    pages = []
+    for i in range(manifest["pages"]):
+      page = QImage(os.path.join(cache_dir, f"page-{i}.png"))
+      if page.isNull():
+        return None
+      pages.append(page)
+    return pages
+
+  def render_pages(self, key, emojis):
+    tile = key["tile"]
+    ratio = key["ratio"]
+    font = QFont(key["family"])
+    font.setPixelSize(key["glyph"])
+
+    per_page = PAGE_COLUMNS * PAGE_ROWS
+    pages = []
+    for first in range(0, len(emojis), per_page):
+      page = QImage(PAGE_COLUMNS * tile, PAGE_ROWS * tile, QImage.Format_ARGB32_Premultiplied)
+      page.fill(Qt.transparent)
+      painter = QPainter(page)
+      painter.setFont(font)
+      # Draw in logical pixels so glyphs come out the same as live text on this screen
+      painter.scale(ratio, ratio)
+      logical_tile = tile / ratio
+      for slot, emoji in enumerate(emojis[first:first + per_page]):
+        x = (slot % PAGE_COLUMNS) * logical_tile
+        y = (slot // PAGE_COLUMNS) * logical_tile
+        painter.drawText(QRectF(x, y, logical_tile, logical_tile), Qt.AlignCenter, emoji)
+      painter.end()
+      pages.append(page)
+    return pages
+
+  def save_pages(self, cache_dir, key, emojis, pages):
+    # Rebuild into an empty directory, the manifest goes last so a partial write is never loaded
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    for i, page in enumerate(pages):
+      page.save(os.path.join(cache_dir, f"page-{i}.png"), "PNG")
+    manifest = {"key": key, "emojis": emojis_digest(emojis), "pages": len(pages)}
+    atomic_write(os.path.join(cache_dir, "manifest.json"), json.dumps(manifest).encode('utf-8'))
+
+def emojis_digest(emojis):
+  return hashlib.sha256("\n".join(emojis).encode('utf-8')).hexdigest()
+
+class GlyphAtlas(QObject):
+  """
+  Emoji tiles for one font family, emoji size and device pixel ratio.
+
+  Call build() with the emojis to cover, ready is emitted once source()
+  can return tiles.
+  """
+  ready = pyqtSignal()
+  build_requested = pyqtSignal(str, object, object)
+
+  def __init__(self, cache_root, family, cell_size, device_pixel_ratio, parent=None):
+    super().__init__(parent)
+    self.family = family
+    self.cell_size = cell_size
+    self.device_pixel_ratio = device_pixel_ratio
+    glyph = glyph_pixel_size(cell_size)
+    self.key = {
+      "version": ATLAS_VERSION,
+      "family": family,
+      "cell": cell_size,
+      "glyph": glyph,
+      "ratio": device_pixel_ratio,
+      # Tiles in device pixels, with room for glyphs that overhang their em box
+      "tile": math.ceil(glyph * 1.3 * device_pixel_ratio),
+    }
+    # One cache directory per key, so changing any of them never reuses stale tiles
+    key_name = hashlib.sha1(json.dumps(self.key, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    self.cache_dir = os.path.join(str(cache_root), key_name)
+
+    self.pixmaps = []
+    self.slots = {}
+    self.is_ready = False
+
+    self.thread = QThread()
+    self.worker = AtlasWorker()
+    self.worker.moveToThread(self.thread)
+    # Queued across threads, so build() never blocks the caller
+    self.build_requested.connect(self.worker.build)
+    self.worker.finished.connect(self.on_pages_ready)
+    self.thread.start()
+
+  def build(self, emojis):
+    """Load or render the atlas for emojis in the background"""
+    self.build_requested.emit(self.cache_dir, self.key, list(emojis))
+
+  def on_pages_ready(self, pages, emojis):
+    if not pages:
+      return
+    # QPixmaps may only be created on the GUI thread
+    self.pixmaps = [QPixmap.fromImage(page) for page in pages]
+    for pixmap in self.pixmaps:
+      pixmap.setDevicePixelRatio(self.device_pixel_ratio)
+    self.slots = {emoji: slot for slot, emoji in enumerate(emojis)}
+    self.is_ready = True
+    self.ready.emit()
+
+  def matches(self, device_pixel_ratio):
+    """Tiles are only usable on screens with the ratio they were rendered for"""
+    return self.is_ready and device_pixel_ratio == self.device_pixel_ratio
+
+  def source(self, emoji):
+    """Return (pixmap, source rect in device pixels) for an emoji, or None"""
+    slot = self.slots.get(emoji)
+    if slot is None:
+      return None
+    per_page = PAGE_COLUMNS * PAGE_ROWS
+    page, slot = divmod(slot, per_page)
+    tile = self.key["tile"]
+    rect = QRect((slot % PAGE_COLUMNS) * tile, (slot // PAGE_COLUMNS) * tile, tile, tile)
+    return self.pixmaps[page], rect
+
+  def tile_size(self):
+    """Return the tile size in logical pixels"""
+    return self.key["tile"] / self.device_pixel_ratio
+
+  def shutdown(self):
+    self.thread.quit()
+    self.thread.wait()
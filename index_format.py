@@ -0,0 +1,516 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Compiled binary format for the inverted index.
+
+Layout (all integers little-endian, sections aligned to 4 bytes):
+
+  header    magic "GGIX", u16 version, u16 section count,
+            32 byte sha256 of the source emoji json
+  sections  count x (4 byte tag, u32 offset, u32 length)
+
+  EOFF  u32[emoji_count + 1]  offsets into EMOJ
+  EMOJ  utf-8 emoji strings, in corpus order (position is the emoji id)
+  TOFF  u32[term_count + 1]   offsets into TERM
+  TERM  utf-8 terms, sorted so they can be binary searched
+  POFF  u32[term_count + 1]   offsets into POST
+  POST  u16 emoji ids, one sorted run per term
+  KOFF  u32[emoji_count + 1]  offsets into KEYW
+  KEYW  u32 term ids of each emoji's own keywords, in corpus order
+  SUFX  u32 positions in TERM of every term suffix, sorted by suffix, so
+        partial words are found by binary search instead of a term scan
+  DELH  u32 crc32 hashes of symmetric deletes of word-like terms, sorted
+  DELT  u32 term id for each entry of DELH, see fuzzy.py
+  VFLG  u8 variant flags per emoji, in corpus order, see variants.py
+  SECT  u32 (group id, start, end) per browsing section, see emoji_groups.py
+
+Next to each base index is an emoji order sidecar, the corpus' emojis
+without their keywords, so the first chunk can be shown while a missing or
+stale index is still being built. It is checked by the size and mtime of
+the emoji json rather than a hash, a stat is all it costs:
+
+  header    magic "GGKL", u64 size and u64 mtime (ns) of the emoji json
+  body      utf-8 emojis in corpus order, one per line
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from itertools import compress
+from emoji_groups import Section, section_offsets
+from fuzzy import delete_table
+from variants import variant_flags
+
+MAGIC = b"GGIX"
+VERSION = 6
+
+HEADER = struct.Struct("<4sHH32s")
+SECTION = struct.Struct("<4sII")
+
+ORDER_MAGIC = b"GGKL"
+ORDER_HEADER = struct.Struct("<4sQQ")
+
+class IndexFormatError(Exception):
+  """Raised when an index file is missing, corrupt or from another version"""
+
+def source_hash(path):
+  """Return the sha256 digest of the file an index is built from"""
+  with open(path, 'rb') as f:
+    return hashlib.sha256(f.read()).digest()
+
+def atomic_write(path, data):
+  """Write bytes to path so readers only ever see the old or the new file"""
+  import tempfile  # Only needed when writing, keep it off the load path
+  directory = os.path.dirname(path) or "."
+  fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+  try:
+    with os.fdopen(fd, 'wb') as f:
+      f.write(data)
+      f.flush()
+      os.fsync(f.fileno())
+    # mkstemp creates the file private to the user, indexes are meant to be shared
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+  except BaseException:
+    os.unlink(tmp_path)
+    raise
+
+def _string_table(strings):
+  """Encode strings into an offsets array and a utf-8 blob"""
+  offsets = array('I', [0])
+  blob = bytearray()
+  for string in strings:
+    blob += string.encode('utf-8')
+    offsets.append(len(blob))
+  return offsets, bytes(blob)
+
+def _suffix_array(terms):
+  """Return the TERM blob positions of every term suffix, sorted by suffix"""
+  suffixes = []
+  position = 0
+  for term in terms:
+    encoded = term.encode('utf-8')
+    for i in range(len(encoded)):
+      # Only start suffixes on character boundaries, not inside a utf-8 sequence
+      if encoded[i] & 0xC0 != 0x80:
+        suffixes.append((encoded[i:], position + i))
+    position += len(encoded)
+  suffixes.sort()
+  return array('I', (position for _, position in suffixes))
+
+def _to_bytes(values):
+  if sys.byteorder != "little":
+    values = array(values.typecode, values)
+    values.byteswap()
+  return values.tobytes()
+
+def encode_index(digest, emoji_data, inverted_index):
+  """Encode the corpus and its {term: [emoji, ...]} index into the binary format"""
+  emoji_ids = {emoji: i for i, emoji in enumerate(emoji_data)}
+  terms = sorted(inverted_index)
+  postings = [sorted({emoji_ids[emoji] for emoji in inverted_index[term]}) for term in terms]
+  delete_hashes, delete_terms = delete_table(terms)
+  return _encode(digest, emoji_data, terms, postings, _suffix_array(terms), delete_hashes, delete_terms)
+
+def encode_index_update(index, digest, emoji_data, postings):
+  """
+  Encode the index of emoji_data by patching index, the MappedIndex of an
+  earlier version of the corpus.
+
+  postings holds the new [emoji, ...] of every term whose emojis changed, an
+  empty list for terms that are gone. Every other term must match the same
+  emojis as before, wherever they moved in the corpus. The result is byte
+  for byte what encode_index() gives for the whole corpus, but only new
+  terms have their deletes and suffixes worked out, the rest are carried over.
+  """
+  emoji_ids = {emoji: i for i, emoji in enumerate(emoji_data)}
+  emoji_map = [emoji_ids.get(emoji, -1) for emoji in index.emojis()]
+  old_terms = index.terms()
+  old_term_set = set(old_terms)
+  added = sorted(term for term, emojis in postings.items() if emojis and term not in old_term_set)
+  terms = sorted([term for term in old_terms if postings.get(term, True)] + added)
+  term_ids = {term: i for i, term in enumerate(terms)}
+  # Terms that stay keep their order, so their old ids map to new ones in order
+  term_map = [term_ids.get(term, -1) for term in old_terms]
+
+  # Kept posting lists are carried over with their emoji ids moved
+  old_ids = [emoji_map[emoji_id] for emoji_id in index._postings.tolist()]
+  posting_offsets = index._posting_offsets.tolist()
+  kept_order = [emoji_id for emoji_id in emoji_map if emoji_id >= 0]
+  reordered = any(a > b for a, b in zip(kept_order, kept_order[1:]))
+  term_postings = [None] * len(terms)
+  for old_id, term_id in enumerate(term_map):
+    if term_id >= 0 and old_terms[old_id] not in postings:
+      ids = old_ids[posting_offsets[old_id]:posting_offsets[old_id + 1]]
+      if -1 in ids:
+        raise ValueError(f"Term {old_terms[old_id]!r} matches a removed emoji but has no new postings")
+      if reordered:
+        ids.sort()
+      term_postings[term_id] = ids
+  for term, emojis in postings.items():
+    if emojis:
+      term_postings[term_ids[term]] = sorted({emoji_ids[emoji] for emoji in emojis})
+
+  # Deletes of the new terms, their ids moved to where the terms are now
+  new_hashes, new_terms = delete_table(added)
+  mapped = [term_map[term_id] for term_id in index._delete_terms.tolist()]
+  if len(terms) == len(old_terms) + len(added):
+    hashes = array('I', index._delete_hashes.tolist())
+    delete_terms = array('I', mapped)
+  else:
+    kept = [term_id >= 0 for term_id in mapped]
+    hashes = array('I', compress(index._delete_hashes.tolist(), kept))
+    delete_terms = array('I', compress(mapped, kept))
+  positions = []
+  for hash_value, term_id in zip(new_hashes, new_terms):
+    lo = bisect_left(hashes, hash_value)
+    hi = bisect_right(hashes, hash_value, lo)
+    positions.append(bisect_left(delete_terms, term_ids[added[term_id]], lo, hi))
+  delete_hashes = _splice(hashes, positions, new_hashes)
+  delete_terms = _splice(delete_terms, positions, (term_ids[added[term_id]] for term_id in new_terms))
+
+  # Suffixes of kept terms keep their order, only their positions in TERM move
+  term_offsets, term_blob = _string_table(terms)
+  old_offsets = index._term_offsets.tolist()
+  position_map = []
+  for old_id, term_id in enumerate(term_map):
+    size = old_offsets[old_id + 1] - old_offsets[old_id]
+    if term_id >= 0:
+      position_map.extend(range(term_offsets[term_id], term_offsets[term_id] + size))
+    else:
+      position_map.extend([-1] * size)
+  suffixes = array('I', [position for position in map(position_map.__getitem__, index._suffixes.tolist())
+                         if position >= 0])
+  term_ends = []
+  for term_id in range(len(terms)):
+    end = term_offsets[term_id + 1]
+    term_ends.extend([end] * (end - term_offsets[term_id]))
+  new_suffixes = []
+  for term in added:
+    start, end = term_offsets[term_ids[term]], term_offsets[term_ids[term] + 1]
+    for position in range(start, end):
+      if term_blob[position] & 0xC0 != 0x80:
+        new_suffixes.append((term_blob[position:end], position))
+  new_suffixes.sort()
+  suffix_key = lambda position: (term_blob[position:term_ends[position]], position)
+  positions = [bisect_left(suffixes, entry, key=suffix_key) for entry in new_suffixes]
+  suffixes = _splice(suffixes, positions, (position for _, position in new_suffixes))
+
+  return _encode(digest, emoji_data, terms, term_postings, suffixes, delete_hashes, delete_terms)
+
+def _splice(values, positions, items):
+  """Return a copy of an array with items inserted before the ascending positions"""
+  result = array(values.typecode)
+  last = 0
+  for position, item in zip(positions, items):
+    result.extend(values[last:position])
+    result.append(item)
+    last = position
+  result.extend(values[last:])
+  return result
+
+def _encode(digest, emoji_data, terms, postings, suffixes, delete_hashes, delete_terms):
+  """Lay out the sections of an index, postings are the sorted emoji ids of each term"""
+  emojis = list(emoji_data)
+  term_ids = {term: i for i, term in enumerate(terms)}
+
+  posting_offsets = array('I', [0])
+  posting_ids = array('H')
+  for ids in postings:
+    posting_ids.extend(ids)
+    posting_offsets.append(len(posting_ids))
+
+  # Every keyword is also a term, so keyword lists are stored as term ids
+  keyword_offsets = array('I', [0])
+  keywords = array('I')
+  for emoji in emojis:
+    keywords.extend(term_ids[keyword] for keyword in emoji_data[emoji])
+    keyword_offsets.append(len(keywords))
+
+  emoji_offsets, emoji_blob = _string_table(emojis)
+  term_offsets, term_blob = _string_table(terms)
+  sections = [
+    (b"EOFF", _to_bytes(emoji_offsets)),
+    (b"EMOJ", emoji_blob),
+    (b"TOFF", _to_bytes(term_offsets)),
+    (b"TERM", term_blob),
+    (b"POFF", _to_bytes(posting_offsets)),
+    (b"POST", _to_bytes(posting_ids)),
+    (b"KOFF", _to_bytes(keyword_offsets)),
+    (b"KEYW", _to_bytes(keywords)),
+    (b"SUFX", _to_bytes(suffixes)),
+    (b"DELH", _to_bytes(delete_hashes)),
+    (b"DELT", _to_bytes(delete_terms)),
+    (b"VFLG", bytes(variant_flags(emojis))),
+    (b"SECT", _to_bytes(array('I', (value for section in section_offsets(emojis) for value in section)))),
+  ]
+
+  # Lay the sections out after the header and section table
+  offset = HEADER.size + SECTION.size * len(sections)
+  table = bytearray()
+  body = bytearray()
+  for tag, data in sections:
+    padding = -(offset + len(body)) % 4
+    body += b"\0" * padding
+    table += SECTION.pack(tag, offset + len(body), len(data))
+    body += data
+
+  return HEADER.pack(MAGIC, VERSION, len(sections), digest) + bytes(table) + bytes(body)
+
+def write_index(path, data):
+  """Write an encoded index atomically to path"""
+  os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+  atomic_write(path, data)
+
+def source_stamp(path):
+  """Return the (size, mtime in ns) of a file, which change whenever it is rewritten"""
+  stat = os.stat(path)
+  return stat.st_size, stat.st_mtime_ns
+
+def encode_emoji_order(stamp, emojis):
+  """Encode an emoji order sidecar for the emoji json with this source_stamp"""
+  return ORDER_HEADER.pack(ORDER_MAGIC, *stamp) + "\n".join(emojis).encode('utf-8')
+
+def read_emoji_order(path, stamp):
+  """Return the emojis of an order sidecar, or None if it is missing, corrupt or for another json"""
+  try:
+    with open(path, 'rb') as f:
+      data = f.read()
+    magic, size, mtime = ORDER_HEADER.unpack_from(data)
+    if magic != ORDER_MAGIC or (size, mtime) != tuple(stamp):
+      return None
+    body = data[ORDER_HEADER.size:].decode('utf-8')
+  except (OSError, struct.error, UnicodeDecodeError):
+    return None
+  return body.split("\n") if body else []
+
+class MappedIndex(Mapping):
+  """
+  Read-only, memory-mapped view of a compiled index.
+
+  Behaves like the {term: [emoji, ...]} dict the indexer builds, but only
+  touches the pages of the file that a lookup actually needs. A freshly
+  encoded index can be wrapped the same way with data instead of a path.
+  """
+
+  def __init__(self, path=None, data=None):
+    self.path = path or "<memory>"
+    if data is not None:
+      self._mmap = data
+    else:
+      try:
+        with open(path, 'rb') as f:
+          self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+      except (OSError, ValueError) as e:
+        raise IndexFormatError(f"Cannot map index {path}: {e}")
+
+    self._views = []
+    try:
+      self._parse()
+    except Exception:
+      self.close()
+      raise
+
+  def _parse(self):
+    if len(self._mmap) < HEADER.size:
+      raise IndexFormatError(f"Index {self.path} is truncated")
+    magic, version, section_count, digest = HEADER.unpack_from(self._mmap, 0)
+    if magic != MAGIC:
+      raise IndexFormatError(f"{self.path} is not a GlyphGrab index")
+    if version != VERSION:
+      raise IndexFormatError(f"Index {self.path} has version {version}, expected {VERSION}")
+    self.source_hash = digest
+
+    sections = {}
+    for i in range(section_count):
+      tag, offset, length = SECTION.unpack_from(self._mmap, HEADER.size + i * SECTION.size)
+      if offset + length > len(self._mmap):
+        raise IndexFormatError(f"Index {self.path} is truncated")
+      sections[tag] = (offset, length)
+    self._sections = sections
+
+    self._emoji_offsets = self._section(b"EOFF", "I")
+    self._emoji_blob = self._section(b"EMOJ")
+    self._term_offsets = self._section(b"TOFF", "I")
+    self._term_blob = self._section(b"TERM")
+    self._posting_offsets = self._section(b"POFF", "I")
+    self._postings = self._section(b"POST", "H")
+    self._keyword_offsets = self._section(b"KOFF", "I")
+    self._keywords = self._section(b"KEYW", "I")
+    self._suffixes = self._section(b"SUFX", "I")
+    self._delete_hashes = self._section(b"DELH", "I")
+    self._delete_terms = self._section(b"DELT", "I")
+    self._variant_flags = self._section(b"VFLG")
+    self._sections_table = self._section(b"SECT", "I")
+
+    self.emoji_count = len(self._emoji_offsets) - 1
+    self.term_count = len(self._term_offsets) - 1
+    if self._posting_offsets[-1] != len(self._postings):
+      raise IndexFormatError(f"Index {self.path} has inconsistent postings")
+
+  def _section(self, tag, typecode=None):
+    """Return a section as bytes, or as an integer array for typecode"""
+    if tag not in self._sections:
+      raise IndexFormatError(f"Index {self.path} is missing section {tag.decode()}")
+    offset, length = self._sections[tag]
+    view = memoryview(self._mmap)[offset:offset + length]
+    self._views.append(view)
+    if typecode is None:
+      return view
+    if sys.byteorder != "little":
+      # The file is little-endian, so big-endian hosts get a swapped copy
+      values = array(typecode, view.tobytes())
+      values.byteswap()
+      return values
+    values = view.cast(typecode)
+    self._views.append(values)
+    return values
+
+  def close(self):
+    """Release the mapping"""
+    for view in reversed(self._views):
+      view.release()
+    self._views = []
+    if not isinstance(self._mmap, mmap.mmap):
+      return
+    try:
+      self._mmap.close()
+    except BufferError:
+      # Posting views handed out to callers keep the mapping alive until they go
+      pass
+
+  def to_bytes(self):
+    """Return the encoded index"""
+    return bytes(self._mmap[:])
+
+  def emoji(self, emoji_id):
+    """Return the emoji string for an id"""
+    start, end = self._emoji_offsets[emoji_id], self._emoji_offsets[emoji_id + 1]
+    return str(self._emoji_blob[start:end], 'utf-8')
+
+  def emojis(self):
+    """Return all emoji strings in corpus order"""
+    return [self.emoji(i) for i in range(self.emoji_count)]
+
+  def variant_flags(self, emoji_id):
+    """Return the TONE_FLAG and GENDER_FLAG bits of an emoji"""
+    return self._variant_flags[emoji_id]
+
+  def sections(self):
+    """Return the browsing Sections, in corpus order"""
+    table = self._sections_table
+    return [Section(*table[i:i + 3]) for i in range(0, len(table) - 2, 3)]
+
+  def terms(self):
+    """Return all term strings in id order"""
+    blob = self._term_blob.tobytes()
+    offsets = self._term_offsets
+    return [str(blob[offsets[i]:offsets[i + 1]], 'utf-8') for i in range(self.term_count)]
+
+  def term(self, term_id):
+    """Return the term string for an id"""
+    return str(self._term_bytes(term_id), 'utf-8')
+
+  def _term_bytes(self, term_id):
+    start, end = self._term_offsets[term_id], self._term_offsets[term_id + 1]
+    return self._term_blob[start:end].tobytes()
+
+  def find_term(self, term):
+    """Binary search for a term, return its id or -1"""
+    # utf-8 byte order matches code point order, which is how terms were sorted
+    key = term.encode('utf-8')
+    lo, hi = 0, self.term_count
+    while lo < hi:
+      mid = (lo + hi) // 2
+      if self._term_bytes(mid) < key:
+        lo = mid + 1
+      else:
+        hi = mid
+    if lo < self.term_count and self._term_bytes(lo) == key:
+      return lo
+    return -1
+
+  def prefix_range(self, prefix):
+    """Return the (start, end) range of term ids starting with prefix"""
+    key = prefix.encode('utf-8')
+    size = len(key)
+    lo, hi = 0, self.term_count
+    while lo < hi:
+      mid = (lo + hi) // 2
+      if self._term_bytes(mid) < key:
+        lo = mid + 1
+      else:
+        hi = mid
+    start, hi = lo, self.term_count
+    while lo < hi:
+      mid = (lo + hi) // 2
+      if self._term_bytes(mid)[:size] == key:
+        lo = mid + 1
+      else:
+        hi = mid
+    return start, lo
+
+  def _suffix_bytes(self, i, size):
+    """Return up to size bytes of the i-th sorted suffix, stopping at its term's end"""
+    position = self._suffixes[i]
+    term_end = self._term_offsets[bisect_right(self._term_offsets, position)]
+    return self._term_blob[position:min(position + size, term_end)].tobytes()
+
+  def substring_terms(self, fragment):
+    """Return the ids of every term containing fragment, in O(log S + matches)"""
+    key = fragment.encode('utf-8')
+    if not key:
+      return range(self.term_count)
+    size = len(key)
+    lo, hi = 0, len(self._suffixes)
+    while lo < hi:
+      mid = (lo + hi) // 2
+      if self._suffix_bytes(mid, size) < key:
+        lo = mid + 1
+      else:
+        hi = mid
+    start, hi = lo, len(self._suffixes)
+    while lo < hi:
+      mid = (lo + hi) // 2
+      if self._suffix_bytes(mid, size) == key:
+        lo = mid + 1
+      else:
+        hi = mid
+
+    # A term containing the fragment more than once shows up once per occurrence
+    term_ids = {bisect_right(self._term_offsets, self._suffixes[i]) - 1 for i in range(start, lo)}
+    return sorted(term_ids)
+
+  def delete_terms(self, hash_value):
+    """Return the ids of terms that have a symmetric delete with this hash"""
+    start = bisect_left(self._delete_hashes, hash_value)
+    end = bisect_right(self._delete_hashes, hash_value, start)
+    return self._delete_terms[start:end]
+
+  def postings(self, term_id):
+    """Return the sorted emoji ids for a term id"""
+    return self._postings[self._posting_offsets[term_id]:self._posting_offsets[term_id + 1]]
+
+  def keyword_ids(self, emoji_id):
+    """Return the term ids of an emoji's own keywords"""
+    return self._keywords[self._keyword_offsets[emoji_id]:self._keyword_offsets[emoji_id + 1]]
+
+  def __getitem__(self, term):
+    term_id = self.find_term(term)
+    if term_id < 0:
+      raise KeyError(term)
+    return [self.emoji(emoji_id) for emoji_id in self.postings(term_id)]
+
+  def __contains__(self, term):
+    return isinstance(term, str) and self.find_term(term) >= 0
+
+  def __iter__(self):
+    for term_id in range(self.term_count):
+      yield self.term(term_id)
+
+  def __len__(self):
+    return self.term_count
@@ -1,122 +1,491 @@
 #  Copyright (c) 2025 Keshav Prajapati
 #  Licensed under the MIT license. See LICENSE file in the project root for details.
+import hashlib
 import json
+import logging
 import os
+import threading
 from collections import defaultdict
-import re
+from index_format import (MappedIndex, IndexFormatError, source_hash, encode_index,
+                          encode_index_update, write_index, atomic_write)
+from emoji_store import EmojiStore, intersect_sorted
+from ranking import Ranker, RankedResults, recent_usage_scores
+from fuzzy import is_fuzzy_term
+from completion import CompletionIndex
+from query import Term, evaluate, parse_query, plain_words, query_key
+import tracing
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 emoji_json_path = os.path.join(BASE_DIR, "data", "emoji-en-US.json")
 index_dir_path = os.path.join(BASE_DIR, "data", "index")
 index_json_path = os.path.join(BASE_DIR, "data", "index", "inverted_index.json")
 
+# Fewer hits than this and misspelled words are looked up as well
+FUZZY_THRESHOLD = 5
+# A stale index is patched if at most this share of the emojis changed, rebuilt otherwise
+UPDATE_LIMIT = 0.5
+
+logger = logging.getLogger(__name__)
+
+def index_path_for(emoji_json_path, index_dir=index_dir_path):
+  """Return the compiled index path for an emoji json file"""
+  name = os.path.splitext(os.path.basename(emoji_json_path))[0]
+  return os.path.join(index_dir, name + ".idx")
+
+def keyword_terms(keyword):
+  """Return the terms a keyword is indexed under, itself and the parts of a compound"""
+  terms = [keyword]
+  # "grinning_face" is also found by "grinning" and "face"
+  if "_" in keyword:
+    terms.extend(part for part in keyword.split("_") if len(part) > 1)
+  return terms
+
+def build_inverted_index(emoji_data):
+  """Return the {term: [emoji, ...]} index of a corpus"""
+  inverted_index = defaultdict(list)
+  for emoji_char, keywords in emoji_data.items():
+    for keyword in keywords:
+      for term in keyword_terms(keyword):
+        inverted_index[term].append(emoji_char)
+  return inverted_index
+
+class WordLookup:
+  """Term ids and partial and fuzzy matches of query words, each looked up once"""
+
+  def __init__(self, store, ranker):
+    self.store = store
+    self.ranker = ranker
+    self.term_ids = {}
+    self.partial = {}
+    self.fuzzy = {}
+
+  def resolve(self, words):
+    """Look up the term ids of many words in one pass, in term order"""
+    for word in sorted(set(words) - self.term_ids.keys()):
+      self.term_ids[word] = self.store.term_id(word)
+
+  def term_id(self, word):
+    term_id = self.term_ids.get(word)
+    if term_id is None:
+      term_id = self.term_ids[word] = self.store.term_id(word)
+    return term_id
+
+  def partial_matches(self, word):
+    matches = self.partial.get(word)
+    if matches is None:
+      matches = self.partial[word] = self.ranker.partial_matches(word)
+    return matches
+
+  def fuzzy_matches(self, word):
+    matches = self.fuzzy.get(word)
+    if matches is None:
+      matches = self.fuzzy[word] = self.ranker.fuzzy_matches(word)
+    return matches
+
 class EmojiIndexer:
-  def __init__(self, emoji_json_path=emoji_json_path):
+  """
+  Compiled index of one emoji pack, and word-by-word search over it.
+
+  Constructing one does no I/O: the index is loaded, or built from the pack
+  and saved unless persist is off, by ensure_index_exists() or the first
+  search. Searches only read the store, so any number of threads can run
+  them at once.
+  """
+
+  def __init__(self, emoji_json_path=emoji_json_path, index_dir=index_dir_path, shared_store=None, persist=True):
     self.emoji_json_path = emoji_json_path
+    self.index_dir = index_dir
+    # Whether a built index is written to index_dir for the next start
+    self.persist = persist
+    # Store of the base locale whose emoji order and table this index shares
+    self.shared_store = shared_store
+    self.index_path = index_path_for(emoji_json_path, index_dir)
     self.emoji_data = {}
-    self.inverted_index = defaultdict(list)
-    self.load_emoji_data()
-    
-    if os.path.exists(index_json_path):
-      print("Using the existing index")
-      self.load_index()
-    else:      
-      self.build_index()
+    self.store = None
+    self.index_data = None
+    self.inverted_index = {}
+    self.ranker = None
+    # Built on first use, only the picker completes words
+    self.completions = None
+    self.completion_lock = threading.Lock()
+    self.usage_scores = {}
+    # Typo tolerant matches when exact and partial matching find little
+    self.fuzzy = True
+    self.load_lock = threading.Lock()
       
   def ensure_index_exists(self):
-    """Ensure the index exists, build and save if it doesn't"""
-    if not os.path.exists(index_json_path):
-        self.build_index()
-        self.save_index()
+    """Load the compiled index, rebuilding (and saving) it if missing or stale"""
+    if self.store is not None:
+      return
+    with self.load_lock:
+      if self.store is None and not self.load_index(self.index_path):
+        # A stale index only needs the emojis that changed re-indexed
+        if not self.update_index(self.index_path):
+          self.build_index()
+        if self.persist:
+          self.save_index(self.index_dir)
 
   def is_index_loaded(self):
     """Check if the index is loaded"""
-    return len(self.inverted_index) > 0
+    return self.store is not None and len(self.inverted_index) > 0
 
     
+  @tracing.traced("corpus parse")
   def load_emoji_data(self):
     """Load emoji data from JSON file"""
     try:
       with open(self.emoji_json_path, 'r', encoding='utf-8') as f:
         self.emoji_data = json.load(f)
-      print(f"Loaded {len(self.emoji_data)} emojis from {self.emoji_json_path}")
+      logger.info("Loaded %d emojis from %s", len(self.emoji_data), self.emoji_json_path)
     except Exception as e:
-      print(f"Error loading emoji data: {e}")
+      logger.error("Error loading emoji data: %s", e)
       self.emoji_data = {}
     
+  def source_digest(self):
+    """Hash of everything the index is built from, a stale index is rebuilt"""
+    digest = source_hash(self.emoji_json_path)
+    if self.shared_store is not None:
+      # A locale index also follows the base corpus' emoji order
+      digest = hashlib.sha256(digest + self.shared_store.index.source_hash).digest()
+    return digest
+    
+  def shared_order(self, emoji_data):
+    """Lay a locale's keywords out in the base corpus' emoji order"""
+    extra = len(set(emoji_data) - set(self.shared_store.emoji_ids))
+    if extra:
+      logger.warning("Skipping %d emojis of %s missing from the base corpus", extra, self.emoji_json_path)
+    return {emoji: emoji_data.get(emoji, []) for emoji in self.shared_store.emojis}
+    
+  @tracing.traced("index build")
   def build_index(self):
     """Build inverted index from emoji data"""
-    for emoji_char, keywords in self.emoji_data.items():
-      # Add each keyword to the inverted index
-      for keyword in keywords:
-        self.inverted_index[keyword].append(emoji_char)
-        
-        # Also add parts of compound keywords (e.g., "grinning_face" -> "grinning", "face")
-        if "_" in keyword:
-          parts = keyword.split("_")
-          for part in parts:
-            if len(part) > 1:  # Skip single-character parts
-              self.inverted_index[part].append(emoji_char)
-    
-    # Convert defaultdict to regular dict
-    self.inverted_index = dict(self.inverted_index)
-    print(f"Built inverted index with {len(self.inverted_index)} keywords")
+    # The corpus is only parsed when there is no usable compiled index
+    if not self.emoji_data:
+      self.load_emoji_data()
+    if self.shared_store is not None:
+      self.emoji_data = self.shared_order(self.emoji_data)
     
+    inverted_index = build_inverted_index(self.emoji_data)
+    
+    # Compile it so a built index is searched exactly like a loaded one
+    self.index_data = encode_index(self.source_digest(), self.emoji_data, inverted_index)
+    self.set_store(EmojiStore(MappedIndex(data=self.index_data), self.shared_store))
+    
+    # The parsed corpus is not needed once it is compiled
+    self.emoji_data = {}
+    logger.info("Built inverted index with %d keywords", len(self.inverted_index))
+    
+  @tracing.traced("index update")
+  def update_index(self, index_path=None):
+    """
+    Bring a stale compiled index up to date with the emoji pack, return
+    whether it could be.
+    
+    The previous corpus is read back from the index itself and compared with
+    the pack: only the terms of emojis that were added, removed or whose
+    keywords changed get new posting lists, see encode_index_update(). The
+    result carries the pack's hash like a full build, so it is never mistaken
+    for an index of another corpus.
+    """
+    index_path = index_path or self.index_path
+    if not os.path.exists(index_path):
+      return False
+    try:
+      index = MappedIndex(index_path)
+    except IndexFormatError:
+      return False
+    try:
+      if not self.emoji_data:
+        self.load_emoji_data()
+      emoji_data = self.shared_order(self.emoji_data) if self.shared_store is not None else self.emoji_data
+      if not emoji_data:
+        return False
+      terms = index.terms()
+      previous = {emoji: [terms[term_id] for term_id in index.keyword_ids(emoji_id)]
+                  for emoji_id, emoji in enumerate(index.emojis())}
+      changed = [emoji for emoji in previous.keys() | emoji_data.keys() if previous.get(emoji) != emoji_data.get(emoji)]
+      if len(changed) > UPDATE_LIMIT * max(len(emoji_data), 1):
+        logger.info("Rebuilding inverted index, %d of %d emojis changed", len(changed), len(emoji_data))
+        return False
+      
+      # Terms of changed emojis lose those emojis and gain them back where they still apply
+      changed_set = set(changed)
+      gained = defaultdict(list)
+      affected = set()
+      for emoji in changed:
+        for keyword in previous.get(emoji, ()):
+          affected.update(keyword_terms(keyword))
+        for keyword in emoji_data.get(emoji, ()):
+          for term in keyword_terms(keyword):
+            gained[term].append(emoji)
+      affected.update(gained)
+      postings = {}
+      for term in affected:
+        term_id = index.find_term(term)
+        kept = [] if term_id < 0 else [index.emoji(emoji_id) for emoji_id in index.postings(term_id)
+                                       if index.emoji(emoji_id) not in changed_set]
+        postings[term] = kept + gained.get(term, [])
+      
+      self.index_data = encode_index_update(index, self.source_digest(), emoji_data, postings)
+    except Exception as e:
+      logger.warning("Error updating inverted index, rebuilding it: %s", e)
+      self.index_data = None
+      return False
+    finally:
+      index.close()
+    
+    self.set_store(EmojiStore(MappedIndex(data=self.index_data), self.shared_store))
+    self.emoji_data = {}
+    logger.info("Updated inverted index, %d emojis changed", len(changed))
+    return True
+
+  def verify_index(self):
+    """Check the loaded index byte for byte against a full build of the pack"""
+    self.ensure_index_exists()
+    self.load_emoji_data()
+    emoji_data = self.shared_order(self.emoji_data) if self.shared_store is not None else self.emoji_data
+    self.emoji_data = {}
+    expected = encode_index(self.source_digest(), emoji_data, build_inverted_index(emoji_data))
+    return self.store.index.to_bytes() == expected
+
+  @tracing.traced("index save")
   def save_index(self, index_dir=index_dir_path):
-    """Save the inverted index to a file"""
-    os.makedirs(index_dir, exist_ok=True)
-    index_path = os.path.join(index_dir, "inverted_index.json")
+    """Save the inverted index to the compiled binary format"""
+    index_path = index_path_for(self.emoji_json_path, index_dir)
     
     try:
-      with open(index_path, 'w', encoding='utf-8') as f:
-        json.dump(self.inverted_index, f, ensure_ascii=False)
-      print(f"Saved inverted index to {index_path}")
+      data = self.index_data if self.index_data is not None else self.store.index.to_bytes()
+      write_index(index_path, data)
+      logger.info("Saved inverted index to %s", index_path)
     except Exception as e:
-      print(f"Error saving inverted index: {e}")
+      logger.error("Error saving inverted index: %s", e)
     
-  def load_index(self, index_path="data/index/inverted_index.json"):
-    """Load the inverted index from a file"""
+  def export_json_index(self, index_path=index_json_path):
+    """Write the inverted index as JSON, for debugging or as a fallback"""
+    try:
+      os.makedirs(os.path.dirname(index_path), exist_ok=True)
+      data = json.dumps(dict(self.inverted_index), ensure_ascii=False)
+      atomic_write(index_path, data.encode('utf-8'))
+      logger.info("Exported inverted index to %s", index_path)
+    except Exception as e:
+      logger.error("Error exporting inverted index: %s", e)
+    
+  @tracing.traced("index load")
+  def load_index(self, index_path=None):
+    """Load the inverted index from a compiled index or a JSON export"""
+    index_path = index_path or self.index_path
+    if index_path.endswith(".json"):
+      return self.load_json_index(index_path)
+    
+    if not os.path.exists(index_path):
+      return False
+    try:
+      index = MappedIndex(index_path)
+    except IndexFormatError as e:
+      # Rebuilt by the caller, like after a format change
+      logger.warning("Error loading inverted index: %s", e)
+      return False
+    
+    # An index built from a different emoji file has to be rebuilt
+    if index.source_hash != self.source_digest():
+      logger.info("Inverted index %s is stale", index_path)
+      index.close()
+      return False
+    
+    self.index_data = None
+    self.set_store(EmojiStore(index, self.shared_store))
+    logger.info("Loaded inverted index with %d keywords", len(self.inverted_index))
+    return True
+    
+  def load_json_index(self, index_path=index_json_path):
+    """Load the inverted index from a JSON export"""
     try:
       with open(index_path, 'r', encoding='utf-8') as f:
-        self.inverted_index = json.load(f)
-      print(f"Loaded inverted index with {len(self.inverted_index)} keywords")
+        inverted_index = json.load(f)
+      if not self.emoji_data:
+        self.load_emoji_data()
+      if self.shared_store is not None:
+        self.emoji_data = self.shared_order(self.emoji_data)
+      # Compile it in memory, the export carries no hash so it is never saved
+      self.index_data = encode_index(b"\0" * 32, self.emoji_data, inverted_index)
+      self.set_store(EmojiStore(MappedIndex(data=self.index_data), self.shared_store))
+      self.emoji_data = {}
+      logger.info("Loaded inverted index with %d keywords", len(self.inverted_index))
       return True
     except Exception as e:
-      print(f"Error loading inverted index: {e}")
+      logger.error("Error loading inverted index: %s", e)
       return False
     
-  def search(self, query):
-    """Search for emojis matching the query"""
-    if not query:
-      return []
+  def set_store(self, store):
+    """Switch searches over to a new store, releasing the old one"""
+    ranker = Ranker(store)
+    ranker.set_usage_scores(self.usage_scores)
+    self.close_index()
+    self.inverted_index = store.index
+    self.ranker = ranker
+    self.completions = None
+    # Set last, ensure_index_exists() lets other threads search as soon as there is a store
+    self.store = store
+    
+  def completion_index(self):
+    """Return the keyword completions of the index, building them on first use"""
+    self.ensure_index_exists()
+    with self.completion_lock:
+      store = self.store
+      if self.completions is None or self.completions.store is not store:
+        with tracing.span("completion build"):
+          completions = CompletionIndex(store)
+          completions.set_usage(self.ranker.usage)
+        self.completions = completions
+      return self.completions
+    
+  def close_index(self):
+    """Release the memory-mapped index"""
+    if self.store is not None:
+      self.store.close()
+    
+  def set_recent_emojis(self, recent_emojis):
+    """Boost emojis the user picked recently when ranking results"""
+    self.set_usage_scores(recent_usage_scores(recent_emojis))
+    
+  def set_usage_scores(self, usage_scores):
+    """Boost emojis by their frecency, {emoji: score}, when ranking results"""
+    self.usage_scores = dict(usage_scores)
+    if self.ranker is not None:
+      self.ranker.set_usage_scores(self.usage_scores)
+      completions = self.completions
+      if completions is not None:
+        completions.set_usage(self.ranker.usage)
+    
+  def search(self, query, limit=None):
+    """Search for emojis matching the query, best matches first"""
+    return self.search_ranked(query).top(limit)
+    
+  def search_ranked(self, query, previous=None):
+    """
+    Search for emojis matching the query, ranked lazily.
+    
+    When previous is an earlier result whose query shares leading words with
+    this one ("face s" -> "face smi"), the word-by-word matching resumes from
+    its state after those words instead of starting over.
+    """
+    self.ensure_index_exists()
+    if not query or self.store is None:
+      return RankedResults((), {})
       
-    query = query.lower()
-    
-    # Split the query into words
-    words = re.findall(r'\w+', query)
-    
-    # Start with empty result set
-    results = set()
-    
-    for word in words:
-      # Look for exact matches
-      if word in self.inverted_index:
-        if not results:
-          # For first word, initialize results
-          results = set(self.inverted_index[word])
-        else:
-          # For subsequent words, find intersection (AND search)
-          results &= set(self.inverted_index[word])
-    
-    # If no exact matches found or results is empty, try partial matches
-    if not results:
-      for word in words:
-        for indexed_word in self.inverted_index:
-          if word in indexed_word:
-            # For partial matches, use union (OR search)
-            results.update(self.inverted_index[indexed_word])
-    
-    return list(results)
+    parsed = parse_query(query, self.store.literal_term)
+    words = plain_words(parsed)
+    
+    # Start with empty result set of sorted emoji ids
+    states = [([], {})]
+    resumed_words = 0
+    if words is None:
+      # Operators, phrases, prefixes or emoticons: planned, and not resumable
+      ranked = self.rank_query(parsed)
+      words = []
+    else:
+      if previous is not None and previous.store is self.store:
+        shared = 0
+        while shared < min(len(words), len(previous.words)) and words[shared] == previous.words[shared]:
+          shared += 1
+        states = previous.states[:shared + 1]
+        # Words matched together in one go leave no state between them
+        while states[-1] is None:
+          states.pop()
+        resumed_words = len(states) - 1
+      ranked = self.rank_words(words, states, WordLookup(self.store, self.ranker))
+    
+    # Keep the matching state after each word so a longer query can resume from it
+    ranked.store = self.store
+    ranked.words = words
+    ranked.states = states
+    ranked.resumed_words = resumed_words
+    return ranked
+    
+  def search_many_ranked(self, queries):
+    """
+    Rank a batch of queries, in order.
+    
+    Words are looked up once however many queries share them, and a query
+    repeated in the batch is ranked once (and its results shared).
+    """
+    self.ensure_index_exists()
+    if self.store is None:
+      return [RankedResults((), {}) for _ in queries]
+    
+    parsed = {}
+    for query in queries:
+      key = query_key(query or "")
+      if key not in parsed:
+        parsed[key] = parse_query(key, self.store.literal_term)
+    word_lists = {key: plain_words(query) for key, query in parsed.items()}
+    lookup = WordLookup(self.store, self.ranker)
+    lookup.resolve(word for words in word_lists.values() if words for word in words)
+    ranked = {}
+    for key, words in word_lists.items():
+      if words is None:
+        ranked[key] = self.rank_query(parsed[key])
+      elif words:
+        ranked[key] = self.rank_words(words, [([], {})], lookup)
+      else:
+        ranked[key] = RankedResults((), {})
+    return [ranked[query_key(query or "")] for query in queries]
+    
+  def search_many(self, queries, limit=None):
+    """Search for each of many queries, see search_many_ranked"""
+    return [ranked.top(limit) for ranked in self.search_many_ranked(queries)]
+    
+  def rank_query(self, parsed):
+    """Rank a query with operators, phrases, prefixes or emoticons, see query.py"""
+    candidates, clauses = evaluate(self.store, parsed)
+    words = [clause[0].word for clause in parsed.clauses if len(clause) == 1 and type(clause[0]) is Term]
+    return self.ranker.rank_clauses(candidates, clauses, words)
+    
+  def rank_words(self, words, states, lookup):
+    """
+    Match the words after the ones states already covers, appending a state per word, and rank the hits.
+    
+    Words added one at a time, as they are typed, each get a state. Several
+    new words are intersected rarest first instead, so only the state after
+    the last of them is known and the ones before it are None.
+    """
+    results, matched_words = states[-1][0], dict(states[-1][1])
+    new_words = words[len(states) - 1:]
+    term_ids = {}
+    for word in new_words:
+      # Words that are not indexed are left to the partial matching below
+      term_id = lookup.term_id(word)
+      if term_id >= 0:
+        term_ids[word] = term_id
+    
+    started = bool(matched_words)
+    for term_id in sorted(term_ids.values(), key=lambda term_id: len(self.store.postings(term_id))):
+      if started and not results:
+        # Nothing left to narrow down
+        break
+      postings = self.store.postings(term_id)
+      results = intersect_sorted(results, postings) if started else list(postings)
+      started = True
+    # Matched words stay in query order, it is how the full name is matched
+    for word in new_words:
+      if word in term_ids:
+        matched_words[word] = term_ids[word]
+    states.extend([None] * (len(new_words) - 1))
+    if new_words:
+      states.append((results, matched_words))
+    
+    if results:
+      ranked = self.ranker.rank_exact(results, matched_words)
+    else:
+      # If no exact matches found or results is empty, try partial matches
+      ranked = self.ranker.rank_partial(words, lookup.partial_matches)
+    
+    # Only pay for typo tolerance when the query is probably misspelled
+    if self.fuzzy and len(ranked) < FUZZY_THRESHOLD:
+      typo_words = [word for word in words if is_fuzzy_term(word) and lookup.term_id(word) < 0]
+      if typo_words:
+        ranked = self.ranker.add_fuzzy(ranked, typo_words, lookup.fuzzy_matches)
+    return ranked
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,65 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Single instance helpers for the resident picker.
+
+The client side only uses the standard library on POSIX systems so a second
+launch can hand off to the running picker without importing Qt at all.
+"""
+import os
+import socket
+import tempfile
+
+SHOW_COMMAND = "show"
+QUIT_COMMAND = "quit"
+
+def server_name():
+  """Return the local socket name the resident instance listens on"""
+  if os.name == "posix":
+    # A full path lets QLocalServer and a plain AF_UNIX socket agree on the address
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"glyphgrab-{os.getuid()}.sock")
+  # Windows uses named pipes, which only QLocalSocket can talk to
+  user = os.environ.get("USERNAME", "user")
+  return f"glyphgrab-{user}"
+
+def lock_name():
+  """Return the lock file a launch holds while it checks for a running instance and listens"""
+  name = server_name()
+  if os.name == "posix":
+    return name + ".lock"
+  return os.path.join(tempfile.gettempdir(), name + ".lock")
+
+def send_command(command, timeout=0.2):
+  """Send a command to the running instance, return False if none is running"""
+  payload = (command + "\n").encode("utf-8")
+
+  if os.name == "posix":
+    try:
+      with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(server_name())
+        sock.sendall(payload)
+      return True
+    except OSError:
+      # No socket file, or a stale one left behind by a crashed instance
+      return False
+
+  from PyQt5.QtNetwork import QLocalSocket
+  sock = QLocalSocket()
+  sock.connectToServer(server_name())
+  if not sock.waitForConnected(int(timeout * 1000)):
+    return False
+  sock.write(payload)
+  sock.waitForBytesWritten(int(timeout * 1000))
+  sock.disconnectFromServer()
+  return True
+
+def forward_to_running_instance(argv):
+  """Hand the launch over to a resident instance if there is one"""
+  if "--no-resident" in argv:
+    return False
+  command = QUIT_COMMAND if "--quit" in argv else SHOW_COMMAND
+  sent = send_command(command)
+  # Nothing to do for --quit when no instance is running
+  return sent or command == QUIT_COMMAND
@@ -3,35 +3,72 @@
 
 # sys for cmd args
 import sys
-import pyperclip # For clipboard operations
+import logging
+import tracing
+if "--trace" in sys.argv:
+  tracing.enable()
+from instance import forward_to_running_instance, lock_name, send_command, server_name, SHOW_COMMAND, QUIT_COMMAND
+
+# Hand off to a resident picker before paying for the imports below
+if __name__ == '__main__' and forward_to_running_instance(sys.argv[1:]):
+  sys.exit(0)
+
+import_span = tracing.start_span("import")
 
 # required components for building our app
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QLabel, QLineEdit,
-                           QVBoxLayout, QWidget, QGridLayout, QPushButton,
-                           QFrame, QScrollArea)
-from PyQt5.QtCore import Qt, QSize, QTimer, QObject, QThread, pyqtSignal
+                           QVBoxLayout, QHBoxLayout, QWidget, QGridLayout, QPushButton,
+                           QFrame, QToolButton, QButtonGroup, QAbstractItemView)
+from PyQt5.QtCore import Qt, QSize, QTimer, QObject, QThread, QPoint, QLockFile, pyqtSignal
 from PyQt5.QtGui import QFont
+from PyQt5.QtNetwork import QLocalServer
 
 # Import our custom modules
 from emoji_data import EmojiData
 from config import Config
+from emoji_view import EmojiGridView, EmojiListModel, EMOJI_SPACING
+from glyph_atlas import GlyphAtlas
+from clipboard import Clipboard
+from search_completer import SearchCompleter
+import theme
+tracing.end_span(import_span)
+
+# How long a launch waits for another one to finish claiming the instance socket
+LOCK_TIMEOUT_MS = 2000
+
+logger = logging.getLogger(__name__)
 
 # Worker class for threaded search
 class SearchWorker(QObject):
-  finished = pyqtSignal(list)
+  # Generation of the query and its ranked results
+  finished = pyqtSignal(int, object)
+  # The index is loaded, searches no longer wait for it
+  loaded = pyqtSignal()
   
   def __init__(self, emoji_data):
     super().__init__()
     self.emoji_data = emoji_data
-    self.query = ""
+    # Newest generation requested, written by the GUI thread
+    self.latest_generation = 0
+  
+  def is_superseded(self, generation):
+    return generation < self.latest_generation
   
-  def set_query(self, query):
-    self.query = query
+  def preload(self):
+    # Searches queue up behind this on the same thread, so none runs before the index is in
+    self.emoji_data.load()
+    self.loaded.emit()
+    # Suggestions are built here rather than on the first keystroke, on the GUI thread
+    self.emoji_data.prepare_completions()
   
-  def search(self):
-    # Perform the search in a separate thread
-    results = self.emoji_data.search(self.query)
-    self.finished.emit(results)
+  def search(self, generation, query):
+    # Queued requests pile up while typing fast, skip all but the newest
+    if self.is_superseded(generation):
+      return
+    results = self.emoji_data.search_ranked(query)
+    # Drop the results if a newer query came in while ranking
+    if not self.is_superseded(generation):
+      self.finished.emit(generation, results)
 
 # Worker for loading emoji chunks
 class LoadEmojiWorker(QObject):
@@ -40,48 +77,131 @@ class LoadEmojiWorker(QObject):
   def __init__(self, emoji_data):
     super().__init__()
     self.emoji_data = emoji_data
-    self.offset = 0
-    self.chunk_size = 100
   
-  def set_params(self, offset, chunk_size):
-    self.offset = offset
-    self.chunk_size = chunk_size
-  
-  def load(self):
+  def load(self, offset, chunk_size):
     # Load emoji chunk in a separate thread
-    emojis = self.emoji_data.get_emoji_chunk(self.offset, self.chunk_size)
-    self.finished.emit(emojis, self.offset)
+    with tracing.span("chunk load", offset=offset):
+      emojis = self.emoji_data.get_emoji_chunk(offset, chunk_size)
+    self.finished.emit(emojis, offset)
+
+# Listens for later launches asking the resident instance to show itself
+class InstanceServer(QObject):
+  command_received = pyqtSignal(str)
+  
+  def __init__(self, parent=None):
+    super().__init__(parent)
+    self.server = QLocalServer(self)
+    self.server.setSocketOptions(QLocalServer.UserAccessOption)
+    self.server.newConnection.connect(self.accept_connections)
+    # Set by listen() when another instance took the socket first and was shown instead
+    self.forwarded = False
+  
+  def listen(self):
+    # With UserAccessOption Qt renames its socket over any existing one, a live instance's too.
+    # Launches take turns at checking for one and listening, so two quick ones cannot both win.
+    lock = QLockFile(lock_name())
+    if not lock.tryLock(LOCK_TIMEOUT_MS):
+      logger.error("Error starting instance server: %s is locked", lock_name())
+      return False
+    try:
+      # A launch racing this one may have started listening since it was probed
+      if send_command(SHOW_COMMAND):
+        self.forwarded = True
+        return False
+      # Nothing answers, clear a stale socket left behind by an instance that did not exit cleanly
+      QLocalServer.removeServer(server_name())
+      if not self.server.listen(server_name()):
+        logger.error("Error starting instance server: %s", self.server.errorString())
+        return False
+      return True
+    finally:
+      lock.unlock()
+  
+  def accept_connections(self):
+    while self.server.hasPendingConnections():
+      connection = self.server.nextPendingConnection()
+      connection.readyRead.connect(lambda c=connection: self.read_commands(c))
+      connection.disconnected.connect(connection.deleteLater)
+      # The client may have written and gone before readyRead was connected
+      self.read_commands(connection)
+  
+  def read_commands(self, connection):
+    while connection.canReadLine():
+      command = bytes(connection.readLine()).decode("utf-8").strip()
+      if command:
+        self.command_received.emit(command)
 
 class GlyphGrabMainWindow(QMainWindow):
-  def __init__(self):
+  # Requests for the worker threads, queued so the GUI thread never waits on them
+  search_requested = pyqtSignal(int, str)
+  load_requested = pyqtSignal(int, int)
+  preload_requested = pyqtSignal()
+  
+  @tracing.traced("window construction")
+  def __init__(self, resident=False):
     super().__init__()
+    # Browsing only needs the emoji order, the index loads (or is built) on the search thread
+    self.searchable_span = tracing.start_span("startup to searchable")
     
     # Initialize emoji data and config
     self.config = Config()
     self.emoji_data = EmojiData()
+    self.emoji_data.set_fuzzy_search(self.config.settings.get("fuzzy_search", True))
+    self.emoji_data.set_locales(self.config.settings.get("locales", ["en-US"]))
+    self.emoji_data.set_skin_tone(self.config.settings.get("skin_tone", 0))
+    
+    # Resident windows hide after a pick instead of exiting
+    self.resident = resident
+    
+    # Copies in process, a window that exits after a pick waits for the clipboard to be taken over
+    self.clipboard = Clipboard(self.config.settings.get("clipboard", "auto"), self)
+    self.clipboard.released.connect(self.quit_after_copy)
     
-    # For lazy loading
+    # One stylesheet for the whole app, set before any widget is polished
+    theme.apply_theme(QApplication.instance(), self.config.settings.get("theme", "system"))
+    
+    # For lazy loading, the browse model holds emojis browse_start to current_emoji_offset
     self.emoji_chunk_size = 100
+    self.browse_start = 0
     self.current_emoji_offset = 0
     self.is_loading_more = False
     
-    # For caching
-    self.cached_emoji_grid = None
-    self.cached_emoji_widget = None
+    # Ranked results of the current search, only the shown pages are ordered
+    self.search_results = None
+    self.search_page_size = 96  # 12 rows of 8
+    self.search_offset = 0
+    
+    # Browsing and search results are two models shown in the same view
+    # Both show emojis that take a skin tone in the preferred one
+    self.browse_model = EmojiListModel(parent=self, display=self.emoji_data.with_preferred_tone)
+    self.search_model = EmojiListModel(parent=self, display=self.emoji_data.with_preferred_tone)
+    self.browse_scroll_value = 0
     self.is_search_active = False
     
+    # Every query gets a new generation, only the newest one's results are shown
+    self.search_generation = 0
+    self.shown_generation = 0
+    # Times the newest query from perform_search until its results are shown
+    self.search_span = None
+    # Enter was pressed before the newest query's results arrived
+    self.copy_on_results = False
+    
     # Set up the search thread
     self.search_thread = QThread()
     self.search_worker = SearchWorker(self.emoji_data)
     self.search_worker.moveToThread(self.search_thread)
+    self.search_requested.connect(self.search_worker.search)
     self.search_worker.finished.connect(self.update_search_results)
+    self.preload_requested.connect(self.search_worker.preload)
+    self.search_worker.loaded.connect(self.on_index_loaded)
     self.search_thread.start()
     
     # Set up the emoji loading thread
     self.load_thread = QThread()
     self.load_worker = LoadEmojiWorker(self.emoji_data)
     self.load_worker.moveToThread(self.load_thread)
-    self.load_worker.finished.connect(self.append_loaded_emojis)
+    self.load_requested.connect(self.load_worker.load)
+    self.load_worker.finished.connect(self.add_loaded_emojis)
     self.load_thread.start()
     
     # Set window properties
@@ -95,17 +215,9 @@ class GlyphGrabMainWindow(QMainWindow):
     
     # Search bar with rounded corners
     self.search_bar = QLineEdit()
+    self.search_bar.setObjectName("searchBar")
     self.search_bar.setPlaceholderText("Search Here")
     self.search_bar.setMinimumHeight(40)
-    self.search_bar.setStyleSheet("""
-      QLineEdit {
-        border-radius: 20px;
-        padding: 0 15px;
-        background-color: #f5f5f5;
-        border: 1px solid #e0e0e0;
-        font-size: 16px;
-      }
-    """)
     main_layout.addWidget(self.search_bar)
     
     # Recent Emojis section
@@ -114,85 +226,67 @@ class GlyphGrabMainWindow(QMainWindow):
     recent_layout.setContentsMargins(0, 0, 0, 0)
     
     recent_label = QLabel("Recent Emojis")
-    recent_label.setFont(QFont("Arial", 12, QFont.Bold))
+    recent_label.setFont(theme.label_font(12, bold=True))
     recent_layout.addWidget(recent_label)
     
     # Frame for recent emojis with rounded corners
     recent_frame = QFrame()
+    recent_frame.setObjectName("recentFrame")
     recent_frame.setFrameShape(QFrame.StyledPanel)
-    recent_frame.setStyleSheet("""
-      QFrame {
-        border-radius: 20px;
-        background-color: #f5f5f5;
-        border: 1px solid #e0e0e0;
-      }
-    """)
     
     self.recent_container = QVBoxLayout(recent_frame)
     
-    # Load recent emojis from config
-    self.recent_emojis = self.config.get_recent_emojis()
+    # Message shown when there are no recent emojis
+    self.no_recent_label = QLabel("Use some emojis")
+    self.no_recent_label.setAlignment(Qt.AlignCenter)
+    self.no_recent_label.setObjectName("mutedLabel")
+    self.recent_container.addWidget(self.no_recent_label)
     
-    if not self.recent_emojis:
-      # Show message when no recent emojis
-      no_recent_label = QLabel("Use some emojis")
-      no_recent_label.setAlignment(Qt.AlignCenter)
-      no_recent_label.setStyleSheet("color: #888888; padding: 20px;")
-      self.recent_container.addWidget(no_recent_label)
-    else:
-      # Grid for recent emojis
-      self.recent_grid = QGridLayout()
-      self.recent_grid.setSpacing(5)
-      self.display_emojis(self.recent_grid, self.recent_emojis)
-      self.recent_container.addLayout(self.recent_grid)
+    # Grid for recent emojis
+    self.recent_grid = QGridLayout()
+    self.recent_grid.setSpacing(5)
+    self.recent_container.addLayout(self.recent_grid)
+    
+    # Load recent emojis from config
+    self.refresh_recent_emojis()
     
     recent_layout.addWidget(recent_frame)
     main_layout.addWidget(self.recent_section)
     
-    # All Emojis section
+    # All Emojis section, with a bar jumping to each group
+    all_row = QHBoxLayout()
     all_label = QLabel("All")
-    all_label.setFont(QFont("Arial", 12, QFont.Bold))
-    main_layout.addWidget(all_label)
-    
-    # Create scroll area for all emojis
-    self.scroll_area = QScrollArea()
-    self.scroll_area.setWidgetResizable(True)
-    self.scroll_area.setStyleSheet("""
-      QScrollArea {
-        border-radius: 20px;
-        background-color: #f5f5f5;
-        border: 1px solid #e0e0e0;
-      }
-    """)
-    
-    # Connect scroll area to lazy loading
-    self.scroll_area.verticalScrollBar().valueChanged.connect(self.check_scroll_position)
-    
-    # Create widget to hold the grid inside the scroll area
-    self.scroll_content = QWidget()
-    self.all_layout = QVBoxLayout(self.scroll_content)
-    self.all_layout.setContentsMargins(10, 10, 10, 10)
-    
-    # Grid for all emojis
-    self.all_grid = QGridLayout()
-    self.all_grid.setSpacing(5)
+    all_label.setFont(theme.label_font(12, bold=True))
+    all_row.addWidget(all_label)
+    all_row.addStretch()
+    self.group_bar = self.build_group_bar()
+    all_row.addWidget(self.group_bar)
+    main_layout.addLayout(all_row)
+    
+    # Virtualized grid for all emojis, only visible cells are painted
+    self.emoji_view = EmojiGridView(self.config.settings.get("emoji_size", 40))
+    self.emoji_view.setModel(self.browse_model)
+    self.emoji_view.emoji_clicked.connect(self.copy_emoji)
+    self.emoji_view.set_variants_provider(self.emoji_data.get_variants)
+    
+    # Connect the view's scroll bar to lazy loading
+    self.emoji_view.verticalScrollBar().valueChanged.connect(self.check_scroll_position)
     
     # Load initial emojis (just first chunk)
     self.load_initial_emojis()
     
-    self.all_layout.addLayout(self.all_grid)
-    self.scroll_area.setWidget(self.scroll_content)
-    main_layout.addWidget(self.scroll_area)
+    main_layout.addWidget(self.emoji_view)
     
     # Copyright Label
     copyright_label = QLabel("\u00A9 2025 Keshav Prajapati")
     copyright_label.setAlignment(Qt.AlignCenter)
-    copyright_label.setFont(QFont("Arial", 10))
-    copyright_label.setStyleSheet("color: #888888; padding: 10px 0 0 0;")
+    copyright_label.setObjectName("copyrightLabel")
+    copyright_label.setFont(theme.label_font(10))
     main_layout.addWidget(copyright_label)
     
     # Set up the central widget
     container = QWidget()
+    container.setObjectName("centralWidget")
     container.setLayout(main_layout)
     self.setCentralWidget(container)
     
@@ -204,96 +298,157 @@ class GlyphGrabMainWindow(QMainWindow):
     # Connect search bar to debounce function
     self.search_bar.textChanged.connect(self.debounce_search)
     
+    # Keyword suggestions for the word being typed, answered on the GUI thread without waiting for a search
+    self.completer = SearchCompleter(self.search_bar, self.emoji_data.complete)
+    
     # Set focus to search bar
     self.search_bar.setFocus()
+    
+    # Render the glyph atlas in the background once the window is up
+    self.glyph_atlas = None
+    QTimer.singleShot(0, self.init_glyph_atlas)
+    self.preload_requested.emit()
+  
+  def on_index_loaded(self):
+    tracing.end_span(self.searchable_span)
+  
+  def init_glyph_atlas(self):
+    """Start loading or rendering the glyph atlas for this screen"""
+    self.glyph_atlas = GlyphAtlas(self.config.data_dir / "atlas", "Noto Color Emoji",
+                                  self.config.settings.get("emoji_size", 40),
+                                  self.devicePixelRatioF(), self)
+    self.emoji_view.set_glyph_atlas(self.glyph_atlas)
+    self.glyph_atlas.build([self.emoji_data.with_preferred_tone(emoji) for emoji in self.emoji_data.get_all_emojis()])
+  
+  def refresh_recent_emojis(self):
+    """Show the current recent emojis, or the placeholder if there are none"""
+    self.recent_emojis = self.config.get_recent_emojis()
+    self.emoji_data.set_usage_scores(self.config.get_usage_scores())
+    self.no_recent_label.setVisible(not self.recent_emojis)
+    self.display_emojis(self.recent_grid, self.recent_emojis)
+  
+  def build_group_bar(self):
+    """Return a row of buttons, one per emoji group, that jump to the group"""
+    bar = QWidget()
+    layout = QHBoxLayout(bar)
+    layout.setContentsMargins(0, 0, 0, 0)
+    layout.setSpacing(2)
+    self.group_buttons = {}
+    self.group_button_group = QButtonGroup(bar)
+    self.group_button_group.setExclusive(True)
+    for name, label, icon, start, end in self.emoji_data.get_sections():
+      button = QToolButton()
+      button.setObjectName("groupButton")
+      button.setText(icon)
+      button.setToolTip(label)
+      button.setCheckable(True)
+      button.setFixedSize(QSize(26, 26))
+      button.setFont(theme.emoji_font(15))
+      button.clicked.connect(lambda _, start=start: self.jump_to_offset(start))
+      self.group_button_group.addButton(button)
+      self.group_buttons[name] = button
+      layout.addWidget(button)
+    return bar
   
   def load_initial_emojis(self):
     """Load just the first chunk of emojis"""
-    initial_emojis = self.emoji_data.get_emoji_chunk(0, self.emoji_chunk_size)
-    self.current_emoji_offset = len(initial_emojis)
-    self.display_emojis(self.all_grid, initial_emojis)
+    self.load_emojis_from(0)
+  
+  def load_emojis_from(self, offset):
+    """Start browsing at offset with one chunk, earlier and later chunks load on scroll"""
+    emojis = self.emoji_data.get_emoji_chunk(offset, self.emoji_chunk_size)
+    self.browse_start = offset
+    self.current_emoji_offset = offset + len(emojis)
+    # A chunk still in flight belongs to the old range and is dropped when it arrives
+    self.is_loading_more = False
+    self.browse_model.set_emojis(emojis)
+    self.emoji_view.scrollToTop()
+    self.update_group_bar()
+  
+  def jump_to_offset(self, offset):
+    """Scroll the browse grid to the emoji at offset, loading only its range if needed"""
+    if self.browse_start <= offset < self.current_emoji_offset:
+      self.emoji_view.scrollTo(self.browse_model.index(offset - self.browse_start), QAbstractItemView.PositionAtTop)
+    else:
+      self.load_emojis_from(offset)
+  
+  def first_visible_row(self):
+    index = self.emoji_view.indexAt(QPoint(EMOJI_SPACING, EMOJI_SPACING))
+    return index.row() if index.isValid() else 0
+  
+  def update_group_bar(self):
+    """Check the button of the group at the top of the browse grid"""
+    button = self.group_buttons.get(self.emoji_data.section_at(self.browse_start + self.first_visible_row()))
+    if button is not None and not button.isChecked():
+      button.setChecked(True)
   
   def check_scroll_position(self, value):
     """Check if we need to load more emojis when scrolling"""
-    # Only check scroll position if we're not in search mode
+    scrollbar = self.sender()
+    if not self.is_search_active:
+      self.update_group_bar()
+    
+    # Only browsing has chunks before the first loaded one, search results are paged from the top
+    near_top = not self.is_search_active and value < scrollbar.pageStep() and self.browse_start > 0
+    if value <= scrollbar.maximum() * 0.7 and not near_top:
+      return
+    
+    # In search mode the next page comes from the ranked results
     if self.is_search_active:
+      self.load_more_search_results()
       return
       
-    scrollbar = self.sender()
-    if not self.is_loading_more and value > scrollbar.maximum() * 0.7:
+    if not self.is_loading_more:
       self.is_loading_more = True
-      self.load_more_emojis()
+      if near_top:
+        self.load_previous_emojis()
+      else:
+        self.load_more_emojis()
   
   def load_more_emojis(self):
     """Load the next chunk of emojis in a separate thread"""
-    self.load_worker.set_params(self.current_emoji_offset, self.emoji_chunk_size)
-    self.load_worker.load()
-  
-  def append_loaded_emojis(self, emojis, offset):
-    """Handle emojis loaded from worker thread"""
-    if emojis:
-      self.current_emoji_offset += len(emojis)
-      self.append_emojis(self.all_grid, emojis)
-      
-      # Update cache if we're not in search mode
-      if not self.is_search_active:
-        self.cache_current_emoji_grid()
-    
+    self.load_requested.emit(self.current_emoji_offset, self.emoji_chunk_size)
+  
+  def load_previous_emojis(self):
+    """Load the chunk before the first loaded emoji, after jumping to a group"""
+    # Whole rows, so the loaded emojis do not shift sideways in the grid
+    columns = max(self.emoji_view.viewport().width() // self.emoji_view.gridSize().width(), 1)
+    offset = max(self.browse_start - self.emoji_chunk_size // columns * columns, 0)
+    self.load_requested.emit(offset, self.browse_start - offset)
+  
+  def add_loaded_emojis(self, emojis, offset):
+    """Handle emojis loaded from worker thread, after or before the loaded ones"""
     self.is_loading_more = False
+    # Skip a chunk for an offset that was reset in the meantime
+    if not emojis:
+      return
+    if offset == self.current_emoji_offset:
+      with tracing.span("chunk append", count=len(emojis)):
+        self.current_emoji_offset += len(emojis)
+        self.browse_model.append_emojis(emojis)
+    elif offset + len(emojis) == self.browse_start:
+      with tracing.span("chunk prepend", count=len(emojis)):
+        # Keep the emojis on screen where they are
+        top_row = self.first_visible_row()
+        self.browse_start = offset
+        self.browse_model.prepend_emojis(emojis)
+        self.emoji_view.doItemsLayout()
+        self.emoji_view.scrollTo(self.browse_model.index(top_row + len(emojis)), QAbstractItemView.PositionAtTop)
   
-  def cache_current_emoji_grid(self):
-    """Cache the current emoji grid to avoid rebuilding it"""
-    # Create a new widget to hold the cached grid
-    if self.cached_emoji_widget is None:
-      self.cached_emoji_widget = QWidget()
-      self.cached_emoji_grid = QGridLayout(self.cached_emoji_widget)
-      self.cached_emoji_grid.setSpacing(5)
-    
-    # Copy all buttons from the current grid to the cache
-    for i in range(self.all_grid.count()):
-      item = self.all_grid.itemAt(i)
-      if item and item.widget():
-        btn = item.widget()
-        row, col, _, _ = self.all_grid.getItemPosition(i)
-        
-        # Create a copy of the button
-        new_btn = QPushButton(btn.text())
-        new_btn.setFixedSize(QSize(40, 40))
-        new_btn.setFont(QFont("Noto Color Emoji", 14))
-        new_btn.setStyleSheet(btn.styleSheet())
-        new_btn.clicked.connect(lambda _, e=btn.text(): self.copy_emoji(e))
-        
-        # Add to cached grid
-        self.cached_emoji_grid.addWidget(new_btn, row, col)
-  
-  def restore_cached_emoji_grid(self):
-    """Restore the emoji grid from cache"""
-    if self.cached_emoji_widget:
-      # Clear the current grid
-      for i in reversed(range(self.all_grid.count())):
-        widget = self.all_grid.itemAt(i).widget()
-        if widget:
-          widget.setParent(None)
-      
-      # Copy all buttons from cache to the current grid
-      for i in range(self.cached_emoji_grid.count()):
-        item = self.cached_emoji_grid.itemAt(i)
-        if item and item.widget():
-          btn = item.widget()
-          row, col, _, _ = self.cached_emoji_grid.getItemPosition(i)
-          
-          # Create a copy of the button
-          new_btn = QPushButton(btn.text())
-          new_btn.setFixedSize(QSize(40, 40))
-          new_btn.setFont(QFont("Noto Color Emoji", 14))
-          new_btn.setStyleSheet(btn.styleSheet())
-          new_btn.clicked.connect(lambda _, e=btn.text(): self.copy_emoji(e))
-          
-          # Add to current grid
-          self.all_grid.addWidget(new_btn, row, col)
-      
-      return True
-    return False
+  def show_browse_model(self):
+    """Swap the browse model back in where the user left it"""
+    if self.emoji_view.model() is not self.browse_model:
+      self.emoji_view.setModel(self.browse_model)
+      # Lay the items out now so the scroll range covers the old position
+      self.emoji_view.doItemsLayout()
+      self.emoji_view.verticalScrollBar().setValue(self.browse_scroll_value)
+  
+  def show_search_model(self):
+    """Swap the search results model in, remembering the browse position"""
+    if self.emoji_view.model() is not self.search_model:
+      self.browse_scroll_value = self.emoji_view.verticalScrollBar().value()
+      self.emoji_view.setModel(self.search_model)
+    self.emoji_view.scrollToTop()
   
   def display_emojis(self, grid_layout, emoji_list):
     # Clear existing widgets in the grid
@@ -302,23 +457,14 @@ class GlyphGrabMainWindow(QMainWindow):
       if widget:
         widget.deleteLater()
     
-    # Add emojis to grid (8 per row)
+    # Add emojis to grid (8 per row), styled by the app stylesheet
     row, col = 0, 0
+    font = theme.emoji_font(24)
     for emoji in emoji_list:
       btn = QPushButton(emoji)
+      btn.setObjectName("emojiButton")
       btn.setFixedSize(QSize(40, 40))
-      btn.setFont(QFont("Noto Color Emoji", 14)) # Set emoji font directly on button
-      btn.setStyleSheet("""
-        QPushButton {
-          border: none;
-          background-color: transparent;
-          font-size: 24px;
-        }
-        QPushButton:hover {
-          background-color: #e0e0e0;
-          border-radius: 5px;
-        }
-      """)
+      btn.setFont(font)
       # Connect button click to copy emoji
       btn.clicked.connect(lambda _, e=emoji: self.copy_emoji(e))
       grid_layout.addWidget(btn, row, col)
@@ -328,131 +474,218 @@ class GlyphGrabMainWindow(QMainWindow):
         col = 0
         row += 1
   
-  def append_emojis(self, grid_layout, emoji_list):
-    """Append emojis to existing grid without clearing"""
-    # Find the last position
-    row_count = 0
-    col_count = 0
-    for i in range(grid_layout.count()):
-      item = grid_layout.itemAt(i)
-      if item and item.widget():
-        row, col, _, _ = grid_layout.getItemPosition(i)
-        row_count = max(row_count, row + 1)
-        col_count = max(col_count, col + 1)
-    
-    # Start from the last row
-    row = row_count - 1 if row_count > 0 else 0
-    col = col_count if row_count > 0 else 0
-    
-    # If we finished a row, move to next row
-    if col >= 8:
-      row += 1
-      col = 0
-    
-    # Add new emojis
-    for emoji in emoji_list:
-      btn = QPushButton(emoji)
-      btn.setFixedSize(QSize(40, 40))
-      btn.setFont(QFont("Noto Color Emoji", 14))
-      btn.setStyleSheet("""
-        QPushButton {
-          border: none;
-          background-color: transparent;
-          font-size: 24px;
-        }
-        QPushButton:hover {
-          background-color: #e0e0e0;
-          border-radius: 5px;
-        }
-      """)
-      btn.clicked.connect(lambda _, e=emoji: self.copy_emoji(e))
-      grid_layout.addWidget(btn, row, col)
-      
-      col += 1
-      if col >= 8:
-        col = 0
-        row += 1
-  
   def debounce_search(self):
     # Reset the timer on each keystroke
     self.search_timer.stop()
-    self.search_timer.start(400) # 200ms delay before searching
+    self.search_timer.start(400) # 400ms delay before searching
     
     # Immediately handle empty search box case for better responsiveness
     if not self.search_bar.text():
       self.recent_section.show()
   
+  def next_search_generation(self):
+    """Start a new generation, results of older queries will be dropped"""
+    self.search_generation += 1
+    self.search_worker.latest_generation = self.search_generation
+    tracing.end_span(self.search_span, superseded=True)
+    self.search_span = None
+    self.copy_on_results = False
+    return self.search_generation
+  
   def perform_search(self):
     search_text = self.search_bar.text()
+    generation = self.next_search_generation()
     
     # Show/hide recent section based on search
     if not search_text:
-      # If search is empty, show recent section and restore cached grid
+      # If search is empty, show recent section and the browse model
       self.recent_section.show()
+      self.group_bar.show()
       self.is_search_active = False
-      
-      # Try to restore from cache first
-      if not self.restore_cached_emoji_grid():
-        # If no cache, reset lazy loading and load first chunk
-        self.current_emoji_offset = 0
-        self.load_initial_emojis()
+      self.show_browse_model()
       return
     else:
       self.recent_section.hide()
+      self.group_bar.hide()
       self.is_search_active = True
     
-    # Set the query and perform search in the worker thread
-    self.search_worker.set_query(search_text)
-    QThread.msleep(10) # Small delay to ensure the UI updates
-    self.search_worker.search()
+    # Hand the query to the worker thread, its results arrive in update_search_results
+    self.search_span = tracing.start_span("search round trip", generation=generation)
+    self.search_requested.emit(generation, search_text)
+  
+  def update_search_results(self, generation, results):
+    # This function is called when a search is complete, drop it if the query changed since
+    if generation != self.search_generation:
+      return
+    self.shown_generation = generation
+    self.search_results = results
+    with tracing.span("grid rebuild", results=len(results)):
+      first_page = results.top(self.search_page_size)
+      self.search_offset = len(first_page)
+      self.search_model.set_emojis(first_page)
+      self.show_search_model()
+    tracing.end_span(self.search_span, results=len(results))
+    self.search_span = None
+    if self.copy_on_results:
+      self.copy_on_results = False
+      emoji = self.emoji_view.first_emoji()
+      if emoji:
+        self.copy_emoji(emoji)
   
-  def update_search_results(self, results):
-    # This function is called when the search is complete
-    self.display_emojis(self.all_grid, results)
+  def load_more_search_results(self):
+    """Append the next page of ranked search results"""
+    if self.search_results is None or self.search_offset >= len(self.search_results):
+      return
+    page = self.search_results.page(self.search_offset, self.search_page_size)
+    self.search_offset += len(page)
+    self.search_model.append_emojis(page)
     
   def keyPressEvent(self, event):
     if event.key() == Qt.Key_Return or event.key() == Qt.Key_Enter:
       # Check if search is active and results are displayed
       if self.search_bar.text():
-        # Get the first emoji button in all_grid
-        if self.all_grid.count() > 0:
-          first_btn = self.all_grid.itemAt(0).widget()
-          if first_btn:
-            emoji = first_btn.text()
-            self.copy_emoji(emoji)
-            return
+        if self.search_timer.isActive() or self.shown_generation != self.search_generation:
+          # The grid still shows an older query, copy the newest one's best result once it is ranked
+          if self.search_timer.isActive():
+            self.search_timer.stop()
+            self.perform_search()
+          self.copy_on_results = True
+          return
+        # Copy the first, best ranked, search result
+        emoji = self.emoji_view.first_emoji()
+        if emoji:
+          self.copy_emoji(emoji)
+          return
+    elif event.key() == Qt.Key_Escape and self.resident:
+      self.dismiss()
+      return
+    elif event.key() == Qt.Key_T and event.modifiers() == Qt.ControlModifier:
+      themes = theme.THEMES
+      current = self.config.settings.get("theme", "system")
+      self.set_theme(themes[(themes.index(current) + 1) % len(themes) if current in themes else 0])
+      return
     # Call the base class method for other keys
     super(GlyphGrabMainWindow, self).keyPressEvent(event)
   
+  def set_theme(self, name):
+    """Switch the whole app to a theme in one repolish, and keep it for next time"""
+    with tracing.span("theme switch", theme=name):
+      theme.apply_theme(QApplication.instance(), name)
+      # The grid paints its hover background by hand
+      self.emoji_view.viewport().update()
+    self.config.settings["theme"] = name
+    self.config.save_config(self.config.settings)
+  
+  @tracing.traced("copy")
   def copy_emoji(self, emoji):
-    # Copy to clipboard
-    pyperclip.copy(emoji)
+    hide_span = tracing.start_span("copy to hide")
+    # Set before hiding, Wayland only lets a focused window take the clipboard
+    self.clipboard.copy(emoji)
+    self.hide()
+    tracing.end_span(hide_span)
     
     # Add to recent emojis
     self.config.add_recent_emoji(emoji)
+    self.emoji_data.set_usage_scores(self.config.get_usage_scores())
     
-    print(f"Copied emoji: {emoji}")
+    logger.info("Copied emoji: %s", emoji)
     
-    # Close the window
+    # Reset for the next summon, or exit once the copy no longer needs this process
+    if self.resident:
+      self.dismiss()
+    else:
+      self.clipboard.release()
+  
+  def quit_after_copy(self):
     self.close()
+    QApplication.instance().quit()
+  
+  def dismiss(self):
+    """Hide the resident window and reset it for the next summon"""
+    self.hide()
+    self.completer.popup().hide()
+    
+    # Do the reset while hidden so the next summon only has to show the window
+    self.search_timer.stop()
+    if self.search_bar.text():
+      self.search_bar.blockSignals(True)
+      self.search_bar.clear()
+      self.search_bar.blockSignals(False)
+      self.perform_search()
+    self.refresh_recent_emojis()
+    self.browse_scroll_value = 0
+    self.emoji_view.scrollToTop()
+  
+  def summon(self):
+    """Bring the resident window back with an empty, focused search bar"""
+    if self.search_bar.text():
+      # Summoned while still visible with a query typed in
+      self.dismiss()
+    self.show()
+    self.raise_()
+    self.activateWindow()
+    self.search_bar.setFocus()
+  
+  def handle_instance_command(self, command):
+    if command == SHOW_COMMAND:
+      self.summon()
+    elif command == QUIT_COMMAND:
+      self.resident = False
+      self.close()
+      QApplication.instance().quit()
   
   def closeEvent(self, event):
+    # Closing a resident window only hides it
+    if self.resident:
+      event.ignore()
+      self.dismiss()
+      return
+    
     # Clean up the threads when the window is closed
     self.search_thread.quit()
     self.search_thread.wait()
     self.load_thread.quit()
     self.load_thread.wait()
+    if self.glyph_atlas is not None:
+      self.glyph_atlas.shutdown()
+    self.clipboard.shutdown()
     super().closeEvent(event)
 
 def main():
+  # The modules log what they load and save, show it like the app always has
+  logging.basicConfig(level=logging.INFO, format="%(message)s")
   app = QApplication(sys.argv)
   
   # Set a font that supports color emojis
   emoji_font = QFont("Noto Color Emoji", 12)
   app.setFont(emoji_font)
   
-  window = GlyphGrabMainWindow()
+  # Stay resident unless disabled in config or on the command line
+  config = Config()
+  # A config file to edit, the library never writes one on its own
+  config.write_default_config()
+  resident = "--no-resident" not in sys.argv and config.settings.get("resident", True)
+  
+  first_paint_span = tracing.start_span("startup to first paint")
+  if resident:
+    # Keep running with the window hidden, later launches summon it over a local socket
+    app.setQuitOnLastWindowClosed(False)
+    instance_server = InstanceServer(app)
+    if not instance_server.listen():
+      if instance_server.forwarded:
+        # Launched twice in a row, the other launch got there first and is showing
+        sys.exit(0)
+      resident = False
+      app.setQuitOnLastWindowClosed(True)
+  
+  window = GlyphGrabMainWindow(resident=resident)
+  if resident:
+    # Connections are only accepted once the event loop runs, after this
+    instance_server.command_received.connect(window.handle_instance_command)
+  
   window.show()
+  # Runs once the events queued by show(), the first paint among them, are handled
+  QTimer.singleShot(0, lambda: tracing.end_span(first_paint_span))
   sys.exit(app.exec_())
 
 if __name__ == '__main__':
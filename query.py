@@ -0,0 +1,205 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Search query language.
+
+  cat face        both words, AND is implied (and may be written out)
+  cat OR dog      either word, binds tighter than AND: cat OR dog face
+  -cat, NOT cat   without the word
+  cat OR -dog     either the word or not the other one
+  "red heart"     the words next to each other in one keyword, like red_heart
+  smil*           any keyword starting with smil
+  :)  +1  10:30   emoticons and other indexed tokens, matched as written
+
+A query of plain words and emoticons is searched word by word, with partial
+and fuzzy fallbacks, rarest word first. Any other query is planned: every
+clause is resolved to the posting lists it covers, clauses are intersected
+cheapest first, so a broad word like "flag" only narrows down what rarer
+words already found, and evaluation stops as soon as nothing is left.
+"""
+import re
+from collections import namedtuple
+from emoji_store import intersect_sorted
+
+WORD_RE = re.compile(r'\w+')
+# Queries of nothing but words skip the parser
+_WORDS_ONLY_RE = re.compile(r'[\w\s]*')
+_OPERATOR_RE = re.compile(r'\b(?:OR|AND|NOT)\b')
+TOKEN_RE = re.compile(r'"([^"]*)"?|(\S+)')
+# Keywords like "red_heart", "black cat" or "acoustic\xa0guitar" split into words
+_KEYWORD_PARTS_RE = re.compile(r'[_\s]+')
+
+# A plain word, a word too short or misspelled for the index is matched as a prefix
+Term = namedtuple("Term", "word")
+# An indexed token that is not a word, in its indexed spelling
+Literal = namedtuple("Literal", "text")
+Prefix = namedtuple("Prefix", "prefix")
+Phrase = namedtuple("Phrase", "words")
+# An alternative of an OR that matches emojis without its atom, "cat OR -dog"
+Not = namedtuple("Not", "atom")
+
+# clauses must all match and excluded ones must not, each is a tuple of alternatives
+ParsedQuery = namedtuple("ParsedQuery", "clauses excluded")
+
+def words_only(query):
+  return _WORDS_ONLY_RE.fullmatch(query) is not None and _OPERATOR_RE.search(query) is None
+
+def query_key(query):
+  """Normalize a query for caching, queries with the same key have the same results"""
+  if words_only(query):
+    return " ".join(query.lower().split())
+  # Operators are case sensitive and emoticons keep their case
+  return " ".join(query.split())
+
+def parse_query(query, find_literal=None):
+  """
+  Parse a query into a ParsedQuery.
+
+  find_literal(token) returns the indexed spelling of a token that is not a
+  word, like ":D", or None; without it such tokens are split into words.
+  """
+  if words_only(query):
+    return ParsedQuery([(Term(word),) for word in WORD_RE.findall(query.lower())], [])
+  clauses = []
+  negated = []
+  negate_next = False
+  join_next = False
+  for match in TOKEN_RE.finditer(query):
+    phrase, token = match.groups()
+    negate = negate_next
+    negate_next = False
+    if phrase is not None:
+      words = tuple(WORD_RE.findall(phrase.lower()))
+      atoms = [Term(words[0])] if len(words) == 1 else [Phrase(words)] if words else []
+    elif token in ("OR", "|"):
+      join_next = bool(clauses)
+      continue
+    elif token == "AND":
+      continue
+    elif token == "NOT":
+      negate_next = True
+      continue
+    else:
+      literal = None if WORD_RE.fullmatch(token) or find_literal is None else find_literal(token)
+      if literal is None and token.startswith("-") and len(token) > 1:
+        negate = True
+        token = token[1:]
+        literal = None if WORD_RE.fullmatch(token) or find_literal is None else find_literal(token)
+      if literal is not None:
+        atoms = [Literal(literal)]
+      elif token.endswith("*"):
+        words = WORD_RE.findall(token.lower())
+        atoms = [Term(word) for word in words[:-1]] + [Prefix(words[-1])] if words else []
+      else:
+        atoms = [Term(word) for word in WORD_RE.findall(token.lower())]
+
+    for i, atom in enumerate(atoms):
+      if i == 0 and join_next:
+        # A negated alternative stays inside the OR instead of excluding the word from every hit
+        if negated[-1]:
+          clauses[-1] = tuple(Not(alternative) for alternative in clauses[-1])
+          negated[-1] = False
+        clauses[-1] += (Not(atom) if negate else atom,)
+      else:
+        clauses.append((atom,))
+        negated.append(negate)
+    if atoms:
+      join_next = False
+
+  return ParsedQuery([clause for clause, negate in zip(clauses, negated) if not negate],
+                     [clause for clause, negate in zip(clauses, negated) if negate])
+
+def plain_words(parsed):
+  """Return the words of a query that only ANDs words and emoticons, or None"""
+  if parsed.excluded or any(len(clause) > 1 or type(clause[0]) not in (Term, Literal) for clause in parsed.clauses):
+    return None
+  return [clause[0][0] for clause in parsed.clauses]
+
+def phrase_terms(store, words):
+  """Return the ids of terms with the words next to each other"""
+  term_ids = set()
+  for separator in ("_", " ", "\xa0"):
+    for term_id in store.terms_containing(separator.join(words)):
+      parts = _KEYWORD_PARTS_RE.split(store.index.term(term_id))
+      if any(tuple(parts[i:i + len(words)]) == words for i in range(len(parts) - len(words) + 1)):
+        term_ids.add(term_id)
+  return sorted(term_ids)
+
+def atom_terms(store, atom):
+  """Return the term ids an atom matches"""
+  if type(atom) is Term:
+    term_id = store.term_id(atom.word)
+    return [term_id] if term_id >= 0 else store.terms_with_prefix(atom.word)
+  if type(atom) is Literal:
+    term_id = store.term_id(atom.text)
+    return [term_id] if term_id >= 0 else []
+  if type(atom) is Prefix:
+    return store.terms_with_prefix(atom.prefix)
+  return phrase_terms(store, atom.words)
+
+class Clause:
+  """The posting lists of one clause's alternatives, and what reading them costs"""
+
+  def __init__(self, store, atoms):
+    self.term_ids = set()
+    negated = []
+    for atom in atoms:
+      if type(atom) is Not:
+        negated.append(set().union(*(store.postings(term_id) for term_id in atom_terms(store, atom.atom))))
+      else:
+        self.term_ids.update(atom_terms(store, atom))
+    self.postings = [store.postings(term_id) for term_id in sorted(self.term_ids)]
+    self.cost = sum(len(postings) for postings in self.postings)
+    self.size = len(store)
+    # Emojis every negated alternative leaves out, the clause still matches them through the others
+    self.negated = None
+    if negated:
+      self.negated = set.intersection(*negated)
+      # Matches most of the corpus, so it narrows down last
+      self.cost += self.size
+
+  def ids(self):
+    """Return every emoji id the clause matches, sorted"""
+    if self.negated is not None:
+      return self.intersect(range(self.size))
+    if len(self.postings) == 1:
+      return list(self.postings[0])
+    return sorted(set().union(*self.postings))
+
+  def intersect(self, candidates):
+    """Return the candidates the clause matches"""
+    if self.negated is not None:
+      hits = set(self.intersect_postings(list(candidates))) if self.postings else set()
+      return [emoji_id for emoji_id in candidates if emoji_id in hits or emoji_id not in self.negated]
+    return self.intersect_postings(candidates)
+
+  def intersect_postings(self, candidates):
+    if len(self.postings) == 1:
+      return intersect_sorted(candidates, self.postings[0])
+    # A few candidates are looked up in each list rather than merging them all
+    if len(candidates) * len(self.postings) < self.cost:
+      hits = set()
+      for postings in self.postings:
+        hits.update(intersect_sorted(candidates, postings))
+      return sorted(hits)
+    return intersect_sorted(candidates, self.ids())
+
+def evaluate(store, parsed):
+  """Return the sorted ids of emojis matching a parsed query, and its required Clauses"""
+  clauses = sorted((Clause(store, atoms) for atoms in parsed.clauses), key=lambda clause: clause.cost)
+  if clauses:
+    candidates = clauses[0].ids()
+    for clause in clauses[1:]:
+      if not candidates:
+        break
+      candidates = clause.intersect(candidates)
+  else:
+    candidates = list(range(len(store)))
+
+  for atoms in parsed.excluded:
+    if not candidates:
+      break
+    excluded = set(Clause(store, atoms).intersect(candidates))
+    if excluded:
+      candidates = [emoji_id for emoji_id in candidates if emoji_id not in excluded]
+  return candidates, clauses
@@ -0,0 +1,132 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Thin client for the query server, see query_server.py.
+
+Standard library only and nothing is loaded, a lookup is one round trip over
+a Unix socket to the server's warm index.
+
+  with QueryClient() as client:
+    client.search("party", limit=5)           # ['🥳', '🎉', ...]
+    client.search_many(["cat", "dog"], 3)     # pipelined, one list per query
+    client.keywords("🐈")
+    client.stats()
+"""
+import json
+import os
+import socket
+import sys
+import tempfile
+
+def query_socket_path():
+  """Return the socket the query server listens on by default"""
+  runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+  return os.path.join(runtime_dir, f"glyphgrab-query-{os.getuid()}.sock")
+
+class QueryError(Exception):
+  """Raised when the server answers a request with an error"""
+
+class QueryClient:
+  def __init__(self, path=None, timeout=2.0):
+    self.path = path or query_socket_path()
+    self.timeout = timeout
+    self.sock = None
+    self.reader = None
+    self.next_id = 0
+
+  def connect(self):
+    """Connect now rather than on the first request, raises OSError if no server runs"""
+    if self.sock is None:
+      sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+      sock.settimeout(self.timeout)
+      try:
+        sock.connect(self.path)
+      except OSError:
+        sock.close()
+        raise
+      self.sock = sock
+      self.reader = sock.makefile("rb")
+    return self
+
+  def close(self):
+    if self.sock is not None:
+      self.reader.close()
+      self.sock.close()
+      self.sock = None
+      self.reader = None
+
+  def __enter__(self):
+    return self.connect()
+
+  def __exit__(self, *exc):
+    self.close()
+    return False
+
+  def send(self, requests):
+    """Write requests without waiting for answers, return their ids"""
+    self.connect()
+    ids = []
+    lines = []
+    for request in requests:
+      self.next_id += 1
+      ids.append(self.next_id)
+      lines.append(json.dumps(dict(request, id=self.next_id), ensure_ascii=False))
+    self.sock.sendall(("\n".join(lines) + "\n").encode("utf-8"))
+    return ids
+
+  def receive(self, ids):
+    """Read the answers to requests sent with send(), in order"""
+    results = []
+    for request_id in ids:
+      line = self.reader.readline()
+      if not line:
+        self.close()
+        raise ConnectionError("Query server closed the connection")
+      response = json.loads(line)
+      if response.get("id") != request_id:
+        raise QueryError(f"Answer {response.get('id')} does not match request {request_id}")
+      if "error" in response:
+        raise QueryError(response["error"])
+      results.append(response["result"])
+    return results
+
+  def request(self, op, **params):
+    """Send one request and return its result"""
+    return self.receive(self.send([dict(params, op=op)]))[0]
+
+  def search(self, query, limit=None):
+    return self.request("search", query=query, limit=limit)
+
+  def search_many(self, queries, limit=None, pipelined=False):
+    """
+    Search many queries, in order.
+
+    By default the server answers the whole batch from one request, sharing
+    word lookups between queries. With pipelined every query is its own
+    request, all written before any answer is read.
+    """
+    if not pipelined:
+      return self.request("search_many", queries=list(queries), limit=limit)
+    return self.receive(self.send({"op": "search", "query": query, "limit": limit} for query in queries))
+
+  def keywords(self, emoji):
+    return self.request("keywords", emoji=emoji)
+
+  def recents(self, limit=None):
+    return self.request("recents", limit=limit)
+
+  def record(self, emoji):
+    """Count a pick in the shared usage history"""
+    return self.request("record", emoji=emoji)
+
+  def stats(self):
+    return self.request("stats")
+
+if __name__ == "__main__":
+  # python query_client.py grinning face
+  try:
+    with QueryClient() as client:
+      for emoji in client.search(" ".join(sys.argv[1:]), limit=10):
+        print(emoji)
+  except OSError as e:
+    sys.exit(f"No query server at {query_socket_path()}: {e}")
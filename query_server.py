@@ -0,0 +1,287 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Headless query server, so editor plugins, chat helpers and the picker share
+one warm engine instead of each loading the corpus and index.
+
+Clients connect to a Unix socket and write one JSON request per line. Each
+request gets one JSON line back, in request order, carrying its id:
+
+  {"id": 1, "op": "search", "query": "party", "limit": 5}
+  {"id": 1, "result": ["🥳", "🎉", "🎊", "🪅", "🎈"]}
+  {"id": 2, "op": "nope"}
+  {"id": 2, "error": "Unknown op 'nope'"}
+
+Ops: search (query, limit), search_many (queries, limit), keywords (emoji),
+recents (limit), record (emoji) and stats. Clients may write many requests
+before reading any answer. Searches run on the event loop itself: they take
+tens of microseconds, less than handing them to a thread would.
+
+  python cli.py serve
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import time
+from bisect import bisect_left
+
+import tracing
+from query_client import query_socket_path
+
+# Most results one request gets, and most queries in one search_many
+MAX_LIMIT = 200
+MAX_BATCH = 10000
+# Longest request line, longer ones close the connection
+MAX_LINE = 1 << 20
+# Upper bounds of the latency histogram buckets, the last bucket is open
+LATENCY_BUCKETS_US = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+# How often picks recorded by other processes are folded into the ranking
+USAGE_REFRESH_S = 2.0
+
+logger = logging.getLogger(__name__)
+
+class RequestError(Exception):
+  """A request the server cannot answer, sent back as its error"""
+
+class ServerStats:
+  """Request counts, rates and a latency histogram for the stats op"""
+
+  def __init__(self):
+    self.started = time.monotonic()
+    self.requests = 0
+    self.errors = 0
+    self.clients = 0
+    self.connections = 0
+    self.ops = {}
+    self.histogram = [0] * (len(LATENCY_BUCKETS_US) + 1)
+    self.latency_total_us = 0.0
+    # Requests in the current second and in the one before it
+    self.second = int(self.started)
+    self.second_count = 0
+    self.last_second_count = 0
+
+  def record(self, op, elapsed_us, ok):
+    self.requests += 1
+    if not ok:
+      self.errors += 1
+    self.ops[op] = self.ops.get(op, 0) + 1
+    self.histogram[bisect_left(LATENCY_BUCKETS_US, elapsed_us)] += 1
+    self.latency_total_us += elapsed_us
+    self.tick()
+    self.second_count += 1
+
+  def tick(self):
+    second = int(time.monotonic())
+    if second != self.second:
+      self.last_second_count = self.second_count if second == self.second + 1 else 0
+      self.second = second
+      self.second_count = 0
+
+  def percentile_us(self, fraction):
+    """Return the upper bound of the bucket holding this fraction of requests"""
+    target = fraction * self.requests
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS_US + (None,), self.histogram):
+      seen += count
+      if count and seen >= target:
+        return bound
+    return 0
+
+  def snapshot(self, cache):
+    self.tick()
+    uptime = time.monotonic() - self.started
+    labels = [f"<={bound}" for bound in LATENCY_BUCKETS_US] + [f">{LATENCY_BUCKETS_US[-1]}"]
+    return {
+      "uptime_s": round(uptime, 1),
+      "requests": self.requests,
+      "errors": self.errors,
+      "ops": dict(self.ops),
+      "clients": self.clients,
+      "connections": self.connections,
+      "qps": round(self.requests / uptime, 1) if uptime else 0.0,
+      "last_second_qps": self.last_second_count,
+      "latency_us": dict(zip(labels, self.histogram)),
+      "latency_mean_us": round(self.latency_total_us / self.requests, 1) if self.requests else 0.0,
+      "latency_p50_us": self.percentile_us(0.5),
+      "latency_p99_us": self.percentile_us(0.99),
+      "cache": cache,
+    }
+
+def limit_of(request):
+  limit = request.get("limit")
+  if limit is None:
+    return MAX_LIMIT
+  if not isinstance(limit, int) or isinstance(limit, bool) or limit < 0:
+    raise RequestError("limit must be a non-negative integer")
+  return min(limit, MAX_LIMIT)
+
+def string_of(request, name):
+  value = request.get(name)
+  if not isinstance(value, str):
+    raise RequestError(f"{name} must be a string")
+  return value
+
+class QueryServer:
+  def __init__(self, emoji_data, config=None, path=None):
+    self.emoji_data = emoji_data
+    # Without a config there is no usage history: no recents, no frecency
+    self.config = config
+    self.path = path or query_socket_path()
+    self.server = None
+    self.stats = ServerStats()
+    self.usage_checked = 0.0
+    self.usage_state = None
+    self.handlers = {
+      "search": self.op_search,
+      "search_many": self.op_search_many,
+      "keywords": self.op_keywords,
+      "recents": self.op_recents,
+      "record": self.op_record,
+      "stats": self.op_stats,
+    }
+
+  async def start(self):
+    """Listen on the socket, replacing a stale one but not a running server's"""
+    if os.path.exists(self.path):
+      with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+          probe.connect(self.path)
+          raise RuntimeError(f"A query server is already listening on {self.path}")
+        except OSError:
+          os.unlink(self.path)
+    self.server = await asyncio.start_unix_server(self.handle_client, path=self.path, limit=MAX_LINE)
+    os.chmod(self.path, 0o600)
+    logger.info("Query server listening on %s", self.path)
+
+  async def run(self):
+    """Serve until SIGINT or SIGTERM"""
+    await self.start()
+    loop = asyncio.get_running_loop()
+    stopped = loop.create_future()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+      loop.add_signal_handler(signum, lambda: stopped.done() or stopped.set_result(None))
+    try:
+      await stopped
+    finally:
+      self.close()
+
+  def close(self):
+    if self.server is not None:
+      self.server.close()
+      self.server = None
+      try:
+        os.unlink(self.path)
+      except OSError:
+        pass
+
+  async def handle_client(self, reader, writer):
+    self.stats.clients += 1
+    self.stats.connections += 1
+    try:
+      while True:
+        try:
+          line = await reader.readline()
+        except ValueError:
+          # Longer than MAX_LINE, there is no telling where the next request starts
+          writer.write(self.encode({"id": None, "error": "Request too long"}))
+          break
+        if not line:
+          break
+        if line.strip():
+          writer.write(self.respond(line))
+          # Only waits when the client is not reading its answers
+          await writer.drain()
+    except ConnectionError:
+      pass
+    finally:
+      self.stats.clients -= 1
+      writer.close()
+
+  def respond(self, line):
+    """Answer one request line, return the response line"""
+    start = time.perf_counter_ns()
+    request_id = None
+    op = None
+    try:
+      try:
+        request = json.loads(line)
+      except ValueError:
+        raise RequestError("Invalid JSON")
+      if not isinstance(request, dict):
+        raise RequestError("A request must be a JSON object")
+      request_id = request.get("id")
+      op = request.get("op")
+      handler = self.handlers.get(op) if isinstance(op, str) else None
+      if handler is None:
+        raise RequestError(f"Unknown op {op!r}")
+      with tracing.span("server request", op=op):
+        response = {"id": request_id, "result": handler(request)}
+    except RequestError as e:
+      response = {"id": request_id, "error": str(e)}
+    except Exception as e:
+      logger.exception("Error answering %s request", op)
+      response = {"id": request_id, "error": f"Internal error: {e}"}
+    self.stats.record(op if isinstance(op, str) else None, (time.perf_counter_ns() - start) / 1000,
+                      "error" not in response)
+    return self.encode(response)
+
+  def encode(self, response):
+    return (json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8")
+
+  def refresh_usage(self, force=False):
+    """Rank with picks other processes recorded, checking the log every few seconds"""
+    if self.config is None:
+      return
+    now = time.monotonic()
+    if not force and now - self.usage_checked < USAGE_REFRESH_S:
+      return
+    self.usage_checked = now
+    usage = self.config.get_usage()
+    usage.refresh()
+    state = (usage.log_offset, usage.compacted_through, len(usage.counts))
+    if state != self.usage_state:
+      self.usage_state = state
+      self.emoji_data.set_usage_scores(usage.frecency_scores())
+
+  def toned(self, emojis):
+    return [self.emoji_data.with_preferred_tone(emoji) for emoji in emojis]
+
+  def op_search(self, request):
+    self.refresh_usage()
+    return self.toned(self.emoji_data.search(string_of(request, "query"), limit_of(request)))
+
+  def op_search_many(self, request):
+    queries = request.get("queries")
+    if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+      raise RequestError("queries must be a list of strings")
+    if len(queries) > MAX_BATCH:
+      raise RequestError(f"At most {MAX_BATCH} queries per request")
+    self.refresh_usage()
+    return [self.toned(results) for results in self.emoji_data.search_many(queries, limit_of(request))]
+
+  def op_keywords(self, request):
+    return self.emoji_data.get_emoji_keywords(string_of(request, "emoji"))
+
+  def op_recents(self, request):
+    if self.config is None:
+      return []
+    return self.config.get_recent_emojis()[:limit_of(request)]
+
+  def op_record(self, request):
+    if self.config is None:
+      raise RequestError("Usage history is off")
+    self.config.add_recent_emoji(string_of(request, "emoji"))
+    self.refresh_usage(force=True)
+    return True
+
+  def op_stats(self, request):
+    return self.stats.snapshot(self.emoji_data.cache_stats())
+
+def serve(emoji_data, config=None, path=None):
+  """Run a query server over emoji_data until interrupted"""
+  # Load before listening, so the first client does not pay for it
+  emoji_data.load()
+  asyncio.run(QueryServer(emoji_data, config, path).run())
@@ -0,0 +1,191 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+import heapq
+
+# How much each kind of match is worth for one query word
+EXACT_KEYWORD = 4.0   # the word is one of the emoji's own keywords
+COMPOUND_PART = 2.0   # the word is part of a keyword like "grinning_face"
+PREFIX_MATCH = 1.5    # a keyword starts with the word
+PARTIAL_MATCH = 1.0   # a keyword contains the word
+SIMPLE_KEYWORD = 0.1  # for partial words, "smile" beats "smiling_face_with_halo"
+FUZZY_MATCH = 0.8     # a keyword is one typo away, halved for two typos
+
+# Bonus when the word is part of the emoji's primary name (its first keyword),
+# half of it shrinks with longer names since "red_heart" is more about a heart
+# than "smiling_face_with_heart_eyes"
+PRIMARY_NAME = 1.5
+# Bonus when the whole query is the primary name, "grinning face" -> grinning_face
+FULL_NAME = 3.0
+# Most a user's own history can add, enough to reorder hits of the same kind
+USAGE_WEIGHT = 2.0
+
+class RankedResults:
+  """
+  Scored search hits that are only ordered as far as they are read.
+
+  top(k) does a heap selection of the k best hits; ties go to corpus order
+  so the same query always ranks the same way.
+  """
+
+  def __init__(self, emojis, scores):
+    self._emojis = emojis
+    self.scores = scores
+    # Set by the indexer so a refined query can pick up where this one stopped
+    self.store = None
+    self.words = []
+    self.states = []
+    self.resumed_words = 0
+    # Per-locale results a merged result was made from, by locale
+    self.parts = {}
+    self._keys = [(-score, emoji_id) for emoji_id, score in scores.items()]
+
+  def __len__(self):
+    return len(self._keys)
+
+  def top(self, k=None):
+    """Return the k best emojis, or all of them ranked"""
+    if k is None or k >= len(self._keys):
+      keys = sorted(self._keys)
+    else:
+      keys = heapq.nsmallest(k, self._keys)
+    return [self._emojis[emoji_id] for _, emoji_id in keys]
+
+  def page(self, start, count):
+    """Return count emojis after the first start, for loading more on demand"""
+    return self.top(start + count)[start:]
+
+def recent_usage_scores(recent_emojis):
+  """Score a recents list, most recent first, for when there is no usage history"""
+  count = len(recent_emojis)
+  return {emoji: count - position for position, emoji in enumerate(recent_emojis)}
+
+def merge_ranked(emojis, parts):
+  """Merge results of several locales over one emoji table, each emoji keeps its best score"""
+  scores = {}
+  for ranked in parts.values():
+    for emoji_id, score in ranked.scores.items():
+      if scores.get(emoji_id, score - 1) < score:
+        scores[emoji_id] = score
+  merged = RankedResults(emojis, scores)
+  merged.parts = parts
+  merged.resumed_words = max((ranked.resumed_words for ranked in parts.values()), default=0)
+  return merged
+
+class Ranker:
+  def __init__(self, store):
+    self.store = store
+    self.usage = {}
+
+  def set_usage_scores(self, usage_scores):
+    """Derive the usage boost from {emoji: score}, the top scored emoji gets all of it"""
+    # Picks of a skin tone variant count for the base emoji the index knows
+    totals = {}
+    for emoji, score in usage_scores.items():
+      emoji_id = self.store.base_id(emoji)
+      if emoji_id >= 0 and score > 0:
+        totals[emoji_id] = totals.get(emoji_id, 0) + score
+    top = max(totals.values(), default=0)
+    self.usage = {emoji_id: USAGE_WEIGHT * score / top for emoji_id, score in totals.items()}
+
+  def usage_boost(self, emoji_id):
+    return self.usage.get(emoji_id, 0.0)
+
+  def rank_exact(self, candidates, matched_words):
+    """Score hits of an exact search, matched_words maps each word to its term id"""
+    index = self.store.index
+    query_name = "_".join(matched_words)
+    scores = {}
+    for emoji_id in candidates:
+      keyword_ids = index.keyword_ids(emoji_id)
+      name = index.term(keyword_ids[0]) if len(keyword_ids) else ""
+      name_parts = name.split("_")
+      score = self.usage_boost(emoji_id)
+      if name == query_name:
+        score += FULL_NAME
+      for word, term_id in matched_words.items():
+        score += EXACT_KEYWORD if term_id in keyword_ids else COMPOUND_PART
+        if word in name_parts:
+          score += PRIMARY_NAME * (0.5 + 0.5 / len(name_parts))
+      scores[emoji_id] = score
+    return RankedResults(self.store.emojis, scores)
+
+  def rank_clauses(self, candidates, clauses, words):
+    """Score hits of a planned query: per clause, words are its plain words in query order"""
+    index = self.store.index
+    query_name = "_".join(words)
+    scores = {}
+    for emoji_id in candidates:
+      keyword_ids = index.keyword_ids(emoji_id)
+      score = self.usage_boost(emoji_id)
+      for clause in clauses:
+        score += COMPOUND_PART if clause.term_ids.isdisjoint(keyword_ids) else EXACT_KEYWORD
+      if words and len(keyword_ids):
+        name = index.term(keyword_ids[0])
+        name_parts = name.split("_")
+        if name == query_name:
+          score += FULL_NAME
+        for word in words:
+          if word in name_parts:
+            score += PRIMARY_NAME * (0.5 + 0.5 / len(name_parts))
+      scores[emoji_id] = score
+    return RankedResults(self.store.emojis, scores)
+
+  def partial_matches(self, word):
+    """Return {emoji id: best score} of the keywords a word is only part of"""
+    best = {}
+    # Terms are sorted, so the ones starting with the word are one id range
+    prefix_start, prefix_end = self.store.index.prefix_range(word)
+    for term_id in self.store.terms_containing(word):
+      score = PREFIX_MATCH if prefix_start <= term_id < prefix_end else PARTIAL_MATCH
+      if "_" not in self.store.index.term(term_id):
+        score += SIMPLE_KEYWORD
+      for emoji_id in self.store.postings(term_id):
+        if best.get(emoji_id, 0.0) < score:
+          best[emoji_id] = score
+    return best
+
+  def rank_partial(self, words, partial_matches=None):
+    """Find and score hits for words that only match part of a keyword"""
+    partial_matches = partial_matches or self.partial_matches
+    scores = {}
+    for word in words:
+      # Partial words are OR-ed, each word adds its best match
+      for emoji_id, score in partial_matches(word).items():
+        scores[emoji_id] = scores.get(emoji_id, 0.0) + score
+
+    for emoji_id, boost in self.usage.items():
+      if emoji_id in scores:
+        scores[emoji_id] += boost
+    return RankedResults(self.store.emojis, scores)
+
+  def fuzzy_matches(self, word):
+    """Return {emoji id: best score} of the keywords within a few typos of a word"""
+    best = {}
+    for term_id, distance in self.store.similar_terms(word).items():
+      score = FUZZY_MATCH / distance
+      for emoji_id in self.store.postings(term_id):
+        if best.get(emoji_id, 0.0) < score:
+          best[emoji_id] = score
+    return best
+
+  def add_fuzzy(self, ranked, words, fuzzy_matches=None):
+    """Add hits for words within a few typos of a keyword below the existing hits"""
+    fuzzy_matches = fuzzy_matches or self.fuzzy_matches
+    scores = {}
+    for word in words:
+      for emoji_id, score in fuzzy_matches(word).items():
+        scores[emoji_id] = scores.get(emoji_id, 0.0) + score
+
+    for emoji_id, boost in self.usage.items():
+      if emoji_id in scores:
+        scores[emoji_id] += boost
+    for emoji_id in ranked.scores:
+      scores.pop(emoji_id, None)
+    # A boosted typo would outrank a real hit, so lower them all, in order, below the last one
+    if scores and ranked.scores:
+      excess = max(scores.values()) - min(ranked.scores.values())
+      if excess >= 0:
+        shift = excess + FUZZY_MATCH / 2
+        scores = {emoji_id: score - shift for emoji_id, score in scores.items()}
+    scores.update(ranked.scores)
+    return RankedResults(self.store.emojis, scores)
@@ -0,0 +1,75 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Keyword suggestions under the search bar.
+
+The window asks EmojiData.complete() for the word being typed on every
+keystroke, no debounce, and puts the answer in a CompletionModel: the
+completer shows the model as it is instead of filtering a keyword list
+itself. Picking a suggestion replaces only the word being typed.
+"""
+from PyQt5.QtCore import Qt, QAbstractListModel, QEvent, QModelIndex
+from PyQt5.QtWidgets import QApplication, QCompleter
+
+from completion import split_last_word
+
+class CompletionModel(QAbstractListModel):
+  def __init__(self, parent=None):
+    super().__init__(parent)
+    self.keywords = []
+
+  def rowCount(self, parent=QModelIndex()):
+    return 0 if parent.isValid() else len(self.keywords)
+
+  def data(self, index, role=Qt.DisplayRole):
+    if index.isValid() and role in (Qt.DisplayRole, Qt.EditRole):
+      return self.keywords[index.row()]
+    return None
+
+  def set_keywords(self, keywords):
+    if keywords == self.keywords:
+      return
+    self.beginResetModel()
+    self.keywords = list(keywords)
+    self.endResetModel()
+
+class SearchCompleter(QCompleter):
+  """Suggests keywords for the last word of a line edit, from complete(prefix, limit)"""
+
+  def __init__(self, line_edit, complete, limit=6):
+    super().__init__(line_edit)
+    self.complete_word = complete
+    self.limit = limit
+    # What comes before the word being completed
+    self.head = ""
+    self.completion_model = CompletionModel(self)
+    self.setModel(self.completion_model)
+    self.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+    self.setMaxVisibleItems(limit)
+    self.setWidget(line_edit)
+    self.activated[QModelIndex].connect(self.accept)
+    # Only typing suggests, not text set by the program or by accepting a suggestion
+    line_edit.textEdited.connect(self.update_suggestions)
+
+  def update_suggestions(self, text):
+    self.head, word = split_last_word(text)
+    keywords = self.complete_word(word, self.limit) if word else []
+    self.completion_model.set_keywords(keywords)
+    if keywords:
+      self.complete()
+      # Nothing selected until an arrow key is pressed, so Enter still copies
+      self.popup().setCurrentIndex(QModelIndex())
+    else:
+      self.popup().hide()
+
+  def accept(self, index):
+    self.widget().setText(self.head + index.data())
+
+  def eventFilter(self, obj, event):
+    # Enter without a suggestion selected is the window's, it copies the best result
+    if (event.type() == QEvent.KeyPress and event.key() in (Qt.Key_Return, Qt.Key_Enter)
+        and obj is self.popup() and not obj.currentIndex().isValid()):
+      self.popup().hide()
+      QApplication.sendEvent(self.widget(), event)
+      return True
+    return super().eventFilter(obj, event)
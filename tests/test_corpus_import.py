@@ -0,0 +1,133 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""The importer's parsers on small copies of emoji-test.txt and CLDR annotation files"""
+from corpus_import import build_corpus, parse_annotations, parse_emoji_test
+
+EMOJI_TEST = """\
+# emoji-test.txt
+# Version: 15.1
+
+# group: Smileys & Emotion
+
+# subgroup: face-smiling
+1F600                                                  ; fully-qualified     # 😀 E1.0 grinning face
+1F642                                                  ; fully-qualified     # 🙂 E1.0 slightly smiling face
+
+# subgroup: face-affection
+263A FE0F                                              ; fully-qualified     # ☺️ E0.6 smiling face
+263A                                                   ; unqualified         # ☺ E0.6 smiling face
+
+# Smileys & Emotion subtotal:		3
+
+# group: People & Body
+
+# subgroup: hand-fingers-open
+1F44B                                                  ; fully-qualified     # 👋 E0.6 waving hand
+1F44B 1F3FD                                            ; fully-qualified     # 👋🏽 E1.0 waving hand: medium skin tone
+1F575 FE0F 200D 2642 FE0F                              ; fully-qualified     # 🕵️‍♂️ E4.0 man detective
+1F575 200D 2642 FE0F                                   ; unqualified         # 🕵‍♂️ E4.0 man detective
+1F575 FE0F 200D 2642                                   ; minimally-qualified # 🕵️‍♂ E4.0 man detective
+
+# group: Component
+
+# subgroup: skin-tone
+1F3FB                                                  ; component           # 🏻 E1.0 light skin tone
+
+# subgroup: hair-style
+1F9B0                                                  ; fully-qualified     # 🦰 E11.0 red hair
+
+# group: Flags
+
+# subgroup: country-flag
+1F1EF 1F1F5                                            ; fully-qualified     # 🇯🇵 E0.6 flag: Japan
+
+#EOF
+"""
+
+ANNOTATIONS = """\
+<?xml version="1.0" encoding="UTF-8" ?>
+<ldml>
+  <annotations>
+    <annotation cp="😀">face | grin | grinning face</annotation>
+    <annotation cp="😀" type="tts">grinning face</annotation>
+    <annotation cp="☺">face | outlined | relaxed | smile</annotation>
+    <annotation cp="☺" type="tts">smiling face</annotation>
+    <annotation cp="👋">hand | wave | waving</annotation>
+    <annotation cp="👋" type="tts">waving hand</annotation>
+    <annotation cp="🙂">↑↑↑</annotation>
+  </annotations>
+</ldml>
+"""
+
+DERIVED = """\
+<?xml version="1.0" encoding="UTF-8" ?>
+<ldml>
+  <annotations>
+    <annotation cp="🕵️‍♂️">detective | man | sleuth | spy</annotation>
+    <annotation cp="🕵️‍♂️" type="tts">man detective</annotation>
+    <annotation cp="🇯🇵">flag</annotation>
+    <annotation cp="🇯🇵" type="tts">flag: Japan</annotation>
+    <annotation cp="😀">happy</annotation>
+    <annotation cp="🙂" type="tts">↑↑↑</annotation>
+  </annotations>
+</ldml>
+"""
+
+def write(path, text):
+  path.write_text(text, encoding='utf-8')
+  return str(path)
+
+def test_parse_emoji_test_keeps_fully_qualified_emojis_in_order(tmp_path):
+  emojis = parse_emoji_test(write(tmp_path / "emoji-test.txt", EMOJI_TEST))
+  assert emojis == [
+    ("😀", "grinning face"),
+    ("🙂", "slightly smiling face"),
+    ("☺️", "smiling face"),
+    ("👋", "waving hand"),
+    ("🕵️‍♂️", "man detective"),
+    ("🇯🇵", "flag: Japan"),
+  ]
+
+def test_parse_emoji_test_skips_the_component_group_only(tmp_path):
+  # Headers are comments, so only "# group:" switches groups and "# subgroup:" never does
+  text = EMOJI_TEST.replace("# group: Component", "# subgroup: Component")
+  emojis = dict(parse_emoji_test(write(tmp_path / "emoji-test.txt", text)))
+  assert emojis["🦰"] == "red hair"
+  assert "🏻" not in emojis
+
+def test_parse_annotations_merges_files(tmp_path):
+  annotations = parse_annotations([write(tmp_path / "en.xml", ANNOTATIONS),
+                                   write(tmp_path / "en-derived.xml", DERIVED)])
+  assert annotations["😀"] == ("grinning face", ["face", "grin", "grinning face", "happy"])
+  assert annotations["🇯🇵"] == ("flag: Japan", ["flag"])
+  # Keyed without VS16 like emoji-test.txt's emojis once it is stripped
+  assert annotations["🕵‍♂"] == ("man detective", ["detective", "man", "sleuth", "spy"])
+  assert "🙂" not in annotations
+
+def test_build_corpus_from_unicode_order(tmp_path):
+  emoji_test = parse_emoji_test(write(tmp_path / "emoji-test.txt", EMOJI_TEST))
+  annotations = parse_annotations([write(tmp_path / "en.xml", ANNOTATIONS),
+                                   write(tmp_path / "en-derived.xml", DERIVED)])
+  corpus = build_corpus(emoji_test, annotations)
+  assert list(corpus) == ["😀", "🙂", "☺️", "👋", "🕵️‍♂️", "🇯🇵"]
+  assert corpus["😀"] == ["grinning_face", "face", "grin", "happy"]
+  # Without CLDR keywords the name comes from emoji-test.txt
+  assert corpus["🙂"] == ["slightly_smiling_face"]
+  assert corpus["🇯🇵"] == ["flag_japan", "flag"]
+
+def test_build_corpus_keeps_previous_order_and_keywords(tmp_path):
+  emoji_test = parse_emoji_test(write(tmp_path / "emoji-test.txt", EMOJI_TEST))
+  annotations = parse_annotations([write(tmp_path / "en.xml", ANNOTATIONS)])
+  previous = {
+    "👋": ["waving_hand", "hello", "Wave"],
+    # Spelled without VS16 by hand
+    "☺": ["smiling_face", ":)"],
+    "😀": ["grinning_face", ":D"],
+    "🫨": ["shaking_face"],
+  }
+  corpus = build_corpus(emoji_test, annotations, previous)
+  # Kept emojis first in their old order, dropped ones gone, new ones after them
+  assert list(corpus) == ["👋", "☺", "😀", "🙂", "🕵️‍♂️", "🇯🇵"]
+  assert corpus["👋"] == ["waving_hand", "hand", "Wave", "waving", "hello"]
+  assert corpus["☺"] == ["smiling_face", "face", "outlined", "relaxed", "smile", ":)"]
+  assert corpus["😀"] == ["grinning_face", "face", "grin", ":D"]
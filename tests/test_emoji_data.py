@@ -0,0 +1,59 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+import json
+import shutil
+import threading
+
+from emoji_data import EmojiData
+from indexer import emoji_json_path
+
+def run_while_loading(emoji_data, calls):
+  """Run calls on this thread while another thread holds the load lock, return whether they finished"""
+  holding = threading.Event()
+  release = threading.Event()
+  def load():
+    with emoji_data.load_lock:
+      holding.set()
+      release.wait(5)
+  loader = threading.Thread(target=load)
+  loader.start()
+  holding.wait()
+  done = threading.Event()
+  def run():
+    for call in calls:
+      call()
+    done.set()
+  threading.Thread(target=run, daemon=True).start()
+  finished = done.wait(1)
+  release.set()
+  loader.join()
+  return finished
+
+def test_settings_do_not_wait_for_the_load():
+  emoji_data = EmojiData(persist=False)
+  assert run_while_loading(emoji_data, [
+    lambda: emoji_data.set_usage_scores({"🐈": 100}),
+    lambda: emoji_data.set_fuzzy_search(False),
+    lambda: emoji_data.get_variants("👍"),
+  ])
+  # Applied once the load finishes
+  emoji_data.load()
+  assert emoji_data.indexer.usage_scores == {"🐈": 100}
+  assert emoji_data.indexer.fuzzy is False
+
+def test_variants_before_the_load_match_the_index():
+  unloaded = EmojiData(persist=False)
+  loaded = EmojiData(persist=False).load()
+  for emoji in loaded.get_all_emojis():
+    assert unloaded.get_variants(emoji) == loaded.get_variants(emoji)
+  assert not unloaded.loaded
+
+def test_locales_switched_during_the_load_apply_when_it_finishes(tmp_path):
+  json_path = str(tmp_path / "emoji-en-US.json")
+  shutil.copyfile(emoji_json_path, json_path)
+  with open(tmp_path / "emoji-de.json", "w", encoding='utf-8') as f:
+    json.dump({"🐈": ["katze"]}, f, ensure_ascii=False)
+  emoji_data = EmojiData(json_path, str(tmp_path), persist=False)
+  assert run_while_loading(emoji_data, [lambda: emoji_data.set_locales(["en-US", "de"])])
+  assert emoji_data.search("katze")[0] == "🐈"
+  assert emoji_data.locales == ["en-US", "de"]
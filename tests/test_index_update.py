@@ -0,0 +1,143 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""Every delta update of the compiled index must produce the same bytes as a full build"""
+import json
+import os
+
+import pytest
+
+from index_format import encode_index
+from indexer import EmojiIndexer, build_inverted_index, emoji_json_path
+
+with open(emoji_json_path, encoding='utf-8') as f:
+  CORPUS = json.load(f)
+# Enough emojis for shared terms, suffixes and typo deletes, few enough to build quickly
+BASE = dict(list(CORPUS.items())[:400])
+
+def write_pack(path, corpus):
+  with open(path, "w", encoding='utf-8') as f:
+    json.dump(corpus, f, ensure_ascii=False)
+
+def full_build(indexer, corpus):
+  if indexer.shared_store is not None:
+    corpus = indexer.shared_order(corpus)
+  return encode_index(indexer.source_digest(), corpus, build_inverted_index(corpus))
+
+@pytest.fixture
+def pack(tmp_path):
+  """A pack with a compiled index that is about to go stale"""
+  path = str(tmp_path / "emoji-en-US.json")
+  write_pack(path, BASE)
+  EmojiIndexer(path, str(tmp_path)).ensure_index_exists()
+  return path
+
+def change_keywords(corpus):
+  for emoji in list(corpus)[::13]:
+    corpus[emoji] = corpus[emoji][1:] + ["zzqx", "face", "hert"]
+  return corpus
+
+def remove_emojis(corpus):
+  for emoji in list(corpus)[5::40]:
+    del corpus[emoji]
+  return corpus
+
+def add_emojis(corpus):
+  for n in range(25):
+    corpus[chr(0x1FB00 + n)] = [f"brand_new_{n}", "novel", "cat" if n % 2 else f"shiny{n}"]
+  return corpus
+
+def insert_at_front(corpus):
+  return {**{chr(0x1FB50 + n): [f"front_{n}", "face"] for n in range(10)}, **corpus}
+
+def reorder(corpus):
+  items = list(corpus.items())
+  moved = items[20:60]
+  del items[20:60]
+  items[200:200] = moved
+  return dict(items)
+
+def drop_term(corpus):
+  # A term only one emoji had disappears from the term table
+  only = next(keyword for emoji, keywords in corpus.items() for keyword in keywords
+              if sum(keyword in other for other in corpus.values()) == 1)
+  for emoji, keywords in corpus.items():
+    if only in keywords:
+      corpus[emoji] = [keyword for keyword in keywords if keyword != only]
+  return corpus
+
+def duplicate_keywords(corpus):
+  for emoji in list(corpus)[::50]:
+    corpus[emoji] = corpus[emoji] + corpus[emoji][:2]
+  return corpus
+
+def non_ascii_keywords(corpus):
+  for n, emoji in enumerate(list(corpus)[3::30]):
+    corpus[emoji] = corpus[emoji] + ["über", f"café_{n}", "笑顔", "ёжик"]
+  return corpus
+
+def clear_keywords(corpus):
+  for emoji in list(corpus)[7::60]:
+    corpus[emoji] = []
+  return corpus
+
+def everything(corpus):
+  return insert_at_front(non_ascii_keywords(add_emojis(remove_emojis(change_keywords(corpus)))))
+
+MUTATIONS = [change_keywords, remove_emojis, add_emojis, insert_at_front, reorder, drop_term,
+             duplicate_keywords, non_ascii_keywords, clear_keywords, everything]
+
+@pytest.mark.parametrize("mutate", MUTATIONS, ids=lambda mutate: mutate.__name__)
+def test_update_matches_full_build(pack, mutate):
+  corpus = mutate(dict(BASE))
+  write_pack(pack, corpus)
+  indexer = EmojiIndexer(pack, os.path.dirname(pack))
+  assert indexer.update_index()
+  assert indexer.store.index.to_bytes() == full_build(indexer, corpus)
+
+def test_stale_index_is_updated_and_saved(pack):
+  corpus = change_keywords(dict(BASE))
+  write_pack(pack, corpus)
+  indexer = EmojiIndexer(pack, os.path.dirname(pack))
+  indexer.ensure_index_exists()
+  assert indexer.verify_index()
+  # The saved update loads as a fresh index
+  reloaded = EmojiIndexer(pack, os.path.dirname(pack))
+  assert reloaded.load_index()
+  assert reloaded.search("zzqx")
+
+def test_too_many_changes_rebuild(pack):
+  corpus = {emoji: keywords + ["everywhere"] for emoji, keywords in BASE.items()}
+  write_pack(pack, corpus)
+  indexer = EmojiIndexer(pack, os.path.dirname(pack))
+  assert not indexer.update_index()
+  indexer.ensure_index_exists()
+  assert indexer.store.index.to_bytes() == full_build(indexer, corpus)
+
+@pytest.mark.parametrize("damage", ["garbage", "truncated"])
+def test_corrupt_index_rebuilds(pack, damage):
+  indexer = EmojiIndexer(pack, os.path.dirname(pack))
+  with open(indexer.index_path, "rb") as f:
+    data = f.read()
+  with open(indexer.index_path, "wb") as f:
+    f.write(b"not an index" * 100 if damage == "garbage" else data[:len(data) // 2])
+  corpus = change_keywords(dict(BASE))
+  write_pack(pack, corpus)
+  assert not indexer.update_index()
+  indexer.ensure_index_exists()
+  assert indexer.store.index.to_bytes() == full_build(indexer, corpus)
+
+def test_locale_pack_update(pack):
+  directory = os.path.dirname(pack)
+  base = EmojiIndexer(pack, directory)
+  base.ensure_index_exists()
+  locale_path = os.path.join(directory, "emoji-de.json")
+  # Locale packs leave some emojis out and are laid out in the base pack's order
+  locale = {emoji: [keyword + "_de" for keyword in keywords] for emoji, keywords in list(BASE.items())[::2]}
+  write_pack(locale_path, locale)
+  EmojiIndexer(locale_path, directory, shared_store=base.store).ensure_index_exists()
+
+  locale = non_ascii_keywords(change_keywords(locale))
+  write_pack(locale_path, locale)
+  indexer = EmojiIndexer(locale_path, directory, shared_store=base.store)
+  assert indexer.update_index()
+  assert indexer.store.index.to_bytes() == full_build(indexer, locale)
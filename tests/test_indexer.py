@@ -0,0 +1,27 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+import indexer
+from indexer import EmojiIndexer
+
+def test_store_is_set_after_what_searches_need(monkeypatch):
+  # Other threads search without the load lock as soon as the store is set
+  emoji_indexer = EmojiIndexer(persist=False)
+  stores_seen = []
+  ranker = indexer.Ranker
+  def spy(store):
+    stores_seen.append(emoji_indexer.store)
+    return ranker(store)
+  monkeypatch.setattr(indexer, "Ranker", spy)
+  emoji_indexer.ensure_index_exists()
+  assert stores_seen == [None]
+  assert emoji_indexer.ranker is not None
+  assert emoji_indexer.search("smile")
+
+def test_completions_are_built_on_first_use():
+  emoji_indexer = EmojiIndexer(persist=False)
+  emoji_indexer.ensure_index_exists()
+  assert emoji_indexer.completions is None
+  completions = emoji_indexer.completion_index()
+  assert completions.store is emoji_indexer.store
+  assert completions.complete("smil")
+  assert emoji_indexer.completion_index() is completions
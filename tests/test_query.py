@@ -0,0 +1,25 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+from indexer import EmojiIndexer
+from query import Not, Term, evaluate, parse_query
+
+def emoji_ids(store, query):
+  return set(evaluate(store, parse_query(query, store.literal_term))[0])
+
+def test_negated_or_alternative_stays_in_the_or():
+  assert parse_query("cat OR -dog").clauses == [(Term("cat"), Not(Term("dog")))]
+  assert parse_query("cat OR -dog").excluded == []
+  assert parse_query("-cat OR dog").clauses == [(Not(Term("cat")), Term("dog"))]
+
+def test_negated_or_alternative_matches_emojis_without_the_word():
+  emoji_indexer = EmojiIndexer(persist=False)
+  emoji_indexer.ensure_index_exists()
+  store = emoji_indexer.store
+  everything = set(range(len(store)))
+  cat, dog = emoji_ids(store, "cat"), emoji_ids(store, "dog")
+  assert cat and dog
+  assert emoji_ids(store, "cat OR -dog") == cat | (everything - dog)
+  assert emoji_ids(store, "-cat OR -dog") == everything - (cat & dog)
+  assert emoji_ids(store, "face cat OR -dog") == emoji_ids(store, "face") & (cat | (everything - dog))
+  # Still different from excluding the word
+  assert emoji_ids(store, "cat -dog") == cat - dog
@@ -0,0 +1,19 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+from indexer import EmojiIndexer
+from ranking import FUZZY_MATCH, RankedResults, Ranker, USAGE_WEIGHT
+
+def test_boosted_fuzzy_hits_stay_below_existing_hits():
+  emoji_indexer = EmojiIndexer(persist=False)
+  emoji_indexer.ensure_index_exists()
+  store = emoji_indexer.store
+  ranker = Ranker(store)
+  # Two weak real hits, and typo hits of which the most used one is boosted as far as usage goes
+  ranked = RankedResults(store.emojis, {0: 1.0, 1: 0.5})
+  fuzzy = {2: FUZZY_MATCH, 3: FUZZY_MATCH / 2, 4: FUZZY_MATCH, 1: FUZZY_MATCH}
+  ranker.usage = {3: USAGE_WEIGHT}
+  results = ranker.add_fuzzy(ranked, ["hert"], lambda word: fuzzy)
+  emojis = store.emojis
+  assert results.top(None) == [emojis[0], emojis[1], emojis[3], emojis[2], emojis[4]]
+  # Real hits keep their own scores
+  assert results.scores[1] == 0.5
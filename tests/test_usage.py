@@ -0,0 +1,31 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+import usage
+from usage import UsageStore
+
+def test_compaction_by_another_store_loses_no_picks(tmp_path, monkeypatch):
+  monkeypatch.setattr(usage, "COMPACT_AFTER", 3)
+  a = UsageStore(tmp_path)
+  b = UsageStore(tmp_path)
+  b.record("B1")
+  for n in range(1, 6):
+    a.record(f"A{n}")
+  # b's log offset is from before a compacted and truncated the log
+  for n in range(2, 7):
+    b.record(f"B{n}")
+
+  fresh = UsageStore(tmp_path)
+  assert set(fresh.counts) == {"A1", "A2", "A3", "A4", "A5", "B1", "B2", "B3", "B4", "B5", "B6"}
+  assert all(fresh.use_count(emoji) == 1 for emoji in fresh.counts)
+
+def test_refresh_sees_picks_logged_after_a_compaction(tmp_path, monkeypatch):
+  monkeypatch.setattr(usage, "COMPACT_AFTER", 3)
+  a = UsageStore(tmp_path)
+  b = UsageStore(tmp_path)
+  b.record("B1")
+  # Compacted, then the log grows past b's old offset again
+  for n in range(1, 8):
+    a.record(f"A{n}")
+  b.refresh()
+  assert set(b.counts) == {"B1"} | {f"A{n}" for n in range(1, 8)}
+  assert b.recent_emojis()[0] == "A7"
@@ -0,0 +1,143 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Application-wide themes.
+
+Widgets no longer carry stylesheets of their own: they get an object name
+and one stylesheet set on the application styles them all. Qt parses that
+sheet once instead of once per widget, creating a button is just matching
+it against rules that are already parsed, and switching theme is a single
+setStyleSheet() that repolishes everything. Fonts are shared too, every
+emoji button of one size uses the same QFont.
+
+Themes are "light", "dark" and "system", which picks light or dark from the
+platform palette and leaves the window colours to it.
+"""
+from functools import lru_cache
+
+from PyQt5.QtGui import QColor, QFont, QPalette
+
+THEMES = ("system", "light", "dark")
+
+PALETTES = {
+  "light": {
+    "window": "#ffffff",
+    "text": "#202124",
+    "muted": "#888888",
+    "surface": "#f5f5f5",
+    "popup": "#ffffff",
+    "border": "#e0e0e0",
+    "hover": "#e0e0e0",
+  },
+  "dark": {
+    "window": "#1e1f22",
+    "text": "#e8eaed",
+    "muted": "#9aa0a6",
+    "surface": "#2b2d31",
+    "popup": "#2b2d31",
+    "border": "#3c3f45",
+    "hover": "#45484f",
+  },
+}
+
+# Widgets are matched by object name, see the setObjectName() calls in main.py and emoji_view.py
+STYLESHEET = """
+QLineEdit#searchBar {{
+  border-radius: 20px;
+  padding: 0 15px;
+  background-color: {surface};
+  border: 1px solid {border};
+  font-size: 16px;
+}}
+QFrame#recentFrame, QListView#emojiGrid {{
+  border-radius: 20px;
+  background-color: {surface};
+  border: 1px solid {border};
+}}
+QListView#emojiGrid {{
+  padding: 10px;
+}}
+QLabel#mutedLabel {{
+  color: {muted};
+  padding: 20px;
+}}
+QLabel#copyrightLabel {{
+  color: {muted};
+  padding: 10px 0 0 0;
+}}
+QPushButton#emojiButton, QToolButton#groupButton, QToolButton#variantButton {{
+  border: none;
+  border-radius: 5px;
+  background-color: transparent;
+}}
+QPushButton#emojiButton:hover, QToolButton#groupButton:hover, QToolButton#groupButton:checked,
+QToolButton#variantButton:hover {{
+  background-color: {hover};
+}}
+QFrame#variantPopup {{
+  background-color: {popup};
+  border: 1px solid {border};
+  border-radius: 8px;
+}}
+"""
+
+# Only light and dark set these, the system theme keeps the platform's
+WINDOW_STYLESHEET = """
+QMainWindow, QWidget#centralWidget {{
+  background-color: {window};
+}}
+QLabel, QLineEdit {{
+  color: {text};
+}}
+"""
+
+def resolve(name, palette=None):
+  """Return "light" or "dark" for a theme name, "system" follows palette"""
+  if name in PALETTES:
+    return name
+  if palette is not None and palette.color(QPalette.Window).lightness() < 128:
+    return "dark"
+  return "light"
+
+@lru_cache(maxsize=None)
+def stylesheet(name):
+  """Return the application stylesheet of "light", "dark" or "system-light"/"system-dark" """
+  system = name.startswith("system-")
+  colors = PALETTES[name[len("system-"):] if system else name]
+  sheet = STYLESHEET.format(**colors)
+  if not system:
+    sheet += WINDOW_STYLESHEET.format(**colors)
+  return sheet
+
+# Colours of the active theme, for what is painted by hand rather than styled
+_active = dict(PALETTES["light"])
+
+@lru_cache(maxsize=None)
+def _qcolor(value):
+  return QColor(value)
+
+def color(role):
+  """Return the active theme's colour for a role of PALETTES, as a QColor"""
+  return _qcolor(_active[role])
+
+def apply_theme(app, name):
+  """Style the whole application with a theme, unknown names fall back to system"""
+  if name not in THEMES:
+    name = "system"
+  resolved = resolve(name, app.palette())
+  _active.clear()
+  _active.update(PALETTES[resolved])
+  app.setStyleSheet(stylesheet(f"system-{resolved}" if name == "system" else resolved))
+  return resolved
+
+@lru_cache(maxsize=None)
+def emoji_font(pixel_size):
+  """Return the shared colour emoji font of a pixel size"""
+  font = QFont("Noto Color Emoji")
+  font.setPixelSize(pixel_size)
+  return font
+
+@lru_cache(maxsize=None)
+def label_font(point_size, bold=False):
+  """Return the shared UI font of a point size"""
+  return QFont("Arial", point_size, QFont.Bold if bold else QFont.Normal)
@@ -0,0 +1,148 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Lightweight timing spans for startup, search and rendering.
+
+Off by default. Set GLYPHGRAB_TRACE=1 (or to a file path), or pass --trace,
+and every span is recorded. At exit the spans are written as a Chrome
+trace_event file, which chrome://tracing and ui.perfetto.dev open, and a
+summary table goes to stderr. While off, span() hands back one shared no-op
+object, so instrumented code pays a function call and nothing else.
+
+  with tracing.span("index load", path=path):
+    ...
+
+  @tracing.traced("corpus parse")
+  def load_emoji_data(self):
+    ...
+
+  token = tracing.start_span("search round trip")  # across threads or calls
+  tracing.end_span(token, results=len(results))
+"""
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+
+enabled = False
+trace_path = None
+events = []
+thread_names = {}
+origin_ns = time.perf_counter_ns()
+
+class _NoSpan:
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    return False
+
+NO_SPAN = _NoSpan()
+
+class _Span:
+  __slots__ = ("name", "args", "start_ns", "thread_id")
+
+  def __init__(self, name, args):
+    self.name = name
+    self.args = args
+    self.start_ns = time.perf_counter_ns()
+    self.thread_id = threading.get_ident()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    _record(self)
+    return False
+
+def enable(path=None):
+  """Start recording spans, written to path (or a temp file) at exit"""
+  global enabled, trace_path
+  if enabled:
+    return
+  if not path:
+    import tempfile
+    path = os.path.join(tempfile.gettempdir(), f"glyphgrab-trace-{os.getpid()}.json")
+  enabled = True
+  trace_path = path
+  atexit.register(finish)
+
+def span(name, **args):
+  """Time a with block"""
+  if not enabled:
+    return NO_SPAN
+  return _Span(name, args)
+
+def traced(name):
+  """Decorator timing every call of a function as a span"""
+  def decorate(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+      if not enabled:
+        return func(*args, **kwargs)
+      with _Span(name, {}):
+        return func(*args, **kwargs)
+    return wrapper
+  return decorate
+
+def start_span(name, **args):
+  """Start a span that ends in end_span(), possibly on another thread; None while off"""
+  if not enabled:
+    return None
+  return _Span(name, args)
+
+def end_span(token, **args):
+  if token is None:
+    return
+  token.args.update(args)
+  _record(token)
+
+def _record(span_):
+  end_ns = time.perf_counter_ns()
+  thread_id = span_.thread_id
+  if thread_id not in thread_names:
+    thread_names[thread_id] = threading.current_thread().name
+  # list.append is atomic, spans from worker threads need no lock
+  events.append((span_.name, span_.start_ns, end_ns - span_.start_ns, thread_id, span_.args))
+
+def trace_events():
+  """Return the recorded spans in Chrome trace_event format"""
+  pid = os.getpid()
+  result = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": name}}
+            for thread_id, name in thread_names.items()]
+  for name, start_ns, duration_ns, thread_id, args in events:
+    result.append({
+      "name": name, "ph": "X", "pid": pid, "tid": thread_id,
+      "ts": (start_ns - origin_ns) / 1000, "dur": duration_ns / 1000,
+      "args": {key: value if isinstance(value, (int, float, bool)) else str(value) for key, value in args.items()},
+    })
+  return result
+
+def summary():
+  """Return a table of count, total, mean and max milliseconds per span name"""
+  durations = {}
+  for name, _, duration_ns, _, _ in events:
+    durations.setdefault(name, []).append(duration_ns / 1e6)
+  lines = [f"{'span':<28} {'count':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+  for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+    lines.append(f"{name:<28} {len(values):>6} {sum(values):>10.2f} {sum(values) / len(values):>9.3f} {max(values):>9.2f}")
+  return "\n".join(lines)
+
+def finish():
+  """Write the trace file and print the summary"""
+  if not events:
+    return
+  import json
+  try:
+    with open(trace_path, "w", encoding="utf-8") as f:
+      json.dump({"traceEvents": trace_events(), "displayTimeUnit": "ms"}, f)
+  except OSError as e:
+    print(f"Error writing trace: {e}", file=sys.stderr)
+  print(summary(), file=sys.stderr)
+  print(f"Trace written to {trace_path}", file=sys.stderr)
+
+# Turned on before anything else is imported, so imports are traced too
+if os.environ.get("GLYPHGRAB_TRACE", "") not in ("", "0"):
+  enable(None if os.environ["GLYPHGRAB_TRACE"].lower() in ("1", "true", "yes") else os.environ["GLYPHGRAB_TRACE"])
@@ -0,0 +1,269 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Emoji usage history: recents, use counts and frecency.
+
+Every pick is one line appended to usage.log ("<time ns>\t<emoji>\n"), so
+recording a pick never rewrites anything. The log is folded into the
+usage.json snapshot, written to a temp file and renamed, once it grows past
+COMPACT_AFTER lines. The snapshot remembers the newest pick it includes, so a
+crash between writing it and truncating the log does not count picks twice,
+and a torn last line from a crash mid-append is ignored.
+
+Everything is read from memory. Picks made by another process (the CLI and
+a resident window) are replayed from the end of the log on refresh(). Writers
+take usage.lock, so a pick is never appended between another process'
+compaction reading the log and truncating it, and a store whose snapshot was
+replaced under it reloads before it writes.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+  import fcntl
+except ImportError:
+  # No advisory locks on Windows, only threads are kept apart there
+  fcntl = None
+
+from index_format import atomic_write
+
+SNAPSHOT_VERSION = 1
+# Log lines kept before they are folded into the snapshot
+COMPACT_AFTER = 256
+
+# Frecency weight of a use by its age in days, like browser address bars
+RECENCY_BUCKETS = ((4, 100), (14, 70), (31, 50), (90, 30))
+OLD_USE_WEIGHT = 10
+NS_PER_DAY = 86400 * 10 ** 9
+
+logger = logging.getLogger(__name__)
+
+def frecency(count, last_used_ns, now_ns):
+  """Score an emoji by how often and how recently it was used"""
+  age_days = (now_ns - last_used_ns) / NS_PER_DAY
+  for days, weight in RECENCY_BUCKETS:
+    if age_days < days:
+      return count * weight
+  return count * OLD_USE_WEIGHT
+
+class UsageStore:
+  def __init__(self, data_dir, max_recent=24, legacy_recent_file=None):
+    self.snapshot_path = os.path.join(str(data_dir), "usage.json")
+    self.log_path = os.path.join(str(data_dir), "usage.log")
+    self.lock_path = os.path.join(str(data_dir), "usage.lock")
+    self.max_recent = max_recent
+    self.lock = threading.Lock()
+
+    # emoji -> [count, last used ns]
+    self.counts = {}
+    # Most recent pick last, at most max_recent entries
+    self.recent = OrderedDict()
+    # Newest pick folded into the snapshot, older log lines are skipped
+    self.compacted_through = 0
+    # How far into the log has been replayed, and how many lines that was
+    self.log_offset = 0
+    self.log_lines = 0
+    # (inode, mtime) of the snapshot read, another process' compaction replaces it
+    self.snapshot_stat = None
+
+    self.load(legacy_recent_file)
+
+  def load(self, legacy_recent_file=None):
+    """Read the snapshot and replay the log"""
+    with self.lock:
+      migrated = self.reload(legacy_recent_file)
+      # A migrated list is saved right away so other processes see it too
+      compact = migrated or self.log_lines > COMPACT_AFTER
+    if compact:
+      self.compact()
+
+  def reload(self, legacy_recent_file=None):
+    """Start over from the snapshot and the whole log, return whether recent.json was migrated"""
+    self.counts = {}
+    self.recent = OrderedDict()
+    self.compacted_through = 0
+    self.log_offset = 0
+    self.log_lines = 0
+    migrated = False
+    if not self.read_snapshot() and legacy_recent_file is not None:
+      migrated = self.import_recent_file(legacy_recent_file)
+    self.replay_log()
+    return migrated
+
+  def catch_up(self):
+    """Replay the log from where this store left off, or reload if another process compacted it"""
+    try:
+      size = os.path.getsize(self.log_path)
+    except OSError:
+      size = 0
+    if size < self.log_offset or self.stat_snapshot() != self.snapshot_stat:
+      self.reload()
+    else:
+      self.replay_log()
+
+  def stat_snapshot(self):
+    try:
+      stat = os.stat(self.snapshot_path)
+    except OSError:
+      return None
+    return stat.st_ino, stat.st_mtime_ns
+
+  @contextmanager
+  def file_lock(self):
+    """Keep other processes' writers out, held from replaying the log to writing it"""
+    if fcntl is None:
+      yield
+      return
+    # The data directory is only created by the first write
+    os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+    with open(self.lock_path, 'a') as f:
+      fcntl.flock(f, fcntl.LOCK_EX)
+      try:
+        yield
+      finally:
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+  def read_snapshot(self):
+    self.snapshot_stat = self.stat_snapshot()
+    try:
+      with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    except FileNotFoundError:
+      return False
+    except (OSError, ValueError) as e:
+      logger.error("Error loading usage snapshot: %s", e)
+      return False
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+      return False
+
+    self.compacted_through = snapshot.get("compacted_through", 0)
+    # Oldest first, so replaying them in order rebuilds the recents
+    for emoji, count, last_used in sorted(snapshot.get("emojis", []), key=lambda entry: entry[2]):
+      self.counts[emoji] = [count, last_used]
+      self.touch_recent(emoji)
+    return True
+
+  def import_recent_file(self, path):
+    """Start from the recent.json list older versions kept, return whether there was one"""
+    try:
+      with open(path, 'r', encoding='utf-8') as f:
+        recent_emojis = json.load(f)
+    except (OSError, ValueError):
+      return False
+    now = time.time_ns()
+    # The list is most recent first, spread it over the last few seconds to keep its order
+    for position, emoji in reversed(list(enumerate(recent_emojis))):
+      self.counts[emoji] = [1, now - position * 10 ** 9]
+      self.touch_recent(emoji)
+    return True
+
+  def replay_log(self):
+    """Apply log lines written since the last replay, by this process or another"""
+    try:
+      with open(self.log_path, 'rb') as f:
+        f.seek(self.log_offset)
+        data = f.read()
+    except FileNotFoundError:
+      return
+    # A line without its newline is still being written, or was torn by a crash
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].splitlines():
+      try:
+        timestamp, emoji = line.decode('utf-8').split("\t", 1)
+        timestamp = int(timestamp)
+      except ValueError:
+        continue
+      self.log_lines += 1
+      if timestamp > self.compacted_through:
+        self.apply(emoji, timestamp)
+    self.log_offset += end
+
+  def apply(self, emoji, timestamp):
+    entry = self.counts.get(emoji)
+    if entry is None:
+      self.counts[emoji] = [1, timestamp]
+    else:
+      entry[0] += 1
+      entry[1] = max(entry[1], timestamp)
+    self.touch_recent(emoji)
+
+  def touch_recent(self, emoji):
+    self.recent[emoji] = None
+    self.recent.move_to_end(emoji)
+    if len(self.recent) > self.max_recent:
+      self.recent.popitem(last=False)
+
+  def refresh(self):
+    """Pick up uses recorded by other processes, a stat when there are none"""
+    try:
+      size = os.path.getsize(self.log_path)
+    except OSError:
+      size = 0
+    if size == self.log_offset and self.stat_snapshot() == self.snapshot_stat:
+      return
+    with self.lock:
+      self.catch_up()
+
+  def record(self, emoji):
+    """Remember a pick, appending one line to the log"""
+    with self.lock:
+      try:
+        with self.file_lock():
+          # Replay other processes' picks first so the offset stays in step with the file
+          self.catch_up()
+          timestamp = max(time.time_ns(), self.compacted_through + 1)
+          line = f"{timestamp}\t{emoji}\n".encode('utf-8')
+          with open(self.log_path, 'ab') as f:
+            f.write(line)
+          self.log_offset += len(line)
+          self.log_lines += 1
+      except OSError as e:
+        logger.error("Error saving emoji usage: %s", e)
+        timestamp = max(time.time_ns(), self.compacted_through + 1)
+      self.apply(emoji, timestamp)
+      compact = self.log_lines > COMPACT_AFTER
+    if compact:
+      self.compact()
+
+  def compact(self):
+    """Fold the log into a new snapshot and empty it"""
+    with self.lock:
+      try:
+        with self.file_lock():
+          # Picks other processes logged since our last replay belong in the snapshot too
+          self.catch_up()
+          newest = max((last_used for _, last_used in self.counts.values()), default=0)
+          snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "compacted_through": max(newest, self.compacted_through),
+            "emojis": [[emoji, count, last_used] for emoji, (count, last_used) in self.counts.items()],
+          }
+          atomic_write(self.snapshot_path, json.dumps(snapshot, ensure_ascii=False).encode('utf-8'))
+          # Once the snapshot is in place the log only repeats it
+          with open(self.log_path, 'wb'):
+            pass
+          self.snapshot_stat = self.stat_snapshot()
+      except OSError as e:
+        logger.error("Error compacting emoji usage: %s", e)
+        return
+      self.compacted_through = snapshot["compacted_through"]
+      self.log_offset = 0
+      self.log_lines = 0
+
+  def recent_emojis(self):
+    """Return the recently used emojis, most recent first"""
+    return list(reversed(self.recent))
+
+  def use_count(self, emoji):
+    entry = self.counts.get(emoji)
+    return entry[0] if entry else 0
+
+  def frecency_scores(self, now_ns=None):
+    """Return {emoji: frecency} for every emoji used so far"""
+    now_ns = now_ns or time.time_ns()
+    return {emoji: frecency(count, last_used, now_ns) for emoji, (count, last_used) in self.counts.items()}
@@ -0,0 +1,111 @@
+#  Copyright (c) 2025 Keshav Prajapati
+#  Licensed under the MIT license. See LICENSE file in the project root for details.
+"""
+Skin tone and gender variants, composed from base emojis when needed.
+
+The corpus only holds base emojis, so a tone variant is never indexed or
+shown in the browse grid: it is the base emoji with a Fitzpatrick modifier
+after each person in it. Gendered forms ("🏃‍♀️") are in the corpus with
+keywords of their own, they are grouped with their base here so a picker
+can offer them together.
+"""
+ZWJ = "‍"
+VS16 = "️"
+FEMALE = ZWJ + "♀" + VS16
+MALE = ZWJ + "♂" + VS16
+
+# Light, medium-light, medium, medium-dark and dark, tone 1 to 5
+TONES = ("\U0001F3FB", "\U0001F3FC", "\U0001F3FD", "\U0001F3FE", "\U0001F3FF")
+
+# Flags stored per emoji in the compiled index
+TONE_FLAG = 1    # takes a skin tone
+GENDER_FLAG = 2  # has man and woman forms in the corpus
+
+# Unicode Emoji_Modifier_Base code points, without the few whose toned forms
+# are not recommended for general interchange (👪 👯 🤼)
+_MODIFIER_BASE_RANGES = (
+  (0x261D, 0x261D), (0x26F9, 0x26F9), (0x270A, 0x270D), (0x1F385, 0x1F385),
+  (0x1F3C2, 0x1F3C4), (0x1F3C7, 0x1F3C7), (0x1F3CA, 0x1F3CC), (0x1F442, 0x1F443),
+  (0x1F446, 0x1F450), (0x1F466, 0x1F469), (0x1F46B, 0x1F46E), (0x1F470, 0x1F478),
+  (0x1F47C, 0x1F47C), (0x1F481, 0x1F483), (0x1F485, 0x1F487), (0x1F48F, 0x1F48F),
+  (0x1F491, 0x1F491), (0x1F4AA, 0x1F4AA), (0x1F574, 0x1F575), (0x1F57A, 0x1F57A),
+  (0x1F590, 0x1F590), (0x1F595, 0x1F596), (0x1F645, 0x1F647), (0x1F64B, 0x1F64F),
+  (0x1F6A3, 0x1F6A3), (0x1F6B4, 0x1F6B6), (0x1F6C0, 0x1F6C0), (0x1F6CC, 0x1F6CC),
+  (0x1F90C, 0x1F90C), (0x1F90F, 0x1F90F), (0x1F918, 0x1F91F), (0x1F926, 0x1F926),
+  (0x1F930, 0x1F939), (0x1F93D, 0x1F93E), (0x1F977, 0x1F977), (0x1F9B5, 0x1F9B6),
+  (0x1F9B8, 0x1F9B9), (0x1F9BB, 0x1F9BB), (0x1F9CD, 0x1F9CF), (0x1F9D1, 0x1F9DD),
+  (0x1FAC3, 0x1FAC5), (0x1FAF0, 0x1FAF8),
+)
+MODIFIER_BASES = frozenset(chr(cp) for low, high in _MODIFIER_BASE_RANGES for cp in range(low, high + 1))
+
+# Bases that are text style on their own and carry VS16 in the corpus ("☝️"),
+# the modifier takes the place of the VS16
+TEXT_STYLE_BASES = frozenset("☝⛹✌✍\U0001F3CB\U0001F3CC\U0001F574\U0001F575\U0001F590")
+
+# Inside a sequence these join people and never take a tone themselves
+_JOINERS = frozenset("\U0001F91D❤")
+
+def _tone_positions(emoji):
+  """Return the indexes of the people in emoji that a tone goes after"""
+  if ZWJ not in emoji:
+    return [0] if emoji[:1] in MODIFIER_BASES else []
+  positions = []
+  start = 0
+  for part in emoji.split(ZWJ):
+    if part[:1] in MODIFIER_BASES and part[:1] not in _JOINERS:
+      positions.append(start)
+    start += len(part) + 1
+  # One person, or a couple joined by a handshake or heart; families have no toned forms
+  if len(positions) == 2 and not any(char in _JOINERS for char in emoji):
+    return []
+  return positions if len(positions) <= 2 else []
+
+def supports_tone(emoji):
+  return bool(_tone_positions(emoji))
+
+def with_tone(emoji, tone):
+  """Return emoji in skin tone 1 to 5, or unchanged for tone 0 or emojis without tones"""
+  if not tone:
+    return emoji
+  positions = _tone_positions(emoji)
+  if not positions:
+    return emoji
+  modifier = TONES[tone - 1]
+  result = []
+  last = 0
+  for position in positions:
+    result.append(emoji[last:position + 1])
+    result.append(modifier)
+    last = position + 1
+    # The modifier makes the emoji presentation explicit
+    if emoji[last:last + 1] == VS16:
+      last += 1
+  result.append(emoji[last:])
+  return "".join(result)
+
+def strip_tone(emoji):
+  """Return the base emoji of a tone variant, as it is in the corpus"""
+  if not any(tone in emoji for tone in TONES):
+    return emoji
+  result = []
+  for char in emoji:
+    if char in TONES:
+      if result and result[-1] in TEXT_STYLE_BASES:
+        result.append(VS16)
+      continue
+    result.append(char)
+  return "".join(result)
+
+def gender_base(emoji):
+  """Return the gender neutral emoji a gendered form belongs to, or None"""
+  for suffix in (FEMALE, MALE):
+    if emoji.endswith(suffix) and len(emoji) > len(suffix):
+      return emoji[:-len(suffix)]
+  return None
+
+def variant_flags(emojis):
+  """Return TONE_FLAG and GENDER_FLAG bits for each emoji of the corpus, in order"""
+  emoji_set = set(emojis)
+  gendered = {gender_base(emoji) for emoji in emojis} & emoji_set
+  return [(TONE_FLAG if supports_tone(emoji) else 0) | (GENDER_FLAG if emoji in gendered else 0)
+          for emoji in emojis]